@@ -0,0 +1,393 @@
+import os
+import json
+import lzma
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ------------------ BACKUP ------------------
+# Backups do banco, sem dependência da interface.
+TAMANHO_BLOCO = 256 * 1024
+VERSAO_MANIFESTO = 1
+PREFIXO_COPIA = "copia_"
+ARQUIVO_TRAVA = ".trava"
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _trava_repositorio(diretorio):
+    """Trava exclusiva do repositório entre threads e entre processos.
+
+    A interface e o `cli.py backup` agendado podem usar o mesmo repositório ao
+    mesmo tempo; sem a trava em arquivo, a retenção de um apagaria blocos que o
+    snapshot em andamento do outro deu como já existentes.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    with _lock, open(os.path.join(diretorio, ARQUIVO_TRAVA), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK desiste após ~10 s; continua esperando
+        # A trava é solta ao fechar o arquivo
+        yield
+
+
+# ------------------ CÓPIA EM ETAPAS ------------------
+# A API de backup do SQLite copia algumas páginas por vez e solta o banco entre
+# as etapas; a pausa entre elas deixa a interface gravar e ler sem disputar o
+# disco com a cópia inteira. Se outra conexão gravar no meio, o SQLite recomeça
+# a cópia sozinho, então o resultado é sempre consistente.
+PAGINAS_POR_ETAPA = 256  # 1 MiB por etapa com páginas de 4 KiB
+PAUSA_ETAPA = 0.005
+
+
+class BackupCancelado(Exception):
+    pass
+
+
+def copiar_banco(origem, destino, paginas=PAGINAS_POR_ETAPA, pausa=PAUSA_ETAPA, progresso=None, cancelar=None):
+    """Copia o banco origem para destino em etapas de `paginas` páginas.
+
+    A cópia é escrita em destino + ".tmp" e só renomeada no final, então
+    destino nunca fica truncado. progresso(copiadas, total) é chamado a cada
+    etapa; cancelar é um threading.Event e interrompe com BackupCancelado.
+    """
+    temporario = destino + ".tmp"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+
+    def etapa(status, restantes, total):
+        if progresso:
+            progresso(total - restantes, total)
+        if cancelar is not None and cancelar.is_set():
+            raise BackupCancelado()
+        if pausa and restantes:
+            time.sleep(pausa)
+
+    try:
+        conn_origem = sqlite3.connect(origem)
+        conn_destino = sqlite3.connect(temporario)
+        try:
+            conn_origem.backup(conn_destino, pages=paginas, progress=etapa)
+        finally:
+            conn_destino.close()
+            conn_origem.close()
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+# ------------------ BACKUP COMPACTADO ------------------
+# Arquivo .xz com o banco inteiro. O formato xz guarda o SHA-256 do conteúdo
+# original, então a integridade é conferida na própria descompactação. Tudo é
+# feito em pedaços de TAMANHO_BLOCO: a memória usada não depende do tamanho do banco.
+EXTENSAO_COMPACTADO = ".xz"
+PRESET_LZMA = 3  # bom equilíbrio entre tamanho e tempo; PDFs e letras já caem bastante
+
+
+def _compactar(arquivo, destino, cancelar=None):
+    with open(arquivo, "rb") as entrada, lzma.open(destino, "wb", check=lzma.CHECK_SHA256,
+                                                    preset=PRESET_LZMA) as saida:
+        while True:
+            dados = entrada.read(TAMANHO_BLOCO)
+            if not dados:
+                break
+            if cancelar is not None and cancelar.is_set():
+                raise BackupCancelado()
+            saida.write(dados)
+
+
+def eh_compactado(caminho):
+    return caminho.lower().endswith(EXTENSAO_COMPACTADO)
+
+
+def exportar_compactado(origem, destino, progresso=None, cancelar=None):
+    """Gera em destino um backup .xz do banco origem (cópia em etapas + compactação em fluxo)"""
+    pasta = os.path.dirname(os.path.abspath(destino))
+    fd, copia = tempfile.mkstemp(prefix=PREFIXO_COPIA, suffix=".db", dir=pasta)
+    os.close(fd)
+    temporario = destino + ".tmp"
+    try:
+        copiar_banco(origem, copia, progresso=progresso, cancelar=cancelar)
+        _compactar(copia, temporario, cancelar)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    finally:
+        os.remove(copia)
+
+
+def restaurar_compactado(arquivo, destino):
+    """Descompacta um backup .xz em destino.
+
+    Levanta lzma.LZMAError se o arquivo estiver corrompido e ValueError se o
+    resultado não for um banco SQLite íntegro; destino só é trocado no final.
+    """
+    temporario = destino + ".restaurando"
+    try:
+        with lzma.open(arquivo, "rb") as entrada, open(temporario, "wb") as saida:
+            while True:
+                dados = entrada.read(TAMANHO_BLOCO)
+                if not dados:
+                    break
+                saida.write(dados)
+        conn = sqlite3.connect(temporario)
+        try:
+            resultado = conn.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            conn.close()
+        if resultado != "ok":
+            raise ValueError(f"Backup {arquivo} não é um banco íntegro: {resultado}")
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+# ------------------ BACKUP INCREMENTAL ------------------
+# Cada backup é um snapshot: uma cópia consistente do banco (API de backup do
+# SQLite) dividida em blocos de tamanho fixo. Os blocos são guardados pelo hash
+# do conteúdo, uma única vez; o snapshot é só um manifesto com a lista de hashes.
+# Como o SQLite grava páginas em posições fixas, uma edição muda poucos blocos e
+# o repositório só recebe esses blocos. O incremental é o armazenamento: a cópia
+# e o hash ainda leem e escrevem o banco inteiro (um banco em WAL não tem imagem
+# consistente no disco sem a API de backup). Quando os arquivos do banco não
+# mudaram desde o último snapshot, nem a cópia é feita.
+def _assinatura_banco(caminho_banco):
+    """[tamanho, mtime_ns] do banco e do seu WAL (None se não houver WAL)"""
+    assinatura = []
+    for arquivo in (caminho_banco, caminho_banco + "-wal"):
+        try:
+            info = os.stat(arquivo)
+            assinatura.append([info.st_size, info.st_mtime_ns])
+        except FileNotFoundError:
+            assinatura.append(None)
+    return assinatura
+
+
+class RepositorioBackup:
+    """Diretório com blocos/ (conteúdo por hash) e snapshots/ (manifestos JSON).
+
+    Com compactar=True os blocos novos são gravados com lzma (sufixo .xz); o
+    hash é sempre o do conteúdo original, então blocos compactados e não
+    compactados do mesmo conteúdo são intercambiáveis.
+    """
+
+    def __init__(self, diretorio, compactar=False):
+        self.diretorio = diretorio
+        self.compactar = compactar
+        self.dir_blocos = os.path.join(diretorio, "blocos")
+        self.dir_snapshots = os.path.join(diretorio, "snapshots")
+
+    # ---------- Blocos ----------
+    def _caminho_bloco(self, hash_bloco):
+        return os.path.join(self.dir_blocos, hash_bloco[:2], hash_bloco)
+
+    def _gravar_bloco(self, hash_bloco, dados):
+        """Grava o bloco se ainda não existir; retorna quantos bytes escreveu"""
+        caminho = self._caminho_bloco(hash_bloco)
+        if os.path.exists(caminho) or os.path.exists(caminho + EXTENSAO_COMPACTADO):
+            return 0
+        if self.compactar:
+            caminho += EXTENSAO_COMPACTADO
+            dados = lzma.compress(dados, preset=PRESET_LZMA)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = caminho + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+        return len(dados)
+
+    def _ler_bloco(self, hash_bloco):
+        caminho = self._caminho_bloco(hash_bloco)
+        if os.path.exists(caminho):
+            with open(caminho, "rb") as f:
+                return f.read()
+        with open(caminho + EXTENSAO_COMPACTADO, "rb") as f:
+            return lzma.decompress(f.read())
+
+    # ---------- Snapshots ----------
+    def _caminho_snapshot(self, nome):
+        return os.path.join(self.dir_snapshots, f"{nome}.json")
+
+    def listar_snapshots(self):
+        """Nomes dos snapshots, do mais antigo para o mais recente"""
+        try:
+            arquivos = os.listdir(self.dir_snapshots)
+        except FileNotFoundError:
+            return []
+        return sorted(nome[:-5] for nome in arquivos if nome.endswith(".json"))
+
+    def ler_manifesto(self, nome):
+        with open(self._caminho_snapshot(nome), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _gravar_manifesto(self, nome, manifesto):
+        temporario = self._caminho_snapshot(nome) + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(manifesto, f)
+        os.replace(temporario, self._caminho_snapshot(nome))
+
+    def _remover_copias_antigas(self):
+        """Apaga cópias temporárias deixadas por um backup interrompido (ex.: aplicativo fechado)"""
+        for nome in os.listdir(self.diretorio):
+            if nome.startswith(PREFIXO_COPIA):
+                os.remove(os.path.join(self.diretorio, nome))
+
+    def _snapshot_inalterado(self, caminho_banco, assinatura):
+        """Manifesto do último snapshot se o banco e o WAL estão como estavam nele"""
+        nomes = self.listar_snapshots()
+        if not nomes:
+            return None
+        manifesto = self.ler_manifesto(nomes[-1])
+        if manifesto.get("origem") != os.path.abspath(caminho_banco) or manifesto.get("assinatura") != assinatura:
+            return None
+        return manifesto
+
+    def criar_snapshot(self, caminho_banco, nome=None, progresso=None, cancelar=None):
+        """Faz o backup de caminho_banco e retorna um resumo (nome, blocos, novos, bytes_escritos, segundos).
+
+        A cópia e o hash percorrem o banco inteiro; só os blocos novos são
+        gravados. Se o banco não mudou desde o último snapshot, o manifesto dele é
+        reaproveitado sem ler o banco. progresso e cancelar são repassados para copiar_banco.
+        """
+        inicio = time.perf_counter()
+        nome = nome or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        os.makedirs(self.dir_snapshots, exist_ok=True)
+
+        with _trava_repositorio(self.diretorio):
+            # Com a trava, nenhuma cópia restante pertence a um backup em andamento
+            self._remover_copias_antigas()
+
+            # Tamanho e mtime do banco e do WAL, lidos antes da cópia: uma gravação
+            # durante a cópia muda a assinatura e o próximo backup copia de novo
+            assinatura = _assinatura_banco(caminho_banco)
+            anterior = self._snapshot_inalterado(caminho_banco, assinatura)
+            if anterior is not None:
+                manifesto = {**anterior, "criado": datetime.now().isoformat(timespec="seconds")}
+                self._gravar_manifesto(nome, manifesto)
+                return {
+                    "nome": nome,
+                    "blocos": len(manifesto["blocos"]),
+                    "novos": 0,
+                    "bytes_escritos": 0,
+                    "segundos": time.perf_counter() - inicio,
+                }
+            # Cópia consistente em um arquivo temporário no mesmo disco do repositório
+            fd, copia = tempfile.mkstemp(prefix=PREFIXO_COPIA, suffix=".db", dir=self.diretorio)
+            os.close(fd)
+            try:
+                copiar_banco(caminho_banco, copia, progresso=progresso, cancelar=cancelar)
+
+                blocos = []
+                novos = bytes_escritos = tamanho = 0
+                hash_total = hashlib.sha256()
+                with open(copia, "rb") as f:
+                    while True:
+                        dados = f.read(TAMANHO_BLOCO)
+                        if not dados:
+                            break
+                        tamanho += len(dados)
+                        hash_total.update(dados)
+                        hash_bloco = hashlib.sha256(dados).hexdigest()
+                        blocos.append(hash_bloco)
+                        escritos = self._gravar_bloco(hash_bloco, dados)
+                        if escritos:
+                            novos += 1
+                            bytes_escritos += escritos
+            finally:
+                os.remove(copia)
+
+            manifesto = {
+                "versao": VERSAO_MANIFESTO,
+                "criado": datetime.now().isoformat(timespec="seconds"),
+                "origem": os.path.abspath(caminho_banco),
+                "tamanho": tamanho,
+                "tamanho_bloco": TAMANHO_BLOCO,
+                "sha256": hash_total.hexdigest(),
+                "blocos": blocos,
+                "assinatura": assinatura,
+            }
+            # O manifesto é gravado por último: um snapshot só existe com todos os blocos no lugar
+            self._gravar_manifesto(nome, manifesto)
+
+        return {
+            "nome": nome,
+            "blocos": len(blocos),
+            "novos": novos,
+            "bytes_escritos": bytes_escritos,
+            "segundos": time.perf_counter() - inicio,
+        }
+
+    def restaurar(self, nome, destino):
+        """Remonta o snapshot em destino, conferindo o hash, e troca o arquivo só no final"""
+        with _trava_repositorio(self.diretorio):
+            return self._restaurar(nome, destino)
+
+    def _restaurar(self, nome, destino):
+        manifesto = self.ler_manifesto(nome)
+        os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+        temporario = destino + ".restaurando"
+        hash_total = hashlib.sha256()
+        try:
+            with open(temporario, "wb") as f:
+                for hash_bloco in manifesto["blocos"]:
+                    dados = self._ler_bloco(hash_bloco)
+                    hash_total.update(dados)
+                    f.write(dados)
+            if hash_total.hexdigest() != manifesto["sha256"]:
+                raise ValueError(f"Snapshot {nome} corrompido: hash não confere.")
+            os.replace(temporario, destino)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        return manifesto
+
+    # ---------- Retenção ----------
+    def aplicar_retencao(self, manter=5):
+        """Mantém os `manter` snapshots mais recentes e apaga os blocos que ficaram sem uso.
+
+        Retorna (snapshots_removidos, blocos_removidos).
+        """
+        with _trava_repositorio(self.diretorio):
+            nomes = self.listar_snapshots()
+            removidos = nomes[:-manter] if manter > 0 else nomes
+            for nome in removidos:
+                os.remove(self._caminho_snapshot(nome))
+            if not removidos:
+                return 0, 0
+
+            em_uso = set()
+            for nome in self.listar_snapshots():
+                em_uso.update(self.ler_manifesto(nome)["blocos"])
+
+            blocos_removidos = 0
+            for raiz, _, arquivos in os.walk(self.dir_blocos):
+                for arquivo in arquivos:
+                    if arquivo.removesuffix(EXTENSAO_COMPACTADO) not in em_uso:
+                        os.remove(os.path.join(raiz, arquivo))
+                        blocos_removidos += 1
+            return len(removidos), blocos_removidos
@@ -0,0 +1,92 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from database import contar_lote_render, fetch_lote_render, gravar_pdfs_renderizados
+from pdf_render import gerar_pdf, chave_render_musica, FONT_NAME
+
+# ------------------ RENDERIZAÇÃO EM LOTE ------------------
+# Regenera os PDFs armazenados a partir de texto_original quando a fonte ou o
+# layout mudam. A renderização roda em um pool de processos; a gravação é feita
+# em lotes, e cada lote gravado atualiza o render_hash das músicas, então uma
+# execução interrompida é retomada pulando o que já está em dia.
+TAMANHO_LOTE = 100
+
+
+def _renderizar(tarefa):
+    """Executado nos processos do pool: retorna (id, pdf_bytes, render_hash)"""
+    music_id, dados, chave = tarefa
+    titulo, artista, tonalidade, letra, tamanho_fonte, cabecalho, numero_pagina = dados
+    pdf_bytes = gerar_pdf(titulo, artista, tonalidade, letra or "", tamanho_fonte or 11,
+                          bool(cabecalho), bool(numero_pagina))
+    return music_id, pdf_bytes, chave
+
+
+def _tarefas_pendentes(rows, forcar):
+    tarefas = []
+    for music_id, *dados, render_hash in rows:
+        chave = chave_render_musica(dados)
+        if forcar or chave != render_hash:
+            tarefas.append((music_id, tuple(dados), chave))
+    return tarefas
+
+
+def renderizar_em_lote(ids=None, grupo_id=None, forcar=False, incluir_sem_pdf=False,
+                       processos=None, tamanho_lote=TAMANHO_LOTE, progresso=None, cancelar=None):
+    """Regenera os PDFs desatualizados da biblioteca (ou de ids/grupo_id).
+
+    forcar renderiza tudo, mesmo o que já está em dia; incluir_sem_pdf também
+    gera PDFs para músicas salvas no modo sob demanda. progresso(feitas, total,
+    por_segundo) é chamado a cada lote gravado e cancelar é um threading.Event
+    (ou similar) consultado entre os lotes. Retorna um dicionário com
+    total, renderizadas, puladas, segundos e cancelado.
+    """
+    apenas_com_pdf = not incluir_sem_pdf
+    total = contar_lote_render(ids, grupo_id, apenas_com_pdf)
+    processos = processos or max(1, (os.cpu_count() or 2) - 1)
+
+    inicio = time.perf_counter()
+    vistas = renderizadas = 0
+    apos_id = 0
+    cancelado = False
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        pendente = None  # lote já enviado ao pool, aguardando gravação
+
+        while True:
+            rows = fetch_lote_render(apos_id, tamanho_lote, ids, grupo_id, apenas_com_pdf)
+            if rows:
+                apos_id = rows[-1][0]
+                tarefas = _tarefas_pendentes(rows, forcar)
+                # Envia o próximo lote antes de gravar o anterior, mantendo o pool ocupado
+                proximo = (len(rows), pool.map(_renderizar, tarefas, chunksize=4))
+            else:
+                proximo = None
+
+            if pendente is not None:
+                quantidade, resultados = pendente
+                resultados = list(resultados)
+                if resultados:
+                    gravar_pdfs_renderizados(resultados, FONT_NAME)
+                vistas += quantidade
+                renderizadas += len(resultados)
+                if progresso:
+                    decorrido = time.perf_counter() - inicio
+                    progresso(vistas, total, renderizadas / decorrido if decorrido else 0.0)
+
+            pendente = proximo
+            if pendente is None:
+                break
+            if cancelar is not None and cancelar.is_set():
+                # O lote em andamento é descartado; será refeito na próxima execução
+                cancelado = True
+                pool.shutdown(wait=True, cancel_futures=True)
+                break
+
+    return {
+        "total": total,
+        "renderizadas": renderizadas,
+        "puladas": vistas - renderizadas,
+        "segundos": time.perf_counter() - inicio,
+        "cancelado": cancelado,
+    }
@@ -0,0 +1,107 @@
+import os
+import threading
+
+from configuracao import config, BACKUP_DIR, CACHE_DIR
+from pdf_cache import CachePDF
+from pdf_render import gerar_pdf, chave_render_musica, FONT_NAME
+from backup import RepositorioBackup, BackupCancelado
+from database import (
+    banco_atual, fetch_pdf, fetch_dados_render, fetch_estado_render, insert_music, update_music,
+)
+
+# ------------------ OPERAÇÕES DA BIBLIOTECA ------------------
+# Regras de salvar/renderizar/backup que não dependem de Tk, usadas pela
+# interface (main.py) e pela linha de comando (cli.py).
+
+# ------------------ RENDERIZAÇÃO SOB DEMANDA ------------------
+cache_pdf = CachePDF(CACHE_DIR)
+
+def render_sob_demanda():
+    """No modo sob demanda só o texto é salvo; o PDF é gerado ao abrir/baixar"""
+    return config.get("render_sob_demanda", False)
+
+def obter_pdf(music_id):
+    """PDF armazenado da música ou, se não houver, renderizado a partir do texto (com cache)"""
+    pdf_bytes = fetch_pdf(music_id)
+    if pdf_bytes:
+        return pdf_bytes
+
+    dados = fetch_dados_render(music_id)
+    if not dados:
+        return None
+    chave = chave_render_musica(dados)
+    pdf_bytes = cache_pdf.obter(chave)
+    if pdf_bytes is None:
+        titulo, artista, tonalidade, letra, tamanho_fonte, cabecalho, numero_pagina = dados
+        pdf_bytes = gerar_pdf(titulo, artista, tonalidade, letra or "", tamanho_fonte or 11,
+                              bool(cabecalho), bool(numero_pagina))
+        cache_pdf.guardar(chave, pdf_bytes)
+    return pdf_bytes
+
+def renderizar_para_salvar(titulo, artista, tonalidade, letra, tamanho_fonte=11,
+                           incluir_cabecalho=True, incluir_numero_pagina=True):
+    """Gera o PDF a gravar no banco e o hash das entradas; (None, None) no modo sob demanda"""
+    if render_sob_demanda():
+        return None, None
+    chave = chave_render_musica((titulo, artista, tonalidade, letra, tamanho_fonte,
+                                 incluir_cabecalho, incluir_numero_pagina))
+    pdf_bytes = gerar_pdf(titulo, artista, tonalidade, letra, tamanho_fonte,
+                          incluir_cabecalho, incluir_numero_pagina)
+    return pdf_bytes, chave
+
+def salvar_nova_musica(titulo, artista, tonalidade, letra, tamanho_fonte=11):
+    pdf_bytes, render_hash = renderizar_para_salvar(titulo, artista, tonalidade, letra, tamanho_fonte)
+    return insert_music(titulo, artista, tonalidade, pdf_bytes, letra, tamanho_fonte,
+                        fonte=FONT_NAME, render_hash=render_hash)
+
+def salvar_edicao(music_id, titulo, artista, tonalidade, letra, tamanho_fonte):
+    """Atualiza a música e só gera o PDF de novo se alguma entrada da renderização mudou.
+
+    Retorna True se o PDF foi renderizado (ou invalidado) e False se a edição
+    alterou apenas metadados que não aparecem no PDF. Levanta ValueError se a
+    música foi excluída (por outro processo, por exemplo) depois de aberta.
+    """
+    anterior = fetch_dados_render(music_id)
+    if anterior is None:
+        raise ValueError("Música não encontrada")
+    cabecalho, numero_pagina = bool(anterior[5]), bool(anterior[6])
+    chave_anterior = chave_render_musica(anterior)
+    chave_nova = chave_render_musica((titulo, artista, tonalidade, letra, tamanho_fonte,
+                                      cabecalho, numero_pagina))
+    render_hash, tem_pdf = fetch_estado_render(music_id)
+
+    if (tem_pdf and render_hash == chave_nova) or (not tem_pdf and chave_anterior == chave_nova):
+        update_music(music_id, titulo, artista, tonalidade, None, letra, tamanho_fonte)
+        return False
+
+    # O PDF em cache da versão anterior não serve mais
+    cache_pdf.invalidar(chave_anterior)
+    if render_sob_demanda():
+        update_music(music_id, titulo, artista, tonalidade, None, letra, tamanho_fonte,
+                     invalidar_pdf=True, fonte=FONT_NAME)
+    else:
+        pdf_bytes = gerar_pdf(titulo, artista, tonalidade, letra, tamanho_fonte, cabecalho, numero_pagina)
+        update_music(music_id, titulo, artista, tonalidade, pdf_bytes, letra, tamanho_fonte,
+                     fonte=FONT_NAME, render_hash=chave_nova)
+    return True
+
+# ------------------ BACKUP AUTOMÁTICO ------------------
+BACKUPS_MANTIDOS = 5
+# Sinaliza ao backup automático em andamento que o aplicativo está fechando
+cancelar_backup_automatico = threading.Event()
+
+def repositorio_backup():
+    return RepositorioBackup(os.path.join(BACKUP_DIR, "incremental"),
+                             compactar=config.get("backup_compactado", False))
+
+def criar_backup_automatico(path=None):
+    """Cria um snapshot incremental do banco (o atual, por padrão) e descarta os mais antigos"""
+    path = path or banco_atual()
+    try:
+        repositorio = repositorio_backup()
+        repositorio.criar_snapshot(path, cancelar=cancelar_backup_automatico)
+        repositorio.aplicar_retencao(config.get("backups_mantidos", BACKUPS_MANTIDOS))
+    except BackupCancelado:
+        pass
+    except Exception as e:
+        print(f"Erro no backup automático: {e}")
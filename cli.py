@@ -0,0 +1,311 @@
+import os
+import sys
+import argparse
+import multiprocessing
+
+from configuracao import config, DEFAULT_DB_FILE
+from biblioteca import obter_pdf, render_sob_demanda, salvar_nova_musica, repositorio_backup
+from backup import copiar_banco, exportar_compactado, restaurar_compactado, eh_compactado
+from batch_render import renderizar_em_lote
+from importacao import extrair_texto, importar_pasta, EXTENSOES
+from parser_importacao import interpretar_documento, remover_caracteres_invisiveis
+from database import (
+    init_db, migracao_pendente, definir_banco, fechar_conexao, fetch_all_grupos, fetch_musica,
+    iterar_musicas, buscar_musicas, get_music_stats,
+    fetch_historico_recente, compactar_historico, HISTORICO_DIAS, HISTORICO_MAX,
+    adicionar_musicas_ao_grupo, remover_musicas_do_grupo, mover_musicas_de_grupo,
+)
+
+# ------------------ LINHA DE COMANDO ------------------
+# Acesso à biblioteca sem interface gráfica (sem Tk), para scripts e tarefas
+# agendadas em servidores. A saída das listagens é uma linha por música com os
+# campos separados por tabulação:
+#   python cli.py listar --grupo "Domingo"
+#   python cli.py backup
+#   python cli.py renderizar --forcar
+CAMPOS_BUSCA = {"titulo": "titulo", "artista": "artista", "tonalidade": "tonalidade", "letra": "texto_original"}
+
+
+class ErroComando(Exception):
+    pass
+
+
+def _progresso(feitos, total, por_segundo=None):
+    texto = f"\r{feitos}/{total}"
+    if por_segundo is not None:
+        texto += f" ({por_segundo:.1f}/s)"
+    print(texto, end="", file=sys.stderr, flush=True)
+
+
+def _progresso_migracao(versao, descricao, linhas):
+    print(f"\rMigrando o banco ({descricao}): {linhas} registros", end="", file=sys.stderr, flush=True)
+
+
+def _grupo_por_nome(nome):
+    for grupo_id, nome_grupo, _ in fetch_all_grupos():
+        if nome_grupo.casefold() == nome.casefold():
+            return grupo_id, nome_grupo
+    raise ErroComando(f"Grupo não encontrado: {nome}")
+
+
+def _imprimir_musicas(linhas):
+    for musica_id, titulo, artista, tonalidade, favorito, *_ in linhas:
+        print("\t".join((str(musica_id), titulo or "", artista or "", tonalidade or "", "★" if favorito else "")))
+
+
+# ------------------ COMANDOS ------------------
+def cmd_listar(args):
+    grupo_id = _grupo_por_nome(args.grupo)[0] if args.grupo else None
+    _imprimir_musicas(iterar_musicas(grupo_id=grupo_id, apenas_favoritos=args.favoritos,
+                                     ordenar_por=args.ordenar, ordem="ASC" if args.crescente else "DESC"))
+
+
+def cmd_buscar(args):
+    grupo_id = _grupo_por_nome(args.grupo)[0] if args.grupo else None
+    _imprimir_musicas(buscar_musicas(args.termo, CAMPOS_BUSCA.get(args.campo), args.favoritos,
+                                     grupo_id, args.limite))
+
+
+def cmd_adicionar(args):
+    letra = ""
+    if args.letra == "-":
+        letra = sys.stdin.read()
+    elif args.letra:
+        with open(args.letra, "r", encoding="utf-8") as f:
+            letra = f.read()
+    titulo = remover_caracteres_invisiveis(args.titulo)
+    if not titulo:
+        raise ErroComando("O título é obrigatório.")
+    print(salvar_nova_musica(titulo, args.artista, args.tonalidade, letra, args.tamanho_fonte))
+
+
+def cmd_importar(args):
+    falhas = 0
+    for caminho in args.caminhos:
+        if os.path.isdir(caminho):
+            renderizar = not (args.sem_pdf or render_sob_demanda())
+            r = importar_pasta(caminho, renderizar=renderizar, progresso=_progresso)
+            print(file=sys.stderr)
+            print(f"{caminho}: {r['importadas']} importadas, {len(r['duplicadas'])} duplicadas, "
+                  f"{len(r['falhas'])} falhas ({r['segundos']:.1f}s)")
+            for arquivo, erro in r["falhas"]:
+                print(f"  {arquivo}: {erro}", file=sys.stderr)
+            falhas += len(r["falhas"])
+        elif caminho.lower().endswith(EXTENSOES):
+            try:
+                titulo, artista, tonalidade, letra = interpretar_documento(extrair_texto(caminho))
+                titulo = remover_caracteres_invisiveis(titulo)
+                if not titulo:
+                    raise ValueError("Documento sem título.")
+                print(f"{caminho}: {salvar_nova_musica(titulo, artista, tonalidade, letra)}")
+            except Exception as e:
+                print(f"{caminho}: {e}", file=sys.stderr)
+                falhas += 1
+        else:
+            print(f"{caminho}: formato não suportado", file=sys.stderr)
+            falhas += 1
+    return 1 if falhas else 0
+
+
+def cmd_exportar(args):
+    if args.grupo:
+        from setlist import exportar_setlist  # carrega o reportlab
+        grupo_id, nome = _grupo_por_nome(args.grupo)
+        total = exportar_setlist(grupo_id, nome, args.destino, numeracao_continua=not args.mesclar)
+        print(f"{total} músicas exportadas para {args.destino}")
+        return
+    if args.id is None:
+        raise ErroComando("Informe o id da música ou --grupo.")
+    if fetch_musica(args.id) is None:
+        raise ErroComando(f"Música não encontrada: {args.id}")
+    pdf_bytes = obter_pdf(args.id)
+    if not pdf_bytes:
+        raise ErroComando(f"Música {args.id} sem PDF.")
+    with open(args.destino, "wb") as f:
+        f.write(pdf_bytes)
+
+
+def cmd_renderizar(args):
+    grupo_id = _grupo_por_nome(args.grupo)[0] if args.grupo else None
+    r = renderizar_em_lote(grupo_id=grupo_id, forcar=args.forcar, incluir_sem_pdf=args.incluir_sem_pdf,
+                           progresso=_progresso)
+    print(file=sys.stderr)
+    print(f"{r['renderizadas']} PDFs gerados, {r['puladas']} já estavam em dia ({r['segundos']:.1f}s)")
+
+
+def cmd_backup(args, banco):
+    repositorio = repositorio_backup()
+    if args.listar:
+        for nome in repositorio.listar_snapshots():
+            manifesto = repositorio.ler_manifesto(nome)
+            print(f"{nome}\t{manifesto['criado']}\t{manifesto['tamanho']}")
+        return
+    if args.destino:
+        copiar = exportar_compactado if eh_compactado(args.destino) else copiar_banco
+        copiar(banco, args.destino, progresso=_progresso)
+        print(file=sys.stderr)
+        print(args.destino)
+        return
+    r = repositorio.criar_snapshot(banco, progresso=_progresso)
+    print(file=sys.stderr)
+    removidos, _ = repositorio.aplicar_retencao(args.manter)
+    print(f"{r['nome']}: {r['novos']}/{r['blocos']} blocos novos, {r['bytes_escritos']} bytes "
+          f"({r['segundos']:.1f}s); {removidos} snapshots antigos removidos")
+
+
+def cmd_restaurar(args):
+    if os.path.exists(args.destino):
+        raise ErroComando(f"O destino já existe: {args.destino}")
+    if eh_compactado(args.origem):
+        restaurar_compactado(args.origem, args.destino)
+    else:
+        repositorio = repositorio_backup()
+        if args.origem not in repositorio.listar_snapshots():
+            raise ErroComando(f"Snapshot não encontrado: {args.origem}")
+        repositorio.restaurar(args.origem, args.destino)
+    print(args.destino)
+
+
+def cmd_estatisticas(args):
+    stats = get_music_stats()
+    print(f"músicas\t{stats['total']}")
+    print(f"favoritos\t{stats['favoritos']}")
+    print(f"grupos\t{stats['grupos']}")
+    if stats["recente"]:
+        print(f"recente\t{stats['recente'][0]}\t{stats['recente'][1]}")
+
+
+def cmd_grupo(args):
+    grupo_id, nome = _grupo_por_nome(args.grupo)
+    # '-' lê os ids da entrada padrão (1ª coluna), ex.: cli.py buscar amor | cli.py grupo Domingo -
+    texto = sys.stdin.read().splitlines() if args.ids == ["-"] else args.ids
+    try:
+        args.ids = [int(linha.split("\t")[0]) for linha in texto if linha.strip()]
+    except ValueError:
+        raise ErroComando("Ids de música inválidos.")
+    if args.mover_para:
+        destino_id, destino = _grupo_por_nome(args.mover_para)
+        aplicadas, outras, inexistentes = mover_musicas_de_grupo(args.ids, grupo_id, destino_id)
+        print(f"{aplicadas} movidas para '{destino}', {outras} não estavam em '{nome}'")
+    elif args.remover:
+        aplicadas, outras, inexistentes = remover_musicas_do_grupo(args.ids, grupo_id)
+        print(f"{aplicadas} removidas de '{nome}', {outras} não estavam no grupo")
+    else:
+        aplicadas, outras, inexistentes = adicionar_musicas_ao_grupo(args.ids, grupo_id)
+        print(f"{aplicadas} adicionadas a '{nome}', {outras} já estavam no grupo")
+    if inexistentes:
+        print(f"Músicas inexistentes: {' '.join(map(str, inexistentes))}", file=sys.stderr)
+        return 1
+
+
+def cmd_historico(args):
+    if args.compactar:
+        apagados = compactar_historico(config.get("historico_dias", HISTORICO_DIAS),
+                                       config.get("historico_max", HISTORICO_MAX))
+        print(f"{apagados} registros apagados")
+        return
+    for _, titulo, acao, data in fetch_historico_recente(args.limite):
+        print(f"{data}\t{acao}\t{titulo or ''}")
+
+
+# ------------------ ARGUMENTOS ------------------
+def criar_parser():
+    parser = argparse.ArgumentParser(prog="songpdf", description="Biblioteca de músicas sem interface gráfica")
+    parser.add_argument("--banco", help="arquivo do banco (padrão: o da configuração)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("listar", help="lista as músicas")
+    p.add_argument("--grupo")
+    p.add_argument("--favoritos", action="store_true")
+    p.add_argument("--ordenar", choices=["data", "titulo", "artista", "tonalidade"], default="data")
+    p.add_argument("--crescente", action="store_true")
+
+    p = sub.add_parser("buscar", help="busca por relevância")
+    p.add_argument("termo")
+    p.add_argument("--campo", choices=list(CAMPOS_BUSCA))
+    p.add_argument("--grupo")
+    p.add_argument("--favoritos", action="store_true")
+    p.add_argument("--limite", type=int)
+
+    p = sub.add_parser("adicionar", help="adiciona uma música")
+    p.add_argument("titulo")
+    p.add_argument("--artista", default="")
+    p.add_argument("--tonalidade", default="")
+    p.add_argument("--letra", help="arquivo de texto com a letra ('-' lê da entrada padrão)")
+    p.add_argument("--tamanho-fonte", type=int, default=11)
+
+    p = sub.add_parser("importar", help="importa arquivos PDF/DOCX ou pastas inteiras")
+    p.add_argument("caminhos", nargs="+")
+    p.add_argument("--sem-pdf", action="store_true", help="não gera os PDFs na importação de pastas")
+
+    p = sub.add_parser("exportar", help="salva o PDF de uma música ou o setlist de um grupo")
+    p.add_argument("id", type=int, nargs="?")
+    p.add_argument("destino")
+    p.add_argument("--grupo")
+    p.add_argument("--mesclar", action="store_true", help="setlist reaproveitando os PDFs armazenados")
+
+    p = sub.add_parser("renderizar", help="regenera os PDFs desatualizados")
+    p.add_argument("--grupo")
+    p.add_argument("--forcar", action="store_true")
+    p.add_argument("--incluir-sem-pdf", action="store_true")
+
+    p = sub.add_parser("backup", help="snapshot incremental ou cópia para DESTINO (.db ou .db.xz)")
+    p.add_argument("destino", nargs="?")
+    p.add_argument("--manter", type=int, default=config.get("backups_mantidos", 5))
+    p.add_argument("--listar", action="store_true", help="lista os snapshots")
+
+    p = sub.add_parser("restaurar", help="restaura um snapshot (pelo nome) ou um arquivo .xz em DESTINO")
+    p.add_argument("origem")
+    p.add_argument("destino")
+
+    sub.add_parser("estatisticas", help="totais da biblioteca")
+
+    p = sub.add_parser("grupo", help="adiciona, remove ou move músicas de um grupo (ids, ou '-' para ler da entrada)")
+    p.add_argument("grupo")
+    p.add_argument("ids", nargs="+")
+    acao = p.add_mutually_exclusive_group()
+    acao.add_argument("--remover", action="store_true")
+    acao.add_argument("--mover-para", metavar="GRUPO")
+
+    p = sub.add_parser("historico", help="ações recentes")
+    p.add_argument("--limite", type=int, default=20)
+    p.add_argument("--compactar", action="store_true", help="aplica a retenção do histórico")
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    banco = args.banco or config.get("db_file", DEFAULT_DB_FILE)
+    comandos = {
+        "listar": cmd_listar,
+        "buscar": cmd_buscar,
+        "adicionar": cmd_adicionar,
+        "importar": cmd_importar,
+        "exportar": cmd_exportar,
+        "renderizar": cmd_renderizar,
+        "backup": lambda a: cmd_backup(a, banco),
+        "restaurar": cmd_restaurar,
+        "estatisticas": cmd_estatisticas,
+        "grupo": cmd_grupo,
+        "historico": cmd_historico,
+    }
+    try:
+        # restaurar não abre o banco de trabalho; os demais o criam se ainda não existir
+        if args.comando != "restaurar":
+            migrando = migracao_pendente(banco)
+            init_db(banco, _progresso_migracao)
+            if migrando:
+                print(file=sys.stderr)
+            definir_banco(banco)
+        return comandos[args.comando](args) or 0
+    except (ErroComando, OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    finally:
+        fechar_conexao()
+
+
+if __name__ == "__main__":
+    # Necessário para o pool de processos no executável gerado pelo PyInstaller
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,27 @@
+import os
+import json
+
+# ------------------ CONFIGURAÇÃO ------------------
+# Caminhos padrão e config.json, compartilhados pela interface e pela linha de
+# comando. `config` é um único dicionário: quem altera e chama save_config()
+# altera para todo o processo.
+CONFIG_FILE = "config.json"
+DB_DIR = "data"
+DEFAULT_DB_FILE = os.path.join(DB_DIR, "songpdf.db")
+BACKUP_DIR = "backups"
+CACHE_DIR = os.path.join("cache", "pdf")
+
+def load_config():
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except:
+                return {}
+    return {}
+
+def save_config(config: dict):
+    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=4, ensure_ascii=False)
+
+config = load_config()
@@ -0,0 +1,1279 @@
+import os
+import re
+import json
+import string
+import hashlib
+import sqlite3
+import time
+import threading
+import unicodedata
+from contextlib import contextmanager
+
+# ------------------ CONEXÃO ------------------
+# Cada thread mantém uma conexão própria e duradoura com o banco atual.
+# Abrir uma conexão por chamada custava mais que a própria consulta.
+_local = threading.local()
+_lock = threading.Lock()
+_caminho_banco = None
+_geracao = 0
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 134217728",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Quantidade de statements preparados mantidos em cache por conexão
+CACHE_STATEMENTS = 256
+
+
+def definir_banco(path):
+    """Define o banco usado por todas as funções e invalida as conexões abertas"""
+    global _caminho_banco, _geracao
+    with _lock:
+        _caminho_banco = path
+        _geracao += 1
+    fechar_conexao()
+
+
+def banco_atual():
+    return _caminho_banco
+
+
+def abrir_conexao(path):
+    conn = sqlite3.connect(path, cached_statements=CACHE_STATEMENTS, timeout=5)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_conexao():
+    """Retorna a conexão da thread atual, reabrindo se o banco foi trocado"""
+    if _caminho_banco is None:
+        raise RuntimeError("Nenhum banco definido. Chame definir_banco() antes.")
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.geracao == _geracao:
+        return conn
+    if conn is not None:
+        conn.close()
+    _local.conn = abrir_conexao(_caminho_banco)
+    _local.geracao = _geracao
+    return _local.conn
+
+
+def fechar_conexao():
+    """Fecha a conexão da thread atual (as demais são reabertas sob demanda)"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def transacao():
+    """Executa o bloco em uma única transação, com rollback em caso de erro"""
+    conn = get_conexao()
+    with conn:
+        yield conn
+
+
+# ------------------ CACHE DE METADADOS ------------------
+# Metadados leves das músicas, grupos e associações ficam em memória: são lidos
+# uma vez e depois atualizados pelas próprias funções de escrita deste módulo.
+# Alterações feitas por outro processo são detectadas pelo PRAGMA data_version
+# de uma conexão dedicada, e aí o cache é recarregado por inteiro.
+class CacheMetadados:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._conn = None
+        self._geracao = None
+        self._versao = None
+        self.carregado = False
+        self.musicas = {}             # id -> [titulo, artista, tonalidade, favorito, data_criacao]
+        self.grupos = {}              # id -> (nome, cor)
+        self.grupos_por_musica = {}   # musica_id -> {grupo_id}
+        self.musicas_por_grupo = {}   # grupo_id -> {musica_id}
+        self.favoritos = 0
+        self.recente = None
+        self._grupos_ordenados = None
+
+    def _versao_banco(self):
+        # data_version só muda quando *outra* conexão grava; por isso a conexão é exclusiva do cache
+        if self._conn is None or self._geracao != _geracao:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(_caminho_banco, check_same_thread=False, timeout=5)
+            self._geracao = _geracao
+            self.carregado = False
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _garantir(self):
+        versao = self._versao_banco()
+        if not self.carregado or versao != self._versao:
+            self._carregar()
+            self._versao = versao
+
+    def _carregar(self):
+        conn = self._conn
+        with conn:
+            conn.execute("BEGIN")  # as três leituras vêm do mesmo instante do banco
+            musicas = conn.execute(
+                "SELECT id, titulo, artista, tonalidade, favorito, data_criacao FROM musicas").fetchall()
+            grupos = conn.execute("SELECT id, nome, cor FROM grupos").fetchall()
+            associacoes = conn.execute("SELECT musica_id, grupo_id FROM musica_grupo").fetchall()
+
+        self.musicas = {row[0]: [row[1], row[2], row[3], bool(row[4]), row[5] or ""] for row in musicas}
+        self.grupos = {grupo_id: (nome, cor) for grupo_id, nome, cor in grupos}
+        self.grupos_por_musica = {}
+        self.musicas_por_grupo = {grupo_id: set() for grupo_id in self.grupos}
+        for musica_id, grupo_id in associacoes:
+            # Bancos antigos rodavam sem chaves estrangeiras e podem ter associações órfãs
+            if musica_id not in self.musicas or grupo_id not in self.grupos:
+                continue
+            self.grupos_por_musica.setdefault(musica_id, set()).add(grupo_id)
+            self.musicas_por_grupo.setdefault(grupo_id, set()).add(musica_id)
+        self.favoritos = sum(1 for m in self.musicas.values() if m[3])
+        self._recalcular_recente()
+        self._grupos_ordenados = None
+        self.carregado = True
+
+    def _recalcular_recente(self):
+        self.recente = max(self.musicas, key=lambda i: (self.musicas[i][4], i), default=None)
+
+    @contextmanager
+    def alteracao(self):
+        """Envolve uma escrita deste processo.
+
+        Se o cache estava em dia antes da escrita, o chamador o atualiza dentro do
+        bloco (os métodos abaixo) e a nova versão do banco é registrada ao final;
+        senão ele é descartado e recarregado na próxima leitura. A transação da
+        conexão da thread começa aqui com BEGIN IMMEDIATE: com a trava de escrita,
+        nenhum outro processo grava entre a comparação das versões e o COMMIT.
+        """
+        with self._lock:
+            conn = get_conexao()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                em_dia = self.carregado and self._versao_banco() == self._versao
+                if not em_dia:
+                    self.carregado = False
+                # O data_version da própria conexão só muda com commits de outras conexões
+                externa = conn.execute("PRAGMA data_version").fetchone()[0]
+                yield
+                if conn.in_transaction:
+                    conn.commit()
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            if em_dia:
+                versao = self._versao_banco()
+                if conn.execute("PRAGMA data_version").fetchone()[0] == externa:
+                    self._versao = versao
+                else:
+                    # Outro processo gravou logo após o nosso COMMIT: recarrega na próxima leitura
+                    self.carregado = False
+
+    # ---------- Atualizações incrementais (chamadas dentro de alteracao) ----------
+    def musica_inserida(self, musica_id, titulo, artista, tonalidade):
+        if not self.carregado:
+            return
+        # Mesmo formato de CURRENT_TIMESTAMP (UTC)
+        data = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        self.musicas[musica_id] = [titulo, artista, tonalidade, False, data]
+        if self.recente is None or (data, musica_id) >= (self.musicas[self.recente][4], self.recente):
+            self.recente = musica_id
+
+    def musica_atualizada(self, musica_id, titulo, artista, tonalidade):
+        musica = self.musicas.get(musica_id) if self.carregado else None
+        if musica is not None:
+            musica[:3] = [titulo, artista, tonalidade]
+
+    def musica_removida(self, musica_id):
+        musica = self.musicas.pop(musica_id, None) if self.carregado else None
+        if musica is None:
+            return
+        self.favoritos -= musica[3]
+        for grupo_id in self.grupos_por_musica.pop(musica_id, ()):
+            self.musicas_por_grupo.get(grupo_id, set()).discard(musica_id)
+        if self.recente == musica_id:
+            self._recalcular_recente()
+
+    def favorito_alternado(self, musica_id):
+        musica = self.musicas.get(musica_id) if self.carregado else None
+        if musica is not None:
+            musica[3] = not musica[3]
+            self.favoritos += 1 if musica[3] else -1
+
+    def grupo_salvo(self, grupo_id, nome, cor):
+        if self.carregado:
+            self.grupos[grupo_id] = (nome, cor)
+            self.musicas_por_grupo.setdefault(grupo_id, set())
+            self._grupos_ordenados = None
+
+    def grupo_removido(self, grupo_id):
+        if not self.carregado:
+            return
+        self.grupos.pop(grupo_id, None)
+        for musica_id in self.musicas_por_grupo.pop(grupo_id, ()):
+            self.grupos_por_musica.get(musica_id, set()).discard(grupo_id)
+        self._grupos_ordenados = None
+
+    def associacao_alterada(self, musica_id, grupo_id, presente):
+        if not self.carregado:
+            return
+        if presente:
+            self.grupos_por_musica.setdefault(musica_id, set()).add(grupo_id)
+            self.musicas_por_grupo.setdefault(grupo_id, set()).add(musica_id)
+        else:
+            self.grupos_por_musica.get(musica_id, set()).discard(grupo_id)
+            self.musicas_por_grupo.get(grupo_id, set()).discard(musica_id)
+
+    # ---------- Leituras ----------
+    def grupos_ordenados(self):
+        """(id, nome, cor) por nome, como ORDER BY nome (BINARY)"""
+        with self._lock:
+            self._garantir()
+            if self._grupos_ordenados is None:
+                self._grupos_ordenados = sorted(
+                    ((grupo_id, nome, cor) for grupo_id, (nome, cor) in self.grupos.items()),
+                    key=lambda g: g[1])
+            return list(self._grupos_ordenados)
+
+    def grupos_da_musica(self, musica_id):
+        with self._lock:
+            self._garantir()
+            grupos = [(g, *self.grupos[g]) for g in self.grupos_por_musica.get(musica_id, ()) if g in self.grupos]
+        return sorted(grupos, key=lambda g: g[1])
+
+    def contar(self, grupo_id=None, apenas_favoritos=False):
+        with self._lock:
+            self._garantir()
+            if grupo_id:
+                ids = self.musicas_por_grupo.get(grupo_id, ())
+                if not apenas_favoritos:
+                    return len(ids)
+                return sum(1 for i in ids if self.musicas[i][3])
+            return self.favoritos if apenas_favoritos else len(self.musicas)
+
+    def estatisticas(self):
+        with self._lock:
+            self._garantir()
+            recente = self.musicas.get(self.recente)
+            return {
+                "total": len(self.musicas),
+                "favoritos": self.favoritos,
+                "grupos": len(self.grupos),
+                "recente": (recente[0], recente[1]) if recente else None,
+            }
+
+
+cache_metadados = CacheMetadados()
+
+
+# ------------------ BANCO ------------------
+def init_db(path, progresso=None):
+    """Cria o banco se preciso e o leva até a versão atual do schema (ver MIGRACOES)"""
+    global FTS_DISPONIVEL
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Sem transações implícitas: cada migração controla BEGIN/COMMIT
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        if versao_schema(conn) >= VERSAO_SCHEMA:
+            # Schema em dia: nenhuma DDL nem varredura na abertura
+            FTS_DISPONIVEL = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='musicas_fts'"
+            ).fetchone() is not None
+            return
+        # Sem VACUUM ao final: ele travaria e reescreveria o arquivo inteiro; as
+        # páginas liberadas pelos lotes são reaproveitadas pelas próximas gravações
+        migrar(conn, progresso)
+    finally:
+        conn.close()
+
+def migracao_pendente(path):
+    """True se o banco já existe e está abaixo da versão atual do schema"""
+    if not os.path.exists(path):
+        return False
+    conn = sqlite3.connect(path)
+    try:
+        return versao_schema(conn) < VERSAO_SCHEMA
+    finally:
+        conn.close()
+
+def criar_tabelas(cur):
+    # Tabela de músicas
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS musicas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titulo TEXT NOT NULL,
+            artista TEXT,
+            tonalidade TEXT,
+            pdf BLOB,
+            texto_original TEXT,
+            data_criacao DATETIME DEFAULT CURRENT_TIMESTAMP,
+            data_modificacao DATETIME DEFAULT CURRENT_TIMESTAMP,
+            favorito BOOLEAN DEFAULT 0
+        )
+    """)
+
+    # Tabela de grupos
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS grupos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL UNIQUE,
+            cor TEXT DEFAULT '#1f6aa5',
+            descricao TEXT
+        )
+    """)
+
+    # Tabela de relação música-grupo
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS musica_grupo (
+            musica_id INTEGER,
+            grupo_id INTEGER,
+            PRIMARY KEY (musica_id, grupo_id),
+            FOREIGN KEY (musica_id) REFERENCES musicas (id) ON DELETE CASCADE,
+            FOREIGN KEY (grupo_id) REFERENCES grupos (id) ON DELETE CASCADE
+        )
+    """)
+
+    # Tabela de histórico
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS historico (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            musica_id INTEGER,
+            acao TEXT,
+            data DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (musica_id) REFERENCES musicas (id) ON DELETE SET NULL
+        )
+    """)
+
+    # Índices para melhor performance
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_titulo ON musicas(titulo)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_artista ON musicas(artista)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_data ON musicas(data_criacao)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_historico_data ON historico(data)")
+
+def criar_indices_compostos(cur):
+    """Índices para as combinações de filtro + ordenação da tela"""
+    cur.execute("DROP INDEX IF EXISTS idx_musicas_favorito")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_favorito_data ON musicas(favorito, data_criacao)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_favorito_titulo ON musicas(favorito, titulo)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_artista_ord ON musicas(IFNULL(artista, ''))")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_tonalidade_ord ON musicas(IFNULL(tonalidade, ''))")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_musica_grupo_grupo ON musica_grupo(grupo_id, musica_id)")
+
+# ------------------ PARÂMETROS DE RENDERIZAÇÃO ------------------
+# Guardados por música para que o PDF possa ser gerado de novo a partir do texto
+COLUNAS_RENDER = (
+    ("tamanho_fonte", "INTEGER DEFAULT 11"),
+    ("incluir_cabecalho", "BOOLEAN DEFAULT 1"),
+    ("incluir_numero_pagina", "BOOLEAN DEFAULT 1"),
+    ("fonte", "TEXT"),
+    # Hash das entradas que geraram o PDF armazenado (ver pdf_cache.chave_render)
+    ("render_hash", "TEXT"),
+)
+
+def criar_colunas_render(cur):
+    colunas = {row[1] for row in cur.execute("PRAGMA table_info(musicas)")}
+    for nome, tipo in COLUNAS_RENDER:
+        if nome not in colunas:
+            cur.execute(f"ALTER TABLE musicas ADD COLUMN {nome} {tipo}")
+
+# ------------------ ARMAZENAMENTO DE PDFs ------------------
+# Os PDFs ficam na tabela pdfs, indexados pelo hash do conteúdo; musicas guarda só
+# o hash. Varreduras da lista não tocam em BLOBs e renderizações idênticas são
+# armazenadas uma única vez.
+LOTE_MIGRACAO = 200
+
+def hash_pdf(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+def criar_blobstore(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pdfs (
+            hash TEXT PRIMARY KEY,
+            dados BLOB NOT NULL,
+            tamanho INTEGER NOT NULL
+        )
+    """)
+    colunas = {row[1] for row in cur.execute("PRAGMA table_info(musicas)")}
+    if "pdf_hash" not in colunas:
+        cur.execute("ALTER TABLE musicas ADD COLUMN pdf_hash TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_pdf_hash ON musicas(pdf_hash)")
+
+def salvar_pdf(conn, pdf_bytes):
+    """Armazena o PDF (se ainda não existir) e retorna o hash"""
+    if not pdf_bytes:
+        return None
+    pdf_hash = hash_pdf(pdf_bytes)
+    conn.execute("INSERT OR IGNORE INTO pdfs (hash, dados, tamanho) VALUES (?, ?, ?)",
+                 (pdf_hash, pdf_bytes, len(pdf_bytes)))
+    return pdf_hash
+
+def remover_pdf_orfao(conn, pdf_hash):
+    """Apaga o PDF se nenhuma música o referencia mais"""
+    if pdf_hash:
+        conn.execute(
+            "DELETE FROM pdfs WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM musicas WHERE pdf_hash = ?)",
+            (pdf_hash, pdf_hash)
+        )
+
+def _hash_da_musica(conn, music_id):
+    row = conn.execute("SELECT pdf_hash FROM musicas WHERE id=?", (music_id,)).fetchone()
+    return row[0] if row else None
+
+# ------------------ BUSCA TEXTUAL (FTS5) ------------------
+# Índice de texto completo sobre título, artista, tonalidade e letra.
+# remove_diacritics faz "do" encontrar "Dó"; '#' faz parte do token para "C#", "F#"...
+FTS_TOKENIZER = "unicode61 remove_diacritics 2 tokenchars '#'"
+FTS_COLUNAS = ("titulo", "artista", "tonalidade", "texto_original")
+# Pesos do bm25 por coluna: um acerto no título vale mais que um na letra
+FTS_PESOS = "10.0, 5.0, 2.0, 1.0"
+MARCA_INICIO = "«"
+MARCA_FIM = "»"
+
+FTS_DISPONIVEL = True
+
+def criar_indice_fts(cur):
+    """Cria a tabela FTS5 e os triggers que a mantêm em sincronia com musicas"""
+    global FTS_DISPONIVEL
+    existe = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='musicas_fts'"
+    ).fetchone()
+    try:
+        cur.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS musicas_fts USING fts5(
+                titulo, artista, tonalidade, texto_original,
+                content='musicas', content_rowid='id',
+                tokenize="{FTS_TOKENIZER}", prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite compilado sem FTS5: a busca cai no LIKE
+        FTS_DISPONIVEL = False
+        return
+    FTS_DISPONIVEL = True
+
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS musicas_fts_ai AFTER INSERT ON musicas BEGIN
+            INSERT INTO musicas_fts(rowid, titulo, artista, tonalidade, texto_original)
+            VALUES (new.id, new.titulo, new.artista, new.tonalidade, new.texto_original);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS musicas_fts_ad AFTER DELETE ON musicas BEGIN
+            INSERT INTO musicas_fts(musicas_fts, rowid, titulo, artista, tonalidade, texto_original)
+            VALUES ('delete', old.id, old.titulo, old.artista, old.tonalidade, old.texto_original);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS musicas_fts_au AFTER UPDATE OF titulo, artista, tonalidade, texto_original ON musicas BEGIN
+            INSERT INTO musicas_fts(musicas_fts, rowid, titulo, artista, tonalidade, texto_original)
+            VALUES ('delete', old.id, old.titulo, old.artista, old.tonalidade, old.texto_original);
+            INSERT INTO musicas_fts(rowid, titulo, artista, tonalidade, texto_original)
+            VALUES (new.id, new.titulo, new.artista, new.tonalidade, new.texto_original);
+        END
+    """)
+
+    # Banco que já tinha músicas antes do índice existir
+    if not existe:
+        cur.execute("INSERT INTO musicas_fts(musicas_fts) VALUES ('rebuild')")
+
+def montar_consulta_fts(termo, campo=None):
+    """Converte o texto digitado em uma expressão MATCH com prefixo em cada palavra"""
+    palavras = [p.replace('"', '""') for p in termo.split()]
+    if not palavras:
+        return None
+    expressao = " ".join(f'"{p}"*' for p in palavras)
+    if campo in FTS_COLUNAS:
+        return f"{campo} : ({expressao})"
+    return expressao
+
+# ------------------ MIGRAÇÕES ------------------
+# O schema evolui por passos numerados; PRAGMA user_version guarda o último
+# aplicado. Cada passo é (versao, descricao, aplicar, lote):
+#   aplicar(cur) faz a DDL e roda em uma transação junto com a troca de versão;
+#   lote(conn), opcional, converte dados de tabelas grandes aos poucos: é chamado
+#   em transações curtas até devolver 0, e só então a versão é gravada. Assim o
+#   banco nunca fica travado pela conversão inteira e uma interrupção retoma do
+#   ponto em que parou. Os passos são idempotentes, porque bancos anteriores ao
+#   controle de versão (user_version 0) já podem ter parte do schema.
+# Para mudar o schema: acrescentar um passo no fim, nunca alterar os existentes.
+def mover_lote_pdfs(conn):
+    """Move um lote dos BLOBs legados de musicas.pdf para a tabela pdfs; retorna quantos moveu"""
+    rows = conn.execute(
+        "SELECT id, pdf FROM musicas WHERE pdf IS NOT NULL LIMIT ?", (LOTE_MIGRACAO,)
+    ).fetchall()
+    for music_id, pdf_bytes in rows:
+        conn.execute("UPDATE musicas SET pdf_hash=?, pdf=NULL WHERE id=?",
+                     (salvar_pdf(conn, pdf_bytes), music_id))
+    return len(rows)
+
+def remover_associacoes_orfas(cur):
+    # Exclusões feitas com as chaves estrangeiras desligadas deixavam associações para trás
+    cur.execute("""
+        DELETE FROM musica_grupo
+        WHERE musica_id NOT IN (SELECT id FROM musicas) OR grupo_id NOT IN (SELECT id FROM grupos)
+    """)
+
+MIGRACOES = (
+    (1, "tabelas e índices básicos", criar_tabelas, None),
+    (2, "índices compostos da tela", criar_indices_compostos, None),
+    (3, "busca textual (FTS5)", criar_indice_fts, None),
+    (4, "parâmetros de renderização", criar_colunas_render, None),
+    (5, "PDFs endereçados por hash", criar_blobstore, mover_lote_pdfs),
+    (6, "associações órfãs", remover_associacoes_orfas, None),
+)
+VERSAO_SCHEMA = MIGRACOES[-1][0]
+
+def versao_schema(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def _em_transacao(conn, funcao, *args):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        resultado = funcao(*args)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return resultado
+
+def migrar(conn, progresso=None):
+    """Aplica, em ordem, os passos de MIGRACOES acima da versão do banco.
+
+    conn deve ter isolation_level=None. progresso(versao, descricao, linhas) é
+    chamado a cada lote convertido. Retorna o total de linhas convertidas em lote.
+    """
+    atual = versao_schema(conn)
+    convertidas = 0
+    for versao, descricao, aplicar, lote in MIGRACOES:
+        if versao <= atual:
+            continue
+
+        def passo():
+            aplicar(conn.cursor())
+            if lote is None:
+                conn.execute(f"PRAGMA user_version = {versao}")
+        _em_transacao(conn, passo)
+
+        if lote is not None:
+            linhas = 0
+            while True:
+                quantidade = _em_transacao(conn, lote, conn)
+                if not quantidade:
+                    break
+                linhas += quantidade
+                if progresso:
+                    progresso(versao, descricao, linhas)
+            convertidas += linhas
+            conn.execute(f"PRAGMA user_version = {versao}")
+    return convertidas
+
+# ------------------ REFINAMENTO EM MEMÓRIA ------------------
+# Quando o termo digitado só estende o anterior, o novo resultado é um
+# subconjunto do atual e pode ser filtrado sem ir ao banco. O filtro reproduz o
+# MATCH acima (tokenizer unicode61 sem acentos, '#' como parte do token, prefixo
+# em cada palavra) ou o LIKE do fallback, sobre as colunas presentes nas linhas.
+COLUNAS_LINHA = {"titulo": 1, "artista": 2, "tonalidade": 3}
+_RE_TOKEN = re.compile(r"(?:[^\W_]|#)+")
+
+def tokenizar(texto):
+    """Tokens como o unicode61 com remove_diacritics os produz"""
+    sem_acentos = "".join(c for c in unicodedata.normalize("NFD", texto or "")
+                          if unicodedata.category(c) != "Mn")
+    return _RE_TOKEN.findall(sem_acentos.casefold())
+
+def _contem_frase(tokens, frase):
+    # A frase casa em posições consecutivas; a última palavra é prefixo
+    ultimo = len(frase) - 1
+    for inicio in range(len(tokens) - ultimo):
+        if all(tokens[inicio + i] == frase[i] for i in range(ultimo)) \
+                and tokens[inicio + ultimo].startswith(frase[ultimo]):
+            return True
+    return False
+
+# O LIKE do SQLite só ignora maiúsculas de A a Z ("É" não casa com "é") e o termo
+# vai sem ESCAPE, então '%' e '_' digitados continuam sendo curingas
+_MINUSCULAS_ASCII = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def _filtro_like(termo, indice):
+    """Predicado equivalente a coluna LIKE '%termo%'"""
+    if not termo:
+        return lambda linha: True
+    padrao = "".join(".*" if c == "%" else "." if c == "_" else re.escape(c)
+                     for c in termo.translate(_MINUSCULAS_ASCII))
+    regex = re.compile(padrao, re.DOTALL)
+    return lambda linha: linha[indice] is not None \
+        and regex.search(linha[indice].translate(_MINUSCULAS_ASCII)) is not None
+
+def criar_filtro_local(termo, campo):
+    """Predicado linha -> bool equivalente à busca de termo em campo, ou None se
+    a busca depende de colunas que não estão na linha (letra, todos os campos)"""
+    indice = COLUNAS_LINHA.get(campo)
+    if indice is None:
+        return None
+
+    termo = (termo or "").strip()
+    if not FTS_DISPONIVEL:
+        return _filtro_like(termo, indice)
+
+    # Palavras sem nenhum token (ex.: "-") viram frases vazias: o FTS5 as ignora,
+    # mas uma consulta só com elas não casa com nada
+    frases = [frase for frase in (tokenizar(p) for p in termo.split()) if frase]
+    if not frases:
+        return lambda linha: False
+
+    def filtro(linha):
+        tokens = tokenizar(linha[indice])
+        return all(_contem_frase(tokens, frase) for frase in frases)
+    return filtro
+
+# ------------------ GRUPOS POR MÚSICA ------------------
+# Subconsulta correlacionada que agrega os grupos de cada música em JSON,
+# permitindo montar a lista inteira (com os chips de grupo) em uma só consulta.
+SQL_GRUPOS_JSON = """
+    (SELECT json_group_array(json_array(gid, gnome, gcor)) FROM (
+        SELECT g.id AS gid, g.nome AS gnome, g.cor AS gcor
+        FROM musica_grupo mg
+        JOIN grupos g ON g.id = mg.grupo_id
+        WHERE mg.musica_id = m.id
+        ORDER BY g.nome
+    ))
+"""
+
+def _decodificar_grupo(valor):
+    """Converte a coluna JSON de grupos em lista de tuplas (id, nome, cor)"""
+    return [tuple(g) for g in json.loads(valor)] if valor != "[]" else []
+
+# ------------------ FUNÇÕES DE GRUPOS ------------------
+def fetch_all_grupos():
+    return cache_metadados.grupos_ordenados()
+
+def criar_grupo(nome, cor="#1f6aa5", descricao=""):
+    try:
+        with cache_metadados.alteracao():
+            with transacao() as conn:
+                cur = conn.execute("INSERT INTO grupos (nome, cor, descricao) VALUES (?, ?, ?)", (nome, cor, descricao))
+            cache_metadados.grupo_salvo(cur.lastrowid, nome, cor)
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def atualizar_grupo(grupo_id, nome, cor, descricao):
+    try:
+        with cache_metadados.alteracao():
+            with transacao() as conn:
+                conn.execute("UPDATE grupos SET nome=?, cor=?, descricao=? WHERE id=?", (nome, cor, descricao, grupo_id))
+            cache_metadados.grupo_salvo(grupo_id, nome, cor)
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def excluir_grupo(grupo_id):
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            conn.execute("DELETE FROM grupos WHERE id = ?", (grupo_id,))
+        cache_metadados.grupo_removido(grupo_id)
+
+def _acao_grupo(conn, grupo_id, presente):
+    row = conn.execute("SELECT nome FROM grupos WHERE id = ?", (grupo_id,)).fetchone()
+    return f"{'Adicionada ao' if presente else 'Removida do'} grupo {row[0] if row else ''}"
+
+def adicionar_musica_ao_grupo(musica_id, grupo_id):
+    try:
+        with cache_metadados.alteracao():
+            with transacao() as conn:
+                conn.execute("INSERT INTO musica_grupo (musica_id, grupo_id) VALUES (?, ?)", (musica_id, grupo_id))
+                registrar_historico(musica_id, _acao_grupo(conn, grupo_id, True), conn)
+            cache_metadados.associacao_alterada(musica_id, grupo_id, True)
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def remover_musica_do_grupo(musica_id, grupo_id):
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            cur = conn.execute("DELETE FROM musica_grupo WHERE musica_id = ? AND grupo_id = ?", (musica_id, grupo_id))
+            if cur.rowcount:
+                registrar_historico(musica_id, _acao_grupo(conn, grupo_id, False), conn)
+        cache_metadados.associacao_alterada(musica_id, grupo_id, False)
+
+def fetch_musicas_do_grupo(grupo_id):
+    cur = get_conexao().execute("""
+        SELECT m.id, m.titulo, m.artista, m.tonalidade, m.favorito
+        FROM musicas m
+        JOIN musica_grupo mg ON m.id = mg.musica_id
+        WHERE mg.grupo_id = ?
+        ORDER BY m.titulo
+    """, (grupo_id,))
+    return cur.fetchall()
+
+def fetch_grupos_da_musica(musica_id):
+    return cache_metadados.grupos_da_musica(musica_id)
+
+# ------------------ ASSOCIAÇÕES EM MASSA ------------------
+# Seleções de milhares de músicas: uma única transação com executemany, em vez de
+# uma transação por música. A diferença contra os membros atuais do grupo é feita
+# em memória (uma leitura pelo índice grupo_id), o que dá as contagens e permite
+# registrar o histórico e atualizar o cache só do que mudou.
+def _membros_do_grupo(conn, grupo_id):
+    return {row[0] for row in conn.execute("SELECT musica_id FROM musica_grupo WHERE grupo_id = ?", (grupo_id,))}
+
+def _existentes(conn, musica_ids):
+    return {row[0] for row in conn.execute(
+        "SELECT id FROM musicas WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(musica_ids),))}
+
+def _adicionar_ao_grupo(conn, musica_ids, grupo_id):
+    """Retorna (ids adicionados, quantidade que já estava no grupo, ids inexistentes)"""
+    if conn.execute("SELECT 1 FROM grupos WHERE id = ?", (grupo_id,)).fetchone() is None:
+        raise ValueError(f"Grupo inexistente: {grupo_id}")
+    membros = _membros_do_grupo(conn, grupo_id)
+    pedidos = list(dict.fromkeys(musica_ids))
+    ja_presentes = sum(1 for m in pedidos if m in membros)
+    # Ids de músicas que não existem ficam de fora (a chave estrangeira recusaria o
+    # lote inteiro) e são devolvidos para quem chamou poder avisar
+    fora = [m for m in pedidos if m not in membros]
+    existentes = _existentes(conn, fora)
+    novos = [m for m in fora if m in existentes]
+    inexistentes = [m for m in fora if m not in existentes]
+    conn.executemany("INSERT OR IGNORE INTO musica_grupo (musica_id, grupo_id) VALUES (?, ?)",
+                     ((m, grupo_id) for m in novos))
+    acao = _acao_grupo(conn, grupo_id, True)
+    with BufferHistorico(conn) as historico:
+        for m in novos:
+            historico.registrar(m, acao)
+    return novos, ja_presentes, inexistentes
+
+def _remover_do_grupo(conn, musica_ids, grupo_id):
+    """Retorna (ids removidos, quantidade que não estava no grupo, ids inexistentes)"""
+    membros = _membros_do_grupo(conn, grupo_id)
+    pedidos = list(dict.fromkeys(musica_ids))
+    removidos = [m for m in pedidos if m in membros]
+    fora = [m for m in pedidos if m not in membros]
+    existentes = _existentes(conn, fora)
+    inexistentes = [m for m in fora if m not in existentes]
+    conn.executemany("DELETE FROM musica_grupo WHERE musica_id = ? AND grupo_id = ?",
+                     ((m, grupo_id) for m in removidos))
+    acao = _acao_grupo(conn, grupo_id, False)
+    with BufferHistorico(conn) as historico:
+        for m in removidos:
+            historico.registrar(m, acao)
+    return removidos, len(existentes), inexistentes
+
+def adicionar_musicas_ao_grupo(musica_ids, grupo_id):
+    """Adiciona as músicas ao grupo em uma transação.
+
+    Retorna (adicionadas, ja_presentes, inexistentes); inexistentes é a lista dos
+    ids que não correspondem a nenhuma música.
+    """
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            novos, ja_presentes, inexistentes = _adicionar_ao_grupo(conn, musica_ids, grupo_id)
+        for m in novos:
+            cache_metadados.associacao_alterada(m, grupo_id, True)
+    return len(novos), ja_presentes, inexistentes
+
+def remover_musicas_do_grupo(musica_ids, grupo_id):
+    """Remove as músicas do grupo em uma transação.
+
+    Retorna (removidas, ausentes, inexistentes); ausentes conta as músicas que
+    existem mas não estavam no grupo.
+    """
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            removidos, ausentes, inexistentes = _remover_do_grupo(conn, musica_ids, grupo_id)
+        for m in removidos:
+            cache_metadados.associacao_alterada(m, grupo_id, False)
+    return len(removidos), ausentes, inexistentes
+
+def mover_musicas_de_grupo(musica_ids, origem_id, destino_id):
+    """Tira as músicas de origem e as coloca em destino, na mesma transação.
+
+    Só as músicas que estavam em origem são movidas. Retorna
+    (movidas, fora_da_origem, inexistentes).
+    """
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            removidos, fora_da_origem, inexistentes = _remover_do_grupo(conn, musica_ids, origem_id)
+            novos, _, _ = _adicionar_ao_grupo(conn, removidos, destino_id)
+        for m in removidos:
+            cache_metadados.associacao_alterada(m, origem_id, False)
+        for m in novos:
+            cache_metadados.associacao_alterada(m, destino_id, True)
+    return len(removidos), fora_da_origem, inexistentes
+
+# ------------------ HISTÓRICO ------------------
+# Cada ação é gravada na mesma transação da alteração que a originou. Operações
+# em massa usam BufferHistorico, que junta os registros e grava em lotes.
+# compactar_historico aplica a retenção para a tabela não crescer sem limite.
+LOTE_HISTORICO = 500
+HISTORICO_DIAS = 365
+HISTORICO_MAX = 5000
+
+def registrar_historico(musica_id, acao, conn=None):
+    """Registra uma ação; se conn for passada, usa a transação em andamento"""
+    if conn is not None:
+        conn.execute("INSERT INTO historico (musica_id, acao) VALUES (?, ?)", (musica_id, acao))
+        return
+    with cache_metadados.alteracao(), transacao() as conn:
+        conn.execute("INSERT INTO historico (musica_id, acao) VALUES (?, ?)", (musica_id, acao))
+
+
+class BufferHistorico:
+    """Acumula registros de histórico e grava com executemany a cada `tamanho`.
+
+    Com conn, grava dentro da transação em andamento (o histórico entra ou sai
+    junto com a alteração); sem conn, cada lote é uma transação própria. Como
+    context manager, grava o restante ao sair.
+    """
+
+    def __init__(self, conn=None, tamanho=LOTE_HISTORICO):
+        self.conn = conn
+        self.tamanho = tamanho
+        self._pendentes = []
+
+    def registrar(self, musica_id, acao):
+        self._pendentes.append((musica_id, acao))
+        if len(self._pendentes) >= self.tamanho:
+            self.gravar()
+
+    def gravar(self):
+        if not self._pendentes:
+            return
+        sql = "INSERT INTO historico (musica_id, acao) VALUES (?, ?)"
+        if self.conn is not None:
+            self.conn.executemany(sql, self._pendentes)
+        else:
+            with cache_metadados.alteracao(), transacao() as conn:
+                conn.executemany(sql, self._pendentes)
+        self._pendentes.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        # Dentro de uma transação que falhou não há o que gravar: ela será desfeita
+        if tipo is None or self.conn is None:
+            self.gravar()
+
+
+def compactar_historico(dias=HISTORICO_DIAS, maximo=HISTORICO_MAX):
+    """Aplica a retenção do histórico e retorna quantos registros foram apagados.
+
+    Apaga ações repetidas da mesma música no mesmo dia (fica a mais recente),
+    registros com mais de `dias` dias e o que passar dos `maximo` mais recentes.
+    A exclusão é feita em lotes curtos para não travar o banco.
+    """
+    ids = [row[0] for row in get_conexao().execute("""
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY musica_id, acao, date(data) ORDER BY data DESC, id DESC
+            ) AS ordem
+            FROM historico
+            WHERE musica_id IS NOT NULL
+        ) WHERE ordem > 1
+        UNION
+        SELECT id FROM historico WHERE data < datetime('now', ?)
+        UNION
+        SELECT id FROM (SELECT id FROM historico ORDER BY data DESC, id DESC LIMIT -1 OFFSET ?)
+    """, (f"-{int(dias)} days", int(maximo)))]
+
+    for inicio in range(0, len(ids), LOTE_HISTORICO):
+        with cache_metadados.alteracao(), transacao() as conn:
+            conn.executemany("DELETE FROM historico WHERE id = ?",
+                             ((i,) for i in ids[inicio:inicio + LOTE_HISTORICO]))
+    return len(ids)
+
+def fetch_historico_recente(limite=10):
+    cur = get_conexao().execute("""
+        SELECT h.id, m.titulo, h.acao, h.data
+        FROM historico h
+        LEFT JOIN musicas m ON h.musica_id = m.id
+        ORDER BY h.data DESC
+        LIMIT ?
+    """, (limite,))
+    return cur.fetchall()
+
+# ------------------ FAVORITOS ------------------
+def toggle_favorito(musica_id):
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            conn.execute("UPDATE musicas SET favorito = NOT favorito WHERE id = ?", (musica_id,))
+        cache_metadados.favorito_alternado(musica_id)
+
+# ------------------ FUNÇÕES DE BANCO ------------------
+def fetch_all_musicas(ordenar_por="data", ordem="DESC", apenas_favoritos=False):
+    order_field = {
+        "data": "data_criacao",
+        "titulo": "titulo",
+        "artista": "artista",
+        "tonalidade": "tonalidade"
+    }.get(ordenar_por, "data_criacao")
+
+    where_clause = "WHERE favorito = 1" if apenas_favoritos else ""
+
+    query = f"SELECT id, titulo, artista, tonalidade, favorito FROM musicas {where_clause} ORDER BY {order_field} {ordem}"
+    return get_conexao().execute(query).fetchall()
+
+def fetch_pdf(music_id):
+    row = get_conexao().execute("""
+        SELECT COALESCE(p.dados, m.pdf)
+        FROM musicas m
+        LEFT JOIN pdfs p ON p.hash = m.pdf_hash
+        WHERE m.id=?
+    """, (music_id,)).fetchone()
+    return row[0] if row else None
+
+def fetch_musica(music_id):
+    cur = get_conexao().execute(
+        "SELECT titulo, artista, tonalidade, texto_original FROM musicas WHERE id=?", (music_id,)
+    )
+    return cur.fetchone()
+
+def fetch_dados_render(music_id):
+    """Tudo o que é preciso para (re)gerar o PDF de uma música"""
+    cur = get_conexao().execute("""
+        SELECT titulo, artista, tonalidade, texto_original,
+               tamanho_fonte, incluir_cabecalho, incluir_numero_pagina
+        FROM musicas WHERE id=?
+    """, (music_id,))
+    return cur.fetchone()
+
+def fetch_estado_render(music_id):
+    """Retorna (render_hash, tem_pdf) do PDF armazenado da música"""
+    cur = get_conexao().execute(
+        "SELECT render_hash, pdf_hash IS NOT NULL OR pdf IS NOT NULL FROM musicas WHERE id=?", (music_id,)
+    )
+    row = cur.fetchone()
+    return (row[0], bool(row[1])) if row else (None, False)
+
+def insert_music(titulo, artista, tonalidade, pdf_bytes, texto_original="",
+                 tamanho_fonte=11, incluir_cabecalho=True, incluir_numero_pagina=True,
+                 fonte=None, render_hash=None):
+    """Insere uma música; pdf_bytes pode ser None no modo de renderização sob demanda"""
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            cur = conn.execute("""
+                INSERT INTO musicas (titulo, artista, tonalidade, pdf_hash, texto_original,
+                                     tamanho_fonte, incluir_cabecalho, incluir_numero_pagina,
+                                     fonte, render_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (titulo, artista, tonalidade, salvar_pdf(conn, pdf_bytes), texto_original,
+                  tamanho_fonte, incluir_cabecalho, incluir_numero_pagina,
+                  fonte, render_hash if pdf_bytes else None))
+            music_id = cur.lastrowid
+
+            # Registrar no histórico
+            registrar_historico(music_id, "Criação", conn)
+        cache_metadados.musica_inserida(music_id, titulo, artista, tonalidade)
+
+    return music_id
+
+def insert_musicas_em_lote(musicas, fonte=None):
+    """Insere em uma única transação uma lista de
+    (titulo, artista, tonalidade, pdf_bytes, texto_original, render_hash); retorna os ids"""
+    ids = []
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            for titulo, artista, tonalidade, pdf_bytes, texto_original, render_hash in musicas:
+                cur = conn.execute("""
+                    INSERT INTO musicas (titulo, artista, tonalidade, pdf_hash, texto_original, fonte, render_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (titulo, artista, tonalidade, salvar_pdf(conn, pdf_bytes), texto_original,
+                      fonte, render_hash if pdf_bytes else None))
+                ids.append(cur.lastrowid)
+            with BufferHistorico(conn) as historico:
+                for music_id in ids:
+                    historico.registrar(music_id, "Criação")
+        for music_id, musica in zip(ids, musicas):
+            cache_metadados.musica_inserida(music_id, *musica[:3])
+    return ids
+
+def fetch_chaves_musicas():
+    """Conjunto (titulo, artista) normalizado de todas as músicas, para detectar duplicadas"""
+    cur = get_conexao().execute("SELECT titulo, IFNULL(artista, '') FROM musicas")
+    return {(titulo.strip().casefold(), artista.strip().casefold()) for titulo, artista in cur}
+
+def update_music(music_id, titulo, artista, tonalidade, pdf_bytes=None, texto_original="",
+                 tamanho_fonte=None, incluir_cabecalho=None, incluir_numero_pagina=None,
+                 invalidar_pdf=False, fonte=None, render_hash=None):
+    """Atualiza uma música.
+
+    Sem pdf_bytes o PDF armazenado (e seu render_hash) é mantido, a menos que
+    invalidar_pdf seja True (o PDF antigo ficou desatualizado e será gerado ao abrir).
+    Parâmetros de renderização None mantêm o valor atual.
+    """
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            if pdf_bytes or invalidar_pdf:
+                hash_antigo = _hash_da_musica(conn, music_id)
+                conn.execute(
+                    "UPDATE musicas SET titulo=?, artista=?, tonalidade=?, pdf_hash=?, pdf=NULL, render_hash=?, texto_original=?, data_modificacao=CURRENT_TIMESTAMP WHERE id=?",
+                    (titulo, artista, tonalidade, salvar_pdf(conn, pdf_bytes),
+                     render_hash if pdf_bytes else None, texto_original, music_id)
+                )
+                remover_pdf_orfao(conn, hash_antigo)
+            else:
+                conn.execute(
+                    "UPDATE musicas SET titulo=?, artista=?, tonalidade=?, texto_original=?, data_modificacao=CURRENT_TIMESTAMP WHERE id=?",
+                    (titulo, artista, tonalidade, texto_original, music_id)
+                )
+            conn.execute("""
+                UPDATE musicas SET
+                    tamanho_fonte = COALESCE(?, tamanho_fonte),
+                    incluir_cabecalho = COALESCE(?, incluir_cabecalho),
+                    incluir_numero_pagina = COALESCE(?, incluir_numero_pagina),
+                    fonte = COALESCE(?, fonte)
+                WHERE id=?
+            """, (tamanho_fonte, incluir_cabecalho, incluir_numero_pagina, fonte, music_id))
+
+            # Registrar no histórico
+            registrar_historico(music_id, "Edição", conn)
+        cache_metadados.musica_atualizada(music_id, titulo, artista, tonalidade)
+
+def delete_music(music_id):
+    with cache_metadados.alteracao():
+        with transacao() as conn:
+            # Registrar no histórico antes de excluir
+            registrar_historico(music_id, "Exclusão", conn)
+            pdf_hash = _hash_da_musica(conn, music_id)
+            conn.execute("DELETE FROM musicas WHERE id=?", (music_id,))
+            remover_pdf_orfao(conn, pdf_hash)
+        cache_metadados.musica_removida(music_id)
+
+# ------------------ CONSULTA UNIFICADA ------------------
+# Expressões de ordenação aceitas; IFNULL mantém a ordem estável para colunas opcionais
+# e casa com os índices de expressão criados em init_db.
+ORDENACOES = {
+    "data": "m.data_criacao",
+    "data_criacao": "m.data_criacao",
+    "titulo": "m.titulo",
+    "artista": "IFNULL(m.artista, '')",
+    "tonalidade": "IFNULL(m.tonalidade, '')",
+}
+
+def _montar_filtros(grupo_id=None, apenas_favoritos=False, campo=None, termo=""):
+    """Monta FROM/WHERE e parâmetros para a combinação de filtros da tela.
+
+    Retorna (from_sql, where_sql, params, usa_fts).
+    """
+    tabelas = ["musicas m"]
+    condicoes = []
+    params = []
+    usa_fts = False
+
+    termo = (termo or "").strip()
+    if termo:
+        if FTS_DISPONIVEL:
+            consulta = montar_consulta_fts(termo, campo)
+            tabelas.insert(0, "musicas_fts")
+            tabelas[1] = "JOIN musicas m ON m.id = musicas_fts.rowid"
+            condicoes.append("musicas_fts MATCH ?")
+            params.append(consulta)
+            usa_fts = True
+        else:
+            colunas = [campo] if campo in FTS_COLUNAS else list(FTS_COLUNAS)
+            condicoes.append("(" + " OR ".join(f"m.{c} LIKE ?" for c in colunas) + ")")
+            params.extend(f"%{termo}%" for _ in colunas)
+
+    if grupo_id:
+        tabelas.append("JOIN musica_grupo mg ON mg.musica_id = m.id")
+        condicoes.append("mg.grupo_id = ?")
+        params.append(grupo_id)
+
+    if apenas_favoritos:
+        condicoes.append("m.favorito = 1")
+
+    where_sql = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return " ".join(tabelas), where_sql, params, usa_fts
+
+def _consultar(grupo_id, apenas_favoritos, campo, termo, ordenar_por, ordem,
+               limite=None, apos=None, deslocamento=0):
+    """Executa a consulta da tela; retorna (linhas, chave de ordenação da última linha)"""
+    from_sql, where_sql, params, usa_fts = _montar_filtros(grupo_id, apenas_favoritos, campo, termo)
+
+    ordem = "ASC" if str(ordem).upper() == "ASC" else "DESC"
+    relevancia = ordenar_por == "relevancia" and usa_fts
+    if relevancia:
+        chave_sql = "NULL"
+        order_sql = f"bm25(musicas_fts, {FTS_PESOS}), m.id"
+    else:
+        chave_sql = ORDENACOES.get(ordenar_por, "m.data_criacao")
+        order_sql = f"{chave_sql} {ordem}, m.id {ordem}"
+
+    # Keyset: continua a partir da última (chave, id) vista, sem OFFSET
+    if apos is not None and not relevancia:
+        comparador = ">" if ordem == "ASC" else "<"
+        where_sql = f"{where_sql} AND" if where_sql else "WHERE"
+        where_sql += f" ({chave_sql}, m.id) {comparador} (?, ?)"
+        params.extend(apos)
+
+    limite_sql = ""
+    if limite:
+        limite_sql = "LIMIT ? OFFSET ?"
+        params.extend((limite, deslocamento if relevancia else 0))
+
+    # A página é escolhida só com ids e a chave de ordenação; o trecho da letra e
+    # os grupos (caros: snippet() e uma subconsulta por linha) são calculados
+    # depois, apenas para as linhas da página, e não para todo o resultado
+    ordem_sql = "p.chave, p.id" if relevancia else f"p.chave {ordem}, p.id {ordem}"
+    trecho_col, trecho_join = "NULL", ""
+    if usa_fts and campo in (None, "texto_original"):
+        trecho_col = f"snippet(musicas_fts, 3, '{MARCA_INICIO}', '{MARCA_FIM}', '…', 12)"
+        trecho_join = "LEFT JOIN musicas_fts ON musicas_fts.rowid = p.id AND musicas_fts MATCH ?"
+        params.append(montar_consulta_fts(termo.strip(), campo))
+
+    query = f"""
+        WITH p AS MATERIALIZED (
+            SELECT m.id AS id, {f"bm25(musicas_fts, {FTS_PESOS})" if relevancia else chave_sql} AS chave
+            FROM {from_sql}
+            {where_sql}
+            ORDER BY {order_sql}
+            {limite_sql}
+        )
+        SELECT m.id, m.titulo, m.artista, m.tonalidade, m.favorito, {SQL_GRUPOS_JSON}, {trecho_col}, p.chave
+        FROM p
+        JOIN musicas m ON m.id = p.id
+        {trecho_join}
+        ORDER BY {ordem_sql}
+    """
+    rows = get_conexao().execute(query, params).fetchall()
+    ultima = (rows[-1][7], rows[-1][0]) if rows else None
+    return [
+        (*row[:5], _decodificar_grupo(row[5]), row[6] if row[6] and MARCA_INICIO in row[6] else None)
+        for row in rows
+    ], ultima
+
+def consultar_musicas(grupo_id=None, apenas_favoritos=False, campo=None, termo="",
+                      ordenar_por="data_criacao", ordem="DESC", limite=None):
+    """Consulta única para qualquer combinação de grupo, favoritos, busca e ordenação.
+
+    campo restringe a busca a uma coluna ("titulo", "artista", "tonalidade",
+    "texto_original"); None busca em todas. ordenar_por aceita as chaves de
+    ORDENACOES ou "relevancia" (bm25, apenas com termo). Retorna linhas
+    (id, titulo, artista, tonalidade, favorito, grupos, trecho), onde trecho é o
+    pedaço da letra com os termos entre MARCA_INICIO/MARCA_FIM, ou None.
+    """
+    rows, _ = _consultar(grupo_id, apenas_favoritos, campo, termo, ordenar_por, ordem, limite)
+    return rows
+
+def contar_musicas(grupo_id=None, apenas_favoritos=False, campo=None, termo=""):
+    """Total de músicas para a mesma combinação de filtros de consultar_musicas"""
+    if not (termo or "").strip():
+        return cache_metadados.contar(grupo_id, apenas_favoritos)
+    from_sql, where_sql, params, _ = _montar_filtros(grupo_id, apenas_favoritos, campo, termo)
+    return get_conexao().execute(f"SELECT COUNT(*) FROM {from_sql} {where_sql}", params).fetchone()[0]
+
+# ------------------ PAGINAÇÃO ------------------
+TAMANHO_PAGINA = 200
+
+def paginar_musicas(grupo_id=None, apenas_favoritos=False, campo=None, termo="",
+                    ordenar_por="data_criacao", ordem="DESC", tamanho=TAMANHO_PAGINA, cursor=None):
+    """Retorna uma página de músicas usando cursor (keyset) em vez de OFFSET.
+
+    Na primeira chamada passe cursor=None; as seguintes recebem o cursor
+    devolvido pela anterior, com os mesmos filtros. Retorna
+    (linhas, proximo_cursor, total); proximo_cursor é None na última página.
+    O total é calculado só na primeira página e carregado no cursor.
+    """
+    if cursor is None:
+        total = contar_musicas(grupo_id, apenas_favoritos, campo, termo)
+        apos, deslocamento = None, 0
+    else:
+        total, apos, deslocamento = cursor
+
+    rows, ultima = _consultar(grupo_id, apenas_favoritos, campo, termo, ordenar_por, ordem,
+                              tamanho, apos, deslocamento)
+    proximo = None
+    if len(rows) == tamanho:
+        proximo = (total, ultima, deslocamento + len(rows))
+    return rows, proximo, total
+
+def iterar_musicas(tamanho=TAMANHO_PAGINA, **filtros):
+    """Percorre todas as músicas dos filtros página a página, sem carregar tudo em memória"""
+    cursor = None
+    while True:
+        rows, cursor, _ = paginar_musicas(tamanho=tamanho, cursor=cursor, **filtros)
+        yield from rows
+        if cursor is None:
+            break
+
+def buscar_musicas(termo, campo=None, apenas_favoritos=False, grupo_id=None, limite=None):
+    """Busca ranqueada por relevância no índice FTS5 (ver consultar_musicas)"""
+    return consultar_musicas(grupo_id, apenas_favoritos, campo, termo, "relevancia", limite=limite)
+
+# ------------------ RENDERIZAÇÃO EM LOTE ------------------
+def _filtro_lote_render(ids=None, grupo_id=None, apenas_com_pdf=True):
+    condicoes = []
+    params = []
+    if ids is not None:
+        condicoes.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(ids)))
+    if grupo_id:
+        condicoes.append("id IN (SELECT musica_id FROM musica_grupo WHERE grupo_id = ?)")
+        params.append(grupo_id)
+    if apenas_com_pdf:
+        condicoes.append("(pdf_hash IS NOT NULL OR pdf IS NOT NULL)")
+    return "".join(f" AND {c}" for c in condicoes), params
+
+def contar_lote_render(ids=None, grupo_id=None, apenas_com_pdf=True):
+    filtro, params = _filtro_lote_render(ids, grupo_id, apenas_com_pdf)
+    return get_conexao().execute(f"SELECT COUNT(*) FROM musicas WHERE 1=1{filtro}", params).fetchone()[0]
+
+def fetch_lote_render(apos_id=0, limite=200, ids=None, grupo_id=None, apenas_com_pdf=True):
+    """Próximo lote (por id crescente) com os dados de renderização e o render_hash atual"""
+    filtro, params = _filtro_lote_render(ids, grupo_id, apenas_com_pdf)
+    cur = get_conexao().execute(f"""
+        SELECT id, titulo, artista, tonalidade, texto_original,
+               tamanho_fonte, incluir_cabecalho, incluir_numero_pagina, render_hash
+        FROM musicas
+        WHERE id > ?{filtro}
+        ORDER BY id
+        LIMIT ?
+    """, [apos_id, *params, limite])
+    return cur.fetchall()
+
+def gravar_pdfs_renderizados(resultados, fonte=None):
+    """Grava em uma única transação uma lista de (music_id, pdf_bytes, render_hash)"""
+    # Não muda metadados; alteracao() só mantém a versão do cache em dia
+    with cache_metadados.alteracao(), transacao() as conn:
+        for music_id, pdf_bytes, render_hash in resultados:
+            hash_antigo = _hash_da_musica(conn, music_id)
+            conn.execute(
+                "UPDATE musicas SET pdf_hash=?, pdf=NULL, render_hash=?, fonte=COALESCE(?, fonte) WHERE id=?",
+                (salvar_pdf(conn, pdf_bytes), render_hash, fonte, music_id)
+            )
+            remover_pdf_orfao(conn, hash_antigo)
+
+def iterar_dados_render_grupo(grupo_id):
+    """Percorre as músicas do grupo (por título) com dados de renderização e estado do PDF.
+
+    Cada linha: (id, titulo, artista, tonalidade, texto_original, tamanho_fonte,
+    incluir_cabecalho, incluir_numero_pagina, render_hash, tem_pdf). Nenhum BLOB é lido.
+    """
+    cur = get_conexao().execute("""
+        SELECT m.id, m.titulo, m.artista, m.tonalidade, m.texto_original,
+               m.tamanho_fonte, m.incluir_cabecalho, m.incluir_numero_pagina, m.render_hash,
+               m.pdf_hash IS NOT NULL OR m.pdf IS NOT NULL
+        FROM musicas m
+        JOIN musica_grupo mg ON mg.musica_id = m.id
+        WHERE mg.grupo_id = ?
+        ORDER BY m.titulo, m.id
+    """, (grupo_id,))
+    yield from cur
+
+def get_music_stats():
+    """Totais da biblioteca, servidos pelo cache de metadados"""
+    return cache_metadados.estatisticas()
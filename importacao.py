@@ -0,0 +1,128 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from database import fetch_chaves_musicas, insert_musicas_em_lote
+from parser_importacao import interpretar_documento, remover_caracteres_invisiveis
+from pdf_render import gerar_pdf, chave_render_musica, FONT_NAME
+
+# ------------------ IMPORTAÇÃO DE DOCUMENTOS ------------------
+# Extração de texto de PDF/DOCX (a interpretação do texto fica em
+# parser_importacao). Fica fora da interface para ser usada tanto pelo diálogo
+# de importação quanto pela importação de pastas, que roda em um pool de processos.
+EXTENSOES = (".pdf", ".docx")
+TAMANHO_LOTE = 200
+
+
+def extrair_texto(path):
+    """Lê o texto de um arquivo PDF ou DOCX"""
+    if path.lower().endswith('.docx'):
+        from docx import Document
+        doc = Document(path)
+        partes = [paragraph.text for paragraph in doc.paragraphs]
+    else:
+        import PyPDF2
+        reader = PyPDF2.PdfReader(path)
+        partes = [texto for texto in (page.extract_text() for page in reader.pages) if texto]
+    # Cada parágrafo/página termina com uma quebra de linha
+    return "".join(parte + "\n" for parte in partes)
+
+
+# ------------------ IMPORTAÇÃO DE PASTAS ------------------
+def listar_documentos(diretorio):
+    """Percorre o diretório recursivamente, em ordem, devolvendo os PDF/DOCX"""
+    for raiz, pastas, arquivos in os.walk(diretorio):
+        pastas.sort()
+        for nome in sorted(arquivos):
+            if nome.lower().endswith(EXTENSOES) and not nome.startswith("~$"):
+                yield os.path.join(raiz, nome)
+
+
+def chave_duplicata(titulo, artista):
+    return (titulo or "").strip().casefold(), (artista or "").strip().casefold()
+
+
+def _processar(tarefa):
+    """Executado nos processos do pool: extrai, interpreta e (opcionalmente) renderiza um arquivo"""
+    caminho, renderizar = tarefa
+    try:
+        titulo, artista, tonalidade, letra = interpretar_documento(extrair_texto(caminho))
+        titulo = remover_caracteres_invisiveis(titulo)
+        if not titulo:
+            raise ValueError("Documento sem título.")
+        pdf_bytes = render_hash = None
+        if renderizar:
+            dados = (titulo, artista, tonalidade, letra, 11, True, True)
+            render_hash = chave_render_musica(dados)
+            pdf_bytes = gerar_pdf(*dados)
+        return caminho, (titulo, artista, tonalidade, pdf_bytes, letra, render_hash), None
+    except Exception as e:
+        return caminho, None, str(e) or type(e).__name__
+
+
+def importar_pasta(diretorio, renderizar=True, processos=None, tamanho_lote=TAMANHO_LOTE,
+                   progresso=None, cancelar=None):
+    """Importa todos os PDF/DOCX de diretorio (e subpastas).
+
+    A extração roda em um pool de processos e as músicas são gravadas em
+    transações de tamanho_lote. Documentos com título e artista já existentes
+    (no banco ou no próprio lote) são contados como duplicados. renderizar=False
+    não gera os PDFs (modo sob demanda). progresso(feitos, total, por_segundo)
+    é chamado a cada lote gravado; cancelar é um threading.Event. Retorna um
+    dicionário com total, importadas, duplicadas (caminhos), falhas
+    ((caminho, erro)), ids, segundos e cancelado.
+    """
+    caminhos = list(listar_documentos(diretorio))
+    total = len(caminhos)
+    processos = processos or max(1, (os.cpu_count() or 2) - 1)
+    existentes = fetch_chaves_musicas()
+
+    inicio = time.perf_counter()
+    ids, duplicadas, falhas = [], [], []
+    lote = []
+    feitos = 0
+    cancelado = False
+
+    def gravar():
+        if lote:
+            ids.extend(insert_musicas_em_lote(lote, FONT_NAME))
+            lote.clear()
+        if progresso:
+            decorrido = time.perf_counter() - inicio
+            progresso(feitos, total, feitos / decorrido if decorrido else 0.0)
+
+    if not caminhos:
+        return {"total": 0, "importadas": 0, "duplicadas": [], "falhas": [], "ids": [],
+                "segundos": 0.0, "cancelado": False}
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        tarefas = ((caminho, renderizar) for caminho in caminhos)
+        for caminho, musica, erro in pool.map(_processar, tarefas, chunksize=8):
+            feitos += 1
+            if erro:
+                falhas.append((caminho, erro))
+            else:
+                chave = chave_duplicata(musica[0], musica[1])
+                if chave in existentes:
+                    duplicadas.append(caminho)
+                else:
+                    existentes.add(chave)
+                    lote.append(musica)
+
+            if feitos % tamanho_lote == 0:
+                gravar()
+                if cancelar is not None and cancelar.is_set():
+                    cancelado = True
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    break
+        gravar()
+
+    return {
+        "total": total,
+        "importadas": len(ids),
+        "duplicadas": duplicadas,
+        "falhas": falhas,
+        "ids": ids,
+        "segundos": time.perf_counter() - inicio,
+        "cancelado": cancelado,
+    }
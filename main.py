@@ -3,488 +3,105 @@ import sys
 import sqlite3
 import tempfile
 import webbrowser
-import json
+import importlib.util
 import customtkinter as ctk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, Listbox
 from datetime import datetime
 from PIL import Image, ImageTk
 import threading
 import time
-
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from io import BytesIO
-
-try:
-    import PyPDF2
-    from docx import Document
-except ImportError:
-    messagebox.showerror("Erro", "Bibliotecas necessárias não instaladas. Instale com: pip install PyPDF2 python-docx")
-    exit()
+import multiprocessing
+
+from configuracao import config, save_config, DEFAULT_DB_FILE
+from biblioteca import (
+    obter_pdf, render_sob_demanda, salvar_nova_musica, salvar_edicao,
+    repositorio_backup, criar_backup_automatico, cancelar_backup_automatico,
+)
+from batch_render import renderizar_em_lote
+from backup import (
+    BackupCancelado, copiar_banco,
+    exportar_compactado, restaurar_compactado, eh_compactado,
+)
+from tarefas import ExecutorTarefas
+from importacao import extrair_texto, importar_pasta
+from parser_importacao import interpretar_documento, remover_caracteres_invisiveis
+from database import (
+    init_db, migracao_pendente, definir_banco, fechar_conexao,
+    fetch_all_grupos, criar_grupo, excluir_grupo,
+    adicionar_musica_ao_grupo, remover_musica_do_grupo, adicionar_musicas_ao_grupo,
+    fetch_musicas_do_grupo, fetch_grupos_da_musica,
+    fetch_historico_recente, toggle_favorito, compactar_historico, HISTORICO_DIAS, HISTORICO_MAX,
+    fetch_all_musicas, fetch_dados_render,
+    delete_music, paginar_musicas, TAMANHO_PAGINA, get_music_stats, criar_filtro_local,
+)
 
 # ------------------ CONFIGURAÇÃO ------------------
-CONFIG_FILE = "config.json"
-DB_DIR = "data"
-DEFAULT_DB_FILE = os.path.join(DB_DIR, "songpdf.db")
-BACKUP_DIR = "backups"
-
-# Registrar fontes Unicode para suporte a caracteres especiais
-try:
-    pdfmetrics.registerFont(TTFont('DejaVuSans', 'assets/fonts/DejaVuSans.ttf'))
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', 'assets/fonts/DejaVuSans-Bold.ttf'))
-    FONT_NAME = 'DejaVuSans'
-    FONT_NAME_BOLD = 'DejaVuSans-Bold'
-except:
-    # Fallback para fontes padrão
-    FONT_NAME = 'Helvetica'
-    FONT_NAME_BOLD = 'Helvetica-Bold'
-
-def load_config():
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except:
-                return {}
-    return {}
-
-def save_config(config: dict):
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
-
-config = load_config()
 DB_FILE = config.get("db_file", DEFAULT_DB_FILE)
 THEME = config.get("theme", "dark")
 ACCENT_COLOR = config.get("accent_color", "#1f6aa5")
 
-# ------------------ BACKUP AUTOMÁTICO ------------------
-def criar_backup_automatico():
-    """Cria backup automático do banco de dados"""
-    os.makedirs(BACKUP_DIR, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = os.path.join(BACKUP_DIR, f"songpdf_backup_{timestamp}.db")
-    
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        bkp = sqlite3.connect(backup_file)
-        conn.backup(bkp)
-        bkp.close()
-        conn.close()
-        
-        # Manter apenas os 5 backups mais recentes
-        backups = sorted([f for f in os.listdir(BACKUP_DIR) if f.startswith("songpdf_backup_")], reverse=True)
-        for old_backup in backups[5:]:
-            os.remove(os.path.join(BACKUP_DIR, old_backup))
-            
-    except Exception as e:
-        print(f"Erro no backup automático: {e}")
-
 # ------------------ BANCO ------------------
-def init_db(path):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    conn = sqlite3.connect(path)
-    cur = conn.cursor()
-    
-    # Tabela de músicas
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS musicas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            titulo TEXT NOT NULL,
-            artista TEXT,
-            tonalidade TEXT,
-            pdf BLOB,
-            texto_original TEXT,
-            data_criacao DATETIME DEFAULT CURRENT_TIMESTAMP,
-            data_modificacao DATETIME DEFAULT CURRENT_TIMESTAMP,
-            favorito BOOLEAN DEFAULT 0
-        )
-    """)
-    
-    # Tabela de grupos
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS grupos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL UNIQUE,
-            cor TEXT DEFAULT '#1f6aa5',
-            descricao TEXT
-        )
-    """)
-    
-    # Tabela de relação música-grupo
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS musica_grupo (
-            musica_id INTEGER,
-            grupo_id INTEGER,
-            PRIMARY KEY (musica_id, grupo_id),
-            FOREIGN KEY (musica_id) REFERENCES musicas (id) ON DELETE CASCADE,
-            FOREIGN KEY (grupo_id) REFERENCES grupos (id) ON DELETE CASCADE
-        )
-    """)
-    
-    # Tabela de histórico
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS historico (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            musica_id INTEGER,
-            acao TEXT,
-            data DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (musica_id) REFERENCES musicas (id) ON DELETE SET NULL
-        )
-    """)
-    
-    # Índices para melhor performance
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_titulo ON musicas(titulo)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_artista ON musicas(artista)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_data ON musicas(data_criacao)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_musicas_favorito ON musicas(favorito)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_historico_data ON historico(data)")
-    
-    conn.commit()
-    conn.close()
+def inicializar_banco(path):
+    """init_db; se o banco precisar ser convertido, mostra o andamento em uma janela.
+
+    A migração roda em uma thread e a janela só é atualizada até ela terminar,
+    então funciona tanto antes de a janela principal existir quanto depois.
+    """
+    if not migracao_pendente(path):
+        init_db(path)
+        return
+
+    janela = ctk.CTk()
+    janela.title("Atualizando banco de dados")
+    janela.geometry("420x120")
+    janela.resizable(False, False)
+    janela.protocol("WM_DELETE_WINDOW", lambda: None)  # uma interrupção só adiaria a migração
+    rotulo = ctk.CTkLabel(janela, text="Atualizando o banco de dados para esta versão...")
+    rotulo.pack(padx=20, pady=(20, 10))
+    barra = ctk.CTkProgressBar(janela, mode="indeterminate")
+    barra.pack(fill="x", padx=20)
+    barra.start()
+
+    estado = {"texto": None, "erro": None}
+
+    def progresso(versao, descricao, linhas):
+        estado["texto"] = f"{descricao}: {linhas} registros convertidos"
+
+    def migrar_banco():
+        try:
+            init_db(path, progresso)
+        except Exception as e:
+            estado["erro"] = e
+
+    trabalho = threading.Thread(target=migrar_banco, daemon=True)
+    trabalho.start()
+    while trabalho.is_alive():
+        if estado["texto"]:
+            rotulo.configure(text=estado["texto"])
+        janela.update()
+        time.sleep(0.05)
+    barra.stop()
+    janela.destroy()
+    if estado["erro"] is not None:
+        raise estado["erro"]
 
 def conectar_banco(path):
     try:
-        init_db(path)
+        inicializar_banco(path)
         # teste de conexão
         conn = sqlite3.connect(path)
         conn.execute("SELECT 1")
         conn.close()
         
         # Criar backup após conexão bem-sucedida
-        threading.Thread(target=criar_backup_automatico, daemon=True).start()
+        if config.get("backup_auto", True):
+            threading.Thread(target=criar_backup_automatico, args=(path,), daemon=True).start()
         
         return True
     except Exception as e:
         messagebox.showerror("Erro", f"Falha ao conectar ao banco:\n{e}")
         return False
 
-# inicializa banco padrão se ainda não existir
-init_db(DB_FILE)
-
-# ------------------ FUNÇÕES DE GRUPOS ------------------
-def fetch_all_grupos():
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("SELECT id, nome, cor FROM grupos ORDER BY nome")
-    rows = cur.fetchall()
-    conn.close()
-    return rows
-
-def criar_grupo(nome, cor="#1f6aa5", descricao=""):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO grupos (nome, cor, descricao) VALUES (?, ?, ?)", (nome, cor, descricao))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
-
-def atualizar_grupo(grupo_id, nome, cor, descricao):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    try:
-        cur.execute("UPDATE grupos SET nome=?, cor=?, descricao=? WHERE id=?", (nome, cor, descricao, grupo_id))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
-
-def excluir_grupo(grupo_id):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM grupos WHERE id = ?", (grupo_id,))
-    conn.commit()
-    conn.close()
-
-def adicionar_musica_ao_grupo(musica_id, grupo_id):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO musica_grupo (musica_id, grupo_id) VALUES (?, ?)", (musica_id, grupo_id))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
-
-def remover_musica_do_grupo(musica_id, grupo_id):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM musica_grupo WHERE musica_id = ? AND grupo_id = ?", (musica_id, grupo_id))
-    conn.commit()
-    conn.close()
-
-def fetch_musicas_do_grupo(grupo_id):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT m.id, m.titulo, m.artista, m.tonalidade, m.favorito
-        FROM musicas m
-        JOIN musica_grupo mg ON m.id = mg.musica_id
-        WHERE mg.grupo_id = ?
-        ORDER BY m.titulo
-    """, (grupo_id,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
-
-def fetch_grupos_da_musica(musica_id):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT g.id, g.nome, g.cor
-        FROM grupos g
-        JOIN musica_grupo mg ON g.id = mg.grupo_id
-        WHERE mg.musica_id = ?
-        ORDER BY g.nome
-    """, (musica_id,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
-
-# ------------------ HISTÓRICO ------------------
-def registrar_historico(musica_id, acao):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("INSERT INTO historico (musica_id, acao) VALUES (?, ?)", (musica_id, acao))
-    conn.commit()
-    conn.close()
-
-def fetch_historico_recente(limite=10):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT h.id, m.titulo, h.acao, h.data 
-        FROM historico h
-        LEFT JOIN musicas m ON h.musica_id = m.id
-        ORDER BY h.data DESC
-        LIMIT ?
-    """, (limite,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
-
-# ------------------ FAVORITOS ------------------
-def toggle_favorito(musica_id):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("UPDATE musicas SET favorito = NOT favorito WHERE id = ?", (musica_id,))
-    conn.commit()
-    conn.close()
-
-# ------------------ PDF ------------------
-def gerar_pdf(titulo, artista, tonalidade, letra, tamanho_fonte=11, incluir_cabecalho=True, incluir_numero_pagina=True):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    
-    # Configurações de fonte
-    c.setFont(FONT_NAME_BOLD, 16)
-    
-    # Calcular posição do título
-    titulo_width = c.stringWidth(titulo, FONT_NAME_BOLD, 16)
-    titulo_x = (width - titulo_width) / 2
-    
-    if incluir_cabecalho:
-        c.drawString(titulo_x, height - 50, titulo)
-        c.setFont(FONT_NAME, 12)
-        
-        # Formata a linha de artista e tonalidade
-        info_line = ""
-        if artista and tonalidade:
-            info_line = f"{artista} • {tonalidade}"
-        elif artista:
-            info_line = artista
-        elif tonalidade:
-            info_line = tonalidade
-        
-        if info_line:
-            info_width = c.stringWidth(info_line, FONT_NAME, 12)
-            info_x = (width - info_width) / 2
-            c.drawString(info_x, height - 70, info_line)
-        
-        y_position = height - 100
-    else:
-        y_position = height - 50
-    
-    # Preparar o texto da letra com o tamanho de fonte especificado
-    c.setFont(FONT_NAME, tamanho_fonte)
-    line_height = tamanho_fonte + 3
-    margin = 50
-    
-    # Manter as quebras de linha originais
-    lines = letra.splitlines()
-    
-    # Desenhar as linhas com quebra de página
-    page_number = 1
-    
-    for line in lines:
-        if y_position < 50:
-            c.showPage()
-            c.setFont(FONT_NAME, tamanho_fonte)
-            y_position = height - 50
-            page_number += 1
-            
-            # Adicionar número da página
-            if incluir_numero_pagina:
-                c.setFont(FONT_NAME, 9)
-                c.drawString(width - 50, 30, f"Página {page_number}")
-                c.setFont(FONT_NAME, tamanho_fonte)
-        
-        if line.strip():  
-            # Quebra de linha automática se a linha for muito longa
-            max_width = width - (2 * margin)
-            words = line.split()
-            current_line = ""
-            
-            for word in words:
-                test_line = current_line + word + " "
-                test_width = c.stringWidth(test_line, FONT_NAME, tamanho_fonte)
-                
-                if test_width > max_width and current_line != "":
-                    c.drawString(margin, y_position, current_line)
-                    y_position -= line_height
-                    current_line = word + " "
-                    
-                    if y_position < 50:
-                        c.showPage()
-                        c.setFont(FONT_NAME, tamanho_fonte)
-                        y_position = height - 50
-                        page_number += 1
-                        if incluir_numero_pagina:
-                            c.setFont(FONT_NAME, 9)
-                            c.drawString(width - 50, 30, f"Página {page_number}")
-                            c.setFont(FONT_NAME, tamanho_fonte)
-                else:
-                    current_line = test_line
-            
-            if current_line:
-                c.drawString(margin, y_position, current_line)
-            
-        y_position -= line_height
-    
-    c.save()
-    buffer.seek(0)
-    return buffer.read()
-
-# ------------------ FUNÇÕES DE BANCO ------------------
-def fetch_all_musicas(ordenar_por="data", ordem="DESC", apenas_favoritos=False):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    
-    order_field = {
-        "data": "data_criacao",
-        "titulo": "titulo",
-        "artista": "artista",
-        "tonalidade": "tonalidade"
-    }.get(ordenar_por, "data_criacao")
-    
-    where_clause = "WHERE favorito = 1" if apenas_favoritos else ""
-    
-    query = f"SELECT id, titulo, artista, tonalidade, favorito FROM musicas {where_clause} ORDER BY {order_field} {ordem}"
-    cur.execute(query)
-    rows = cur.fetchall()
-    conn.close()
-    return rows
-
-def fetch_pdf(music_id):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("SELECT pdf FROM musicas WHERE id=?", (music_id,))
-    row = cur.fetchone()
-    conn.close()
-    return row[0] if row else None
-
-def insert_music(titulo, artista, tonalidade, pdf_bytes, texto_original=""):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO musicas (titulo, artista, tonalidade, pdf, texto_original) VALUES (?, ?, ?, ?, ?)",
-        (titulo, artista, tonalidade, pdf_bytes, texto_original)
-    )
-    music_id = cur.lastrowid
-    conn.commit()
-    conn.close()
-    
-    # Registrar no histórico
-    registrar_historico(music_id, "Criação")
-    
-    return music_id
-
-def update_music(music_id, titulo, artista, tonalidade, pdf_bytes=None, texto_original=""):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    if pdf_bytes:
-        cur.execute(
-            "UPDATE musicas SET titulo=?, artista=?, tonalidade=?, pdf=?, texto_original=?, data_modificacao=CURRENT_TIMESTAMP WHERE id=?",
-            (titulo, artista, tonalidade, pdf_bytes, texto_original, music_id)
-        )
-    else:
-        cur.execute(
-            "UPDATE musicas SET titulo=?, artista=?, tonalidade=?, texto_original=?, data_modificacao=CURRENT_TIMESTAMP WHERE id=?",
-            (titulo, artista, tonalidade, texto_original, music_id)
-        )
-    conn.commit()
-    conn.close()
-    
-    # Registrar no histórico
-    registrar_historico(music_id, "Edição")
-
-def delete_music(music_id):
-    # Registrar no histórico antes de excluir
-    registrar_historico(music_id, "Exclusão")
-    
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM musicas WHERE id=?", (music_id,))
-    conn.commit()
-    conn.close()
-
-def search_musicas(campo, termo, apenas_favoritos=False):
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    
-    where_favorito = "AND favorito = 1" if apenas_favoritos else ""
-    query = f"SELECT id, titulo, artista, tonalidade, favorito FROM musicas WHERE {campo} LIKE ? {where_favorito} ORDER BY data_criacao DESC"
-    cur.execute(query, (f"%{termo}%",))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
-
-def get_music_stats():
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    
-    stats = {}
-    
-    # Total de músicas
-    cur.execute("SELECT COUNT(*) FROM musicas")
-    stats['total'] = cur.fetchone()[0]
-    
-    # Total de favoritos
-    cur.execute("SELECT COUNT(*) FROM musicas WHERE favorito = 1")
-    stats['favoritos'] = cur.fetchone()[0]
-    
-    # Total de grupos
-    cur.execute("SELECT COUNT(*) FROM grupos")
-    stats['grupos'] = cur.fetchone()[0]
-    
-    # Música mais recente
-    cur.execute("SELECT titulo, artista FROM musicas ORDER BY data_criacao DESC LIMIT 1")
-    stats['recente'] = cur.fetchone()
-    
-    conn.close()
-    return stats
-
 # ------------------ FUNÇÃO PARA MENSAGENS NO TOPO ------------------
 def mostrar_mensagem_topo(titulo, mensagem, tipo="info"):
     # Criar uma janela temporária para ser pai da messagebox
@@ -507,15 +124,272 @@ def mostrar_mensagem_topo(titulo, mensagem, tipo="info"):
     return result
 
 # ------------------ CARREGAR IMAGENS ------------------
+# Os ícones originais têm 512x512; a versão reduzida fica em disco para que a
+# abertura do aplicativo não decodifique e redimensione todos a cada vez
+ICONES_CACHE_DIR = os.path.join("cache", "icones")
+
 def carregar_imagem(caminho, tamanho=(20, 20)):
     try:
-        img = Image.open(caminho)
-        img = img.resize(tamanho, Image.Resampling.LANCZOS)
+        nome = os.path.splitext(os.path.basename(caminho))[0]
+        reduzida = os.path.join(ICONES_CACHE_DIR, f"{nome}_{tamanho[0]}x{tamanho[1]}.png")
+        if os.path.exists(reduzida) and os.path.getmtime(reduzida) >= os.path.getmtime(caminho):
+            img = Image.open(reduzida)
+        else:
+            img = Image.open(caminho)
+            img = img.resize(tamanho, Image.Resampling.LANCZOS)
+            try:
+                os.makedirs(ICONES_CACHE_DIR, exist_ok=True)
+                img.save(reduzida)
+            except OSError:
+                pass
         return ctk.CTkImage(light_image=img, dark_image=img, size=tamanho)
     except:
         # Fallback para ícones de texto se a imagem não for encontrada
         return None
 
+# ------------------ LISTA VIRTUAL ------------------
+class CardMusica(ctk.CTkFrame):
+    """Card de música reaproveitável: os widgets são criados uma vez e só reconfigurados"""
+    MAX_GRUPOS = 5
+
+    def __init__(self, master, app):
+        super().__init__(master, corner_radius=10)
+        self.app = app
+        self.music = None
+        self.indice = None
+
+        # Frame principal
+        main_frame = ctk.CTkFrame(self, fg_color="transparent")
+        main_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Ícone de favorito
+        self.fav_btn = ctk.CTkButton(main_frame, text="", width=30, height=30,
+                                     fg_color="transparent", hover_color="gray30",
+                                     command=lambda: self.app.toggle_favorito(self.music[0]))
+        self.fav_btn.pack(side="left", padx=(0, 10))
+
+        # Botões de ação
+        action_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        action_frame.pack(side="right")
+
+        ctk.CTkButton(action_frame, text="", image=app.icones.get("open"), width=40,
+                      command=lambda: self.app.open_pdf(self.music[0])).pack(side="left", padx=2)
+
+        self.menu_btn = ctk.CTkButton(action_frame, text="•••", width=40,
+                                      command=lambda: self.app.show_music_menu(self.music[0], self.music[1], self.menu_btn))
+        self.menu_btn.pack(side="left", padx=2)
+
+        # Informações
+        info_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        info_frame.pack(side="left", fill="x", expand=True)
+
+        self.titulo_label = ctk.CTkLabel(info_frame, text="", font=ctk.CTkFont(size=16, weight="bold"),
+                                         anchor="w", justify="left")
+        self.titulo_label.pack(anchor="w")
+
+        self.detalhes_label = ctk.CTkLabel(info_frame, text="", text_color="gray", anchor="w", justify="left")
+        self.detalhes_label.pack(anchor="w", pady=(5, 0))
+
+        grupos_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
+        grupos_frame.pack(anchor="w", pady=(5, 0))
+        self.grupo_labels = [
+            ctk.CTkLabel(grupos_frame, text="", font=ctk.CTkFont(size=12),
+                         text_color="#d0d0d0", corner_radius=8)
+            for _ in range(self.MAX_GRUPOS)
+        ]
+        # Chip "+N" para os grupos que não cabem nos MAX_GRUPOS rótulos
+        self.mais_grupos_label = ctk.CTkLabel(grupos_frame, text="", font=ctk.CTkFont(size=12),
+                                              text_color="#d0d0d0", fg_color="gray35", corner_radius=8)
+
+    def exibir(self, music, indice):
+        """Reconfigura o card para mostrar outra música"""
+        self.music = music
+        self.indice = indice
+        music_id, titulo, artista, tonalidade, favorito = music[:5]
+
+        self.fav_btn.configure(image=self.app.icones.get("favorite" if favorito else "favorite_outline"))
+        self.titulo_label.configure(text=titulo)
+
+        detalhes_text = []
+        if artista:
+            detalhes_text.append(artista)
+        if tonalidade:
+            detalhes_text.append(tonalidade)
+        # Trecho da letra que casou com a busca
+        if len(music) > 6 and music[6]:
+            detalhes_text.append(f"…{music[6]}…")
+        self.detalhes_label.configure(text=" • ".join(detalhes_text))
+
+        # Mostrar grupos da música (já vêm junto da listagem quando disponíveis)
+        grupos = music[5] if len(music) > 5 else fetch_grupos_da_musica(music_id)
+        for pos, label in enumerate(self.grupo_labels):
+            if pos < len(grupos):
+                _, nome, cor = grupos[pos]
+                label.configure(text=nome, fg_color=cor)
+                label.pack(side="left", padx=(0, 5))
+            else:
+                label.pack_forget()
+        excedentes = len(grupos) - self.MAX_GRUPOS
+        if excedentes > 0:
+            self.mais_grupos_label.configure(text=f"+{excedentes}")
+            self.mais_grupos_label.pack(side="left", padx=(0, 5))
+        else:
+            self.mais_grupos_label.pack_forget()
+
+
+class ListaMusicasVirtual(ctk.CTkFrame):
+    """Lista de músicas virtualizada.
+
+    Só existem widgets para as linhas visíveis (mais uma pequena margem); ao rolar,
+    os mesmos cards são reposicionados e reconfigurados com as músicas da vez.
+    """
+    ALTURA_LINHA = 110
+    ESPACO = 10
+    MARGEM_LINHAS = 2
+    PASSO_ROLAGEM = 60
+
+    def __init__(self, master, app):
+        super().__init__(master)
+        self.app = app
+        self.itens = []
+        self.total = 0
+        self.offset = 0
+        self.cards = []
+        self.carregar_ate = None
+        self._pedido_pendente = False
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        # Header com contador
+        self.header_label = ctk.CTkLabel(self, text="", font=ctk.CTkFont(weight="bold"),
+                                         text_color="gray", anchor="w")
+        self.header_label.grid(row=0, column=0, sticky="ew", padx=10, pady=(5, 5))
+
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.grid(row=1, column=0, sticky="nsew", padx=(10, 0))
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+
+        self.vazio_label = ctk.CTkLabel(self.viewport, text="Nenhuma música encontrada",
+                                        font=ctk.CTkFont(size=16), text_color="gray")
+
+        self.viewport.bind("<Configure>", lambda e: self._renderizar())
+        self.bind_all("<MouseWheel>", self._on_mousewheel, add="+")
+        self.bind_all("<Button-4>", self._on_mousewheel, add="+")
+        self.bind_all("<Button-5>", self._on_mousewheel, add="+")
+
+    def definir_itens(self, itens, manter_posicao=False, total=None, carregar_ate=None):
+        """Define as músicas exibidas.
+
+        Com paginação, itens é só a primeira página: total é o tamanho do resultado
+        completo e carregar_ate(indice) é chamado quando a rolagem precisar de
+        linhas ainda não carregadas, que chegam depois por acrescentar_itens.
+        """
+        self.itens = list(itens)
+        self.total = len(self.itens) if total is None else total
+        self.carregar_ate = carregar_ate
+        self._pedido_pendente = False
+        if not manter_posicao:
+            self.offset = 0
+        # Força todos os cards a se reconfigurarem
+        for card in self.cards:
+            card.indice = None
+
+        total = self.total
+        if total == 0:
+            self.header_label.configure(text="")
+            self.vazio_label.place(relx=0.5, y=50, anchor="n")
+        else:
+            self.header_label.configure(text=f"{total} música(s) encontrada(s)")
+            self.vazio_label.place_forget()
+        self._renderizar()
+
+    def acrescentar_itens(self, itens):
+        self.itens.extend(itens)
+        self._pedido_pendente = False
+        self._renderizar()
+
+    # ---------- Geometria ----------
+    def _altura_viewport(self):
+        return self.viewport._reverse_widget_scaling(self.viewport.winfo_height())
+
+    def _altura_total(self):
+        return self.total * self.ALTURA_LINHA
+
+    def _limitar_offset(self):
+        maximo = max(0, self._altura_total() - self._altura_viewport())
+        self.offset = min(max(0, self.offset), maximo)
+
+    def _garantir_cards(self, altura):
+        # O pool só cresce com a altura da janela, nunca com o tamanho da biblioteca
+        necessarios = int(altura // self.ALTURA_LINHA) + 1 + 2 * self.MARGEM_LINHAS
+        while len(self.cards) < necessarios:
+            self.cards.append(CardMusica(self.viewport, self.app))
+
+    def _renderizar(self):
+        altura = self._altura_viewport()
+        if altura <= 1:
+            return
+        self._limitar_offset()
+        self._garantir_cards(altura)
+
+        primeiro = max(0, self.offset // self.ALTURA_LINHA - self.MARGEM_LINHAS)
+        ultimo = min(self.total, primeiro + len(self.cards))
+
+        # Linhas visíveis ainda não carregadas: pede as próximas páginas
+        if ultimo > len(self.itens) and self.carregar_ate and not self._pedido_pendente:
+            self._pedido_pendente = True
+            self.after_idle(self.carregar_ate, ultimo)
+        ultimo = min(ultimo, len(self.itens))
+
+        usados = set()
+        for indice in range(primeiro, ultimo):
+            # Cada índice sempre cai no mesmo card: rolar uma linha reconfigura só um card
+            card = self.cards[indice % len(self.cards)]
+            usados.add(id(card))
+            if card.indice != indice:
+                card.exibir(self.itens[indice], indice)
+            card.place(x=0, y=indice * self.ALTURA_LINHA - self.offset,
+                       relwidth=1, height=self.ALTURA_LINHA - self.ESPACO)
+
+        for card in self.cards:
+            if id(card) not in usados:
+                card.place_forget()
+                card.indice = None
+
+        altura_total = self._altura_total()
+        if altura_total <= altura:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / altura_total, (self.offset + altura) / altura_total)
+
+    # ---------- Rolagem ----------
+    def rolar_para(self, offset):
+        self.offset = int(offset)
+        self._renderizar()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.rolar_para(float(args[1]) * self._altura_total())
+        elif args[0] == "scroll":
+            passo = self._altura_viewport() if args[2] == "pages" else self.PASSO_ROLAGEM
+            self.rolar_para(self.offset + int(args[1]) * passo)
+
+    def _on_mousewheel(self, event):
+        if not str(event.widget).startswith(str(self.viewport)):
+            return
+        if event.num == 4:
+            delta = -self.PASSO_ROLAGEM
+        elif event.num == 5:
+            delta = self.PASSO_ROLAGEM
+        elif sys.platform == "darwin":
+            delta = -event.delta * 10
+        else:
+            delta = -event.delta / 120 * self.PASSO_ROLAGEM
+        self.rolar_para(self.offset + delta)
+
 # ------------------ APP ------------------
 class SongPDFApp(ctk.CTk):
     def __init__(self):
@@ -554,6 +428,12 @@ class SongPDFApp(ctk.CTk):
         self.ordenacao = {"campo": "data_criacao", "ordem": "DESC"}
         self.pesquisa_atual = ""
         self.campo_pesquisa = "titulo"
+        self.filtros_atuais = {}
+        self.cursor_atual = None
+
+        # Banco e PDFs rodam fora da thread da interface
+        self.tarefas = ExecutorTarefas()
+        self._ocupado = False
 
         # Configurar layout principal
         self.grid_columnconfigure(0, weight=1)
@@ -628,6 +508,10 @@ class SongPDFApp(ctk.CTk):
                                          image=self.icones.get("import"), command=self.import_pdf_dialog)
         self.btn_importar.pack(side="left", padx=5)
 
+        self.btn_importar_pasta = ctk.CTkButton(action_frame, text="Importar Pasta", width=80,
+                                               image=self.icones.get("import"), command=self.importar_pasta_dialog)
+        self.btn_importar_pasta.pack(side="left", padx=5)
+
         # ---------- Search frame ----------
         self.search_frame = ctk.CTkFrame(self.main_container, fg_color="transparent")
         self.search_frame.grid(row=1, column=1, sticky="nsew")
@@ -641,7 +525,7 @@ class SongPDFApp(ctk.CTk):
 
         # Ordenação
         ctk.CTkLabel(filter_frame, text="Ordenar por:").grid(row=0, column=0, sticky="w", padx=(0, 5))
-        self.ordenacao_combo = ctk.CTkOptionMenu(filter_frame, values=["Data", "Título", "Artista", "Tonalidade"],
+        self.ordenacao_combo = ctk.CTkOptionMenu(filter_frame, values=["Data", "Título", "Artista", "Tonalidade", "Relevância"],
                                                 command=self.alterar_ordenacao)
         self.ordenacao_combo.grid(row=0, column=1, sticky="w", padx=(0, 20))
         self.ordenacao_combo.set("Data")
@@ -656,7 +540,7 @@ class SongPDFApp(ctk.CTk):
         search_input_frame = ctk.CTkFrame(filter_frame, fg_color="transparent")
         search_input_frame.grid(row=0, column=4, sticky="e")
 
-        self.campo_pesquisa_combo = ctk.CTkOptionMenu(search_input_frame, values=["Título", "Artista", "Tonalidade"],
+        self.campo_pesquisa_combo = ctk.CTkOptionMenu(search_input_frame, values=["Título", "Artista", "Tonalidade", "Letra", "Tudo"],
                                                      width=80, command=self.alterar_campo_pesquisa)
         self.campo_pesquisa_combo.pack(side="left", padx=(0, 5))
         self.campo_pesquisa_combo.set("Título")
@@ -664,32 +548,90 @@ class SongPDFApp(ctk.CTk):
         self.entry_search = ctk.CTkEntry(search_input_frame, placeholder_text="Buscar...", width=200)
         self.entry_search.pack(side="left", padx=(0, 5))
         self.entry_search.bind("<Return>", lambda e: self.apply_search())
+        self.entry_search.bind("<KeyRelease>", self._ao_digitar)
+        self._busca_agendada = None
 
         self.btn_search = ctk.CTkButton(search_input_frame, text="", width=40, 
                                        image=self.icones.get("search"), command=self.apply_search)
         self.btn_search.pack(side="left")
 
         # ---------- Content frame ----------
-        self.content_frame = ctk.CTkScrollableFrame(self.search_frame, label_text="")
+        self.content_frame = ListaMusicasVirtual(self.search_frame, self)
         self.content_frame.grid(row=1, column=0, sticky="nsew")
-        self.content_frame.grid_columnconfigure(0, weight=1)
 
         # Status bar
         self.status_bar = ctk.CTkLabel(self.main_container, text="Pronto", anchor="w", 
                                       font=ctk.CTkFont(size=12))
         self.status_bar.grid(row=2, column=1, sticky="ew", pady=(10, 0))
 
-        # Carregar dados iniciais
-        self.carregar_grupos_sidebar()
+        # Indicador de trabalho em segundo plano (exibido só enquanto há tarefas pendentes)
+        self.indicador_ocupado = ctk.CTkProgressBar(self.main_container, mode="indeterminate",
+                                                    width=120, height=8)
+        self._processar_tarefas()
+
+        # Dados iniciais só depois que a janela for desenhada
+        self.after_idle(self._carregar_dados_iniciais)
+
+    def _carregar_dados_iniciais(self):
+        # A busca já roda em segundo plano
         self.mostrar_todas_musicas()
+        # A primeira leitura de grupos carrega o cache de metadados (varre as músicas): também fora da interface
+        self.em_segundo_plano(fetch_all_grupos, ao_concluir=lambda _: self.carregar_grupos_sidebar(),
+                              erro="Falha ao carregar grupos")
+        # Retenção do histórico, uma vez por abertura
+        self.em_segundo_plano(compactar_historico, config.get("historico_dias", HISTORICO_DIAS),
+                              config.get("historico_max", HISTORICO_MAX), erro="Falha ao compactar histórico")
 
         # Atualizar status bar periodicamente
-        self.atualizar_status_bar()
+        self._agendar_status_bar()
+
+    # ---------- Tarefas em segundo plano ----------
+    INTERVALO_TAREFAS = 15  # ms entre as verificações da fila de resultados
+
+    def em_segundo_plano(self, funcao, *args, ao_concluir=None, erro="Falha na operação", chave=None, **kwargs):
+        """Roda funcao em uma thread de trabalho; ao_concluir(resultado) roda depois na thread da interface"""
+        def ao_falhar(e):
+            mostrar_mensagem_topo("Erro", f"{erro}: {e}", "error")
+        return self.tarefas.enviar(funcao, *args, ao_concluir=ao_concluir, ao_falhar=ao_falhar,
+                                   chave=chave, **kwargs)
+
+    def _processar_tarefas(self):
+        # Reagenda antes: callbacks que abrem diálogos modais não param a entrega dos demais
+        self.after(self.INTERVALO_TAREFAS, self._processar_tarefas)
+        try:
+            self.tarefas.processar()
+        finally:
+            self._atualizar_indicador()
+
+    def _atualizar_indicador(self):
+        ocupado = self.tarefas.pendentes > 0
+        if ocupado == self._ocupado:
+            return
+        self._ocupado = ocupado
+        if ocupado:
+            self.indicador_ocupado.grid(row=2, column=1, sticky="e", pady=(10, 0))
+            self.indicador_ocupado.start()
+        else:
+            self.indicador_ocupado.stop()
+            self.indicador_ocupado.grid_remove()
+
+    def destroy(self):
+        cancelar_backup_automatico.set()
+        self.tarefas.desligar()
+        super().destroy()
+
+    INTERVALO_STATUS = 2000  # ms; com o cache de metadados cada verificação é só um PRAGMA data_version
 
     def atualizar_status_bar(self):
-        stats = get_music_stats()
-        self.status_bar.configure(text=f"Total: {stats['total']} músicas | Favoritos: {stats['favoritos']} | Grupos: {stats['grupos']}")
-        self.after(30000, self.atualizar_status_bar)  # Atualizar a cada 30 segundos
+        def exibir(stats):
+            self.status_bar.configure(text=f"Total: {stats['total']} músicas | Favoritos: {stats['favoritos']} | Grupos: {stats['grupos']}")
+        self.tarefas.enviar(get_music_stats, ao_concluir=exibir, chave="status",
+                            ao_falhar=lambda e: print(f"Erro ao atualizar status: {e}"))
+
+    def _agendar_status_bar(self):
+        # Também detecta alterações feitas por outro processo no mesmo banco
+        self.atualizar_status_bar()
+        self.after(self.INTERVALO_STATUS, self._agendar_status_bar)
 
     def carregar_grupos_sidebar(self):
         for widget in self.grupos_container.winfo_children():
@@ -738,7 +680,16 @@ class SongPDFApp(ctk.CTk):
                 item_frame = ctk.CTkFrame(frame)
                 item_frame.pack(fill="x", pady=5)
 
-                acao_icone = "📝" if acao == "Criação" else "✏️" if acao == "Edição" else "🗑️"
+                if acao == "Criação":
+                    acao_icone = "📝"
+                elif acao == "Edição":
+                    acao_icone = "✏️"
+                elif acao.startswith("Adicionada ao grupo"):
+                    acao_icone = "📁"
+                elif acao.startswith("Removida do grupo"):
+                    acao_icone = "📂"
+                else:
+                    acao_icone = "🗑️"
                 texto = f"{acao_icone} {acao}: {titulo or 'Música excluída'}"
                 ctk.CTkLabel(item_frame, text=texto, anchor="w").pack(side="left", fill="x", expand=True)
                 ctk.CTkLabel(item_frame, text=data, text_color="gray").pack(side="right")
@@ -798,7 +749,13 @@ class SongPDFApp(ctk.CTk):
         # Geral
         ctk.CTkLabel(tab_geral, text="Backup automático:", anchor="w").pack(fill="x", pady=(10, 5))
         backup_var = ctk.BooleanVar(value=config.get("backup_auto", True))
-        ctk.CTkSwitch(tab_geral, text="Ativar backup automático", variable=backup_var).pack(anchor="w", pady=(0, 20))
+        ctk.CTkSwitch(tab_geral, text="Ativar backup automático", variable=backup_var).pack(anchor="w", pady=(0, 5))
+        compactado_var = ctk.BooleanVar(value=config.get("backup_compactado", False))
+        ctk.CTkSwitch(tab_geral, text="Compactar backups automáticos", variable=compactado_var).pack(anchor="w", pady=(0, 20))
+
+        ctk.CTkLabel(tab_geral, text="Geração de PDF:", anchor="w").pack(fill="x", pady=(10, 5))
+        sob_demanda_var = ctk.BooleanVar(value=render_sob_demanda())
+        ctk.CTkSwitch(tab_geral, text="Gerar PDF apenas ao abrir/baixar", variable=sob_demanda_var).pack(anchor="w", pady=(0, 20))
 
         # Banco de Dados
         ctk.CTkLabel(tab_banco, text="Localização do banco:", anchor="w").pack(fill="x", pady=(10, 5))
@@ -812,6 +769,7 @@ class SongPDFApp(ctk.CTk):
             if path and conectar_banco(path):
                 global DB_FILE
                 DB_FILE = path
+                definir_banco(path)
                 config["db_file"] = path
                 save_config(config)
                 mostrar_mensagem_topo("Sucesso", f"Conectado ao banco:\n{path}", "info")
@@ -823,26 +781,22 @@ class SongPDFApp(ctk.CTk):
         def fazer_backup():
             path = filedialog.asksaveasfilename(
                 defaultextension=".db",
-                filetypes=[("SQLite DB", "*.db")],
+                filetypes=[("SQLite DB", "*.db"), ("Backup compactado", "*.db.xz")],
                 initialfile=f"songpdf_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
             )
             if path:
-                try:
-                    conn = sqlite3.connect(DB_FILE)
-                    bkp = sqlite3.connect(path)
-                    conn.backup(bkp)
-                    bkp.close()
-                    conn.close()
-                    mostrar_mensagem_topo("Sucesso", f"Backup salvo em:\n{path}", "info")
-                except Exception as e:
-                    mostrar_mensagem_topo("Erro", f"Falha ao salvar backup: {e}", "error")
+                self.backup_dialog(path)
 
         ctk.CTkButton(tab_banco, text="Fazer Backup Agora", command=fazer_backup).pack(pady=5)
+        ctk.CTkButton(tab_banco, text="Restaurar Backup", command=self.restaurar_backup_dialog).pack(pady=5)
+        ctk.CTkButton(tab_banco, text="Regenerar PDFs", command=self.regenerar_pdfs_dialog).pack(pady=5)
 
         def salvar_config():
             config["theme"] = tema_var.get()
             config["accent_color"] = cor_var.get()
             config["backup_auto"] = backup_var.get()
+            config["backup_compactado"] = compactado_var.get()
+            config["render_sob_demanda"] = sob_demanda_var.get()
             save_config(config)
             
             # Aplicar novo tema
@@ -852,12 +806,184 @@ class SongPDFApp(ctk.CTk):
 
         ctk.CTkButton(dialog, text="Salvar Configurações", command=salvar_config).pack(pady=20)
 
+    def regenerar_pdfs_dialog(self):
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Regenerar PDFs")
+        dialog.geometry("420x220")
+        dialog.transient(self)
+        dialog.grab_set()
+
+        ctk.CTkLabel(dialog, text="Regenerando PDFs desatualizados...", font=ctk.CTkFont(weight="bold")).pack(pady=(20, 10))
+        barra = ctk.CTkProgressBar(dialog)
+        barra.pack(fill="x", padx=20, pady=10)
+        barra.set(0)
+        status_label = ctk.CTkLabel(dialog, text="Preparando...", text_color="gray")
+        status_label.pack(pady=5)
+
+        # O trabalho roda em outra thread; a interface só lê este estado periodicamente
+        estado = {"progresso": None, "resultado": None, "erro": None}
+        cancelar = threading.Event()
+
+        def trabalho():
+            try:
+                estado["resultado"] = renderizar_em_lote(
+                    progresso=lambda feitas, total, vel: estado.update(progresso=(feitas, total, vel)),
+                    cancelar=cancelar,
+                )
+            except Exception as e:
+                estado["erro"] = e
+
+        def acompanhar():
+            if not dialog.winfo_exists():
+                return
+            if estado["progresso"]:
+                feitas, total, vel = estado["progresso"]
+                barra.set(feitas / total if total else 1)
+                status_label.configure(text=f"{feitas}/{total} músicas • {vel:.1f} PDFs/s")
+            if estado["erro"]:
+                dialog.destroy()
+                mostrar_mensagem_topo("Erro", f"Falha ao regenerar PDFs: {estado['erro']}", "error")
+            elif estado["resultado"]:
+                r = estado["resultado"]
+                dialog.destroy()
+                situacao = "Cancelado" if r["cancelado"] else "Concluído"
+                mostrar_mensagem_topo("Regenerar PDFs",
+                                      f"{situacao}: {r['renderizadas']} PDFs gerados, {r['puladas']} já estavam em dia "
+                                      f"({r['segundos']:.1f}s).", "info")
+            else:
+                dialog.after(200, acompanhar)
+
+        ctk.CTkButton(dialog, text="Cancelar", command=cancelar.set).pack(pady=10)
+        threading.Thread(target=trabalho, daemon=True).start()
+        acompanhar()
+
+    def backup_dialog(self, destino):
+        """Salva uma cópia do banco em destino, em etapas, com progresso e cancelamento"""
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Fazer Backup")
+        dialog.geometry("420x200")
+        dialog.transient(self)
+        dialog.grab_set()
+
+        ctk.CTkLabel(dialog, text="Copiando banco de dados...", font=ctk.CTkFont(weight="bold")).pack(pady=(20, 10))
+        barra = ctk.CTkProgressBar(dialog)
+        barra.pack(fill="x", padx=20, pady=10)
+        barra.set(0)
+        status_label = ctk.CTkLabel(dialog, text="Preparando...", text_color="gray")
+        status_label.pack(pady=5)
+
+        estado = {"progresso": None, "concluido": False, "erro": None}
+        cancelar = threading.Event()
+
+        def trabalho():
+            try:
+                # .xz gera o backup compactado; o resto é uma cópia direta do banco
+                copiar = exportar_compactado if eh_compactado(destino) else copiar_banco
+                copiar(DB_FILE, destino, cancelar=cancelar,
+                       progresso=lambda copiadas, total: estado.update(progresso=(copiadas, total)))
+                estado["concluido"] = True
+            except Exception as e:
+                estado["erro"] = e
+
+        def acompanhar():
+            if not dialog.winfo_exists():
+                return
+            if estado["progresso"]:
+                copiadas, total = estado["progresso"]
+                barra.set(copiadas / total if total else 1)
+                status_label.configure(text=f"{copiadas}/{total} páginas")
+            if isinstance(estado["erro"], BackupCancelado):
+                dialog.destroy()
+                mostrar_mensagem_topo("Fazer Backup", "Backup cancelado.", "info")
+            elif estado["erro"]:
+                dialog.destroy()
+                mostrar_mensagem_topo("Erro", f"Falha ao salvar backup: {estado['erro']}", "error")
+            elif estado["concluido"]:
+                dialog.destroy()
+                mostrar_mensagem_topo("Sucesso", f"Backup salvo em:\n{destino}", "info")
+            else:
+                dialog.after(200, acompanhar)
+
+        ctk.CTkButton(dialog, text="Cancelar", command=cancelar.set).pack(pady=10)
+        threading.Thread(target=trabalho, daemon=True).start()
+        acompanhar()
+
+    def restaurar_backup_dialog(self):
+        repositorio = repositorio_backup()
+        snapshots = repositorio.listar_snapshots()
+
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Restaurar Backup")
+        dialog.geometry("420x240")
+        dialog.transient(self)
+        dialog.grab_set()
+
+        def escolher_destino(sufixo):
+            # Restaura sempre em um arquivo novo; o banco em uso não é sobrescrito
+            return filedialog.asksaveasfilename(
+                defaultextension=".db",
+                filetypes=[("SQLite DB", "*.db")],
+                initialfile=f"songpdf_restaurado_{sufixo}.db"
+            )
+
+        def concluido(destino):
+            if messagebox.askyesno("Restaurar Backup", f"Backup restaurado em:\n{destino}\n\nConectar a este banco agora?"):
+                if conectar_banco(destino):
+                    global DB_FILE
+                    DB_FILE = destino
+                    definir_banco(destino)
+                    config["db_file"] = destino
+                    save_config(config)
+                    self.carregar_grupos_sidebar()
+                    self.apply_search()
+
+        if snapshots:
+            # Rótulo legível -> nome do snapshot, do mais recente para o mais antigo
+            opcoes = {}
+            for nome in reversed(snapshots):
+                manifesto = repositorio.ler_manifesto(nome)
+                opcoes[f"{manifesto['criado'].replace('T', ' ')} • {manifesto['tamanho'] / 1024 / 1024:.1f} MB"] = nome
+
+            ctk.CTkLabel(dialog, text="Backup automático:", anchor="w").pack(fill="x", padx=20, pady=(20, 5))
+            escolha_var = ctk.StringVar(value=next(iter(opcoes)))
+            ctk.CTkOptionMenu(dialog, values=list(opcoes), variable=escolha_var).pack(fill="x", padx=20, pady=(0, 10))
+
+            def restaurar():
+                nome = opcoes[escolha_var.get()]
+                destino = escolher_destino(nome[:15])
+                if not destino:
+                    return
+                dialog.destroy()
+                self.em_segundo_plano(repositorio.restaurar, nome, destino, erro="Falha ao restaurar backup",
+                                      ao_concluir=lambda _: concluido(destino))
+
+            ctk.CTkButton(dialog, text="Restaurar", command=restaurar).pack(pady=10)
+        else:
+            ctk.CTkLabel(dialog, text="Nenhum backup automático encontrado.", text_color="gray").pack(pady=(20, 10))
+
+        def restaurar_arquivo():
+            arquivo = filedialog.askopenfilename(
+                filetypes=[("Backup compactado", "*.xz")],
+                title="Escolha o backup compactado"
+            )
+            if not arquivo:
+                return
+            destino = escolher_destino(datetime.now().strftime('%Y%m%d_%H%M%S'))
+            if not destino:
+                return
+            dialog.destroy()
+            self.em_segundo_plano(restaurar_compactado, arquivo, destino, erro="Falha ao restaurar backup",
+                                  ao_concluir=lambda _: concluido(destino))
+
+        ctk.CTkButton(dialog, text="Abrir Backup Compactado...", command=restaurar_arquivo).pack(pady=5)
+
     def alterar_ordenacao(self, escolha):
         mapeamento = {
             "Data": "data_criacao",
             "Título": "titulo",
             "Artista": "artista",
-            "Tonalidade": "tonalidade"
+            "Tonalidade": "tonalidade",
+            "Relevância": "relevancia"
         }
         self.ordenacao["campo"] = mapeamento.get(escolha, "data_criacao")
         self.apply_search()
@@ -870,126 +996,103 @@ class SongPDFApp(ctk.CTk):
         mapeamento = {
             "Título": "titulo",
             "Artista": "artista",
-            "Tonalidade": "tonalidade"
+            "Tonalidade": "tonalidade",
+            "Letra": "texto_original",
+            "Tudo": "todos"
         }
         self.campo_pesquisa = mapeamento.get(escolha, "titulo")
+        if self.entry_search.get().strip():
+            self.apply_search()
 
-    def apply_search(self):
+    # ---------- Busca enquanto digita ----------
+    ATRASO_BUSCA = 200  # ms sem digitar antes de consultar o banco
+
+    def _ao_digitar(self, event=None):
         termo = self.entry_search.get().strip()
+        if termo == self.pesquisa_atual:
+            return  # setas, shift etc. não mudam a busca
+        if self._busca_agendada is not None:
+            self.after_cancel(self._busca_agendada)
+            self._busca_agendada = None
+        if self._refinar_em_memoria(termo):
+            return
+        self._busca_agendada = self.after(self.ATRASO_BUSCA, self.apply_search)
+
+    def _refinar_em_memoria(self, termo):
+        """Se o termo só estende o anterior, filtra o resultado atual sem consultar o banco.
+
+        Só vale quando o resultado anterior está inteiro em memória (sem páginas
+        por carregar nem busca em andamento) e a ordem não depende do termo.
+        """
+        anterior = self.filtros_atuais
+        if not anterior or self.cursor_atual is not None or self.tarefas.em_andamento("busca"):
+            return False
+        if not termo.startswith(anterior["termo"]) or anterior["ordenar_por"] == "relevancia":
+            return False
+        campo = None if self.campo_pesquisa == "todos" else self.campo_pesquisa
+        if anterior["campo"] != campo:
+            return False  # o campo mudou depois da última consulta
+        filtro = criar_filtro_local(termo, anterior["campo"])
+        if filtro is None:
+            return False
+
+        musicas = [musica for musica in self.content_frame.itens if filtro(musica)]
         self.pesquisa_atual = termo
-        
-        if self.grupo_selecionado:
-            musicas = fetch_musicas_do_grupo(self.grupo_selecionado)
-            if termo:
-                resultados = []
-                for musica in musicas:
-                    if self.campo_pesquisa == "titulo" and termo.lower() in musica[1].lower():
-                        resultados.append(musica)
-                    elif self.campo_pesquisa == "artista" and musica[2] and termo.lower() in musica[2].lower():
-                        resultados.append(musica)
-                    elif self.campo_pesquisa == "tonalidade" and musica[3] and termo.lower() in musica[3].lower():
-                        resultados.append(musica)
-                self.carregar_musicas(resultados)
-            else:
-                self.carregar_musicas(musicas)
-        elif self.filtro_favoritos:
-            if termo:
-                resultados = search_musicas(self.campo_pesquisa, termo, True)
-                self.carregar_musicas(resultados)
-            else:
-                musicas = fetch_all_musicas(apenas_favoritos=True)
-                self.carregar_musicas(musicas)
-        else:
-            if termo:
-                resultados = search_musicas(self.campo_pesquisa, termo)
-                self.carregar_musicas(resultados)
-            else:
-                musicas = fetch_all_musicas(self.ordenacao["campo"], self.ordenacao["ordem"])
-                self.carregar_musicas(musicas)
+        self.filtros_atuais = {**anterior, "termo": termo}
+        self.carregar_musicas(musicas, total=len(musicas))
+        return True
 
-    def carregar_musicas(self, musicas):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-        
-        self.musicas_atuais = musicas
-        total = len(musicas)
+    def apply_search(self, manter_posicao=False):
+        if self._busca_agendada is not None:
+            self.after_cancel(self._busca_agendada)
+            self._busca_agendada = None
+        termo = self.entry_search.get().strip()
+        self.pesquisa_atual = termo
         
-        if total == 0:
-            ctk.CTkLabel(self.content_frame, text="Nenhuma música encontrada", 
-                         font=ctk.CTkFont(size=16), text_color="gray").pack(pady=50)
+        # Grupo, favoritos, busca e ordenação resolvidos em uma única consulta
+        campo = None if self.campo_pesquisa == "todos" else self.campo_pesquisa
+        self.filtros_atuais = {
+            "grupo_id": self.grupo_selecionado,
+            "apenas_favoritos": self.filtro_favoritos,
+            "campo": campo,
+            "termo": termo,
+            "ordenar_por": self.ordenacao["campo"],
+            "ordem": self.ordenacao["ordem"],
+        }
+        # Só a primeira página é lida agora; o resto vem conforme a rolagem
+        def exibir(resultado):
+            musicas, self.cursor_atual, total = resultado
+            self.carregar_musicas(musicas, manter_posicao, total)
+            # Buscas vêm depois de toda alteração: os totais acompanham sem esperar o intervalo
+            self.atualizar_status_bar()
+
+        # Uma busca nova substitui a anterior e as páginas que ela ainda estava carregando
+        self.cursor_atual = None
+        self.tarefas.cancelar("pagina")
+        self.em_segundo_plano(paginar_musicas, ao_concluir=exibir, erro="Falha na busca",
+                              chave="busca", **self.filtros_atuais)
+
+    def carregar_proximas_paginas(self, indice):
+        if self.cursor_atual is None:
             return
-        
-        # Header com contador
-        header_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
-        header_frame.pack(fill="x", pady=(0, 10))
-        ctk.CTkLabel(header_frame, text=f"{total} música(s) encontrada(s)", 
-                    font=ctk.CTkFont(weight="bold"), text_color="gray").pack(anchor="w")
-        
-        for idx, music in enumerate(musicas):
-            self.add_card(music)
-            if idx < total - 1:
-                ctk.CTkFrame(self.content_frame, height=1, fg_color="gray70").pack(fill="x", pady=5)
-
-    def add_card(self, music):
-        music_id, titulo, artista, tonalidade, favorito = music
-        card = ctk.CTkFrame(self.content_frame, corner_radius=10)
-        card.pack(fill="x", pady=5)
-        
-        # Frame principal
-        main_frame = ctk.CTkFrame(card, fg_color="transparent")
-        main_frame.pack(fill="x", padx=10, pady=10)
-        
-        # Ícone de favorito
-        fav_icon = self.icones.get("favorite" if favorito else "favorite_outline")
-        fav_btn = ctk.CTkButton(main_frame, image=fav_icon, text="", width=30, height=30,
-                               fg_color="transparent", hover_color="gray30",
-                               command=lambda: self.toggle_favorito(music_id))
-        fav_btn.pack(side="left", padx=(0, 10))
-        
-        # Informações
-        info_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
-        info_frame.pack(side="left", fill="x", expand=True)
-        
-        titulo_label = ctk.CTkLabel(info_frame, text=titulo, font=ctk.CTkFont(size=16, weight="bold"),
-                                   anchor="w", justify="left")
-        titulo_label.pack(anchor="w")
-        
-        detalhes_text = []
-        if artista:
-            detalhes_text.append(artista)
-        if tonalidade:
-            detalhes_text.append(tonalidade)
-        
-        if detalhes_text:
-            detalhes_label = ctk.CTkLabel(info_frame, text=" • ".join(detalhes_text),
-                                         text_color="gray", anchor="w", justify="left")
-            detalhes_label.pack(anchor="w", pady=(5, 0))
-        
-        # Mostrar grupos da música
-        grupos = fetch_grupos_da_musica(music_id)
-        if grupos:
-            grupos_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
-            grupos_frame.pack(anchor="w", pady=(5, 0))
-            
-            for grupo_id, nome, cor in grupos:
-                grupo_label = ctk.CTkLabel(grupos_frame, text=nome, font=ctk.CTkFont(size=12),
-                                          text_color="#d0d0d0", fg_color=f"{cor}", corner_radius=8)
-                grupo_label.pack(side="left", padx=(0, 5))
-        
-        # Botões de ação
-        action_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
-        action_frame.pack(side="right")
-        
-        ctk.CTkButton(action_frame, text="", image=self.icones.get("open"), width=40,
-                     command=lambda: self.open_pdf(music_id)).pack(side="left", padx=2)
-        
-        menu_btn = ctk.CTkButton(action_frame, text="•••", width=40,
-                                command=lambda: self.show_music_menu(music_id, titulo, menu_btn))
-        menu_btn.pack(side="left", padx=2)
+        faltando = indice - len(self.content_frame.itens)
+        tamanho = max(TAMANHO_PAGINA, faltando + TAMANHO_PAGINA // 2)
+
+        def acrescentar(resultado):
+            musicas, self.cursor_atual, _ = resultado
+            self.content_frame.acrescentar_itens(musicas)
+
+        self.em_segundo_plano(paginar_musicas, ao_concluir=acrescentar, erro="Falha ao carregar músicas",
+                              chave="pagina", tamanho=tamanho, cursor=self.cursor_atual,
+                              **self.filtros_atuais)
+
+    def carregar_musicas(self, musicas, manter_posicao=False, total=None):
+        self.musicas_atuais = musicas
+        self.content_frame.definir_itens(musicas, manter_posicao, total, self.carregar_proximas_paginas)
 
     def toggle_favorito(self, music_id):
-        toggle_favorito(music_id)
-        self.apply_search()
+        self.em_segundo_plano(toggle_favorito, music_id, erro="Falha ao atualizar favorito",
+                              ao_concluir=lambda _: self.apply_search(manter_posicao=True))
 
     def show_music_menu(self, music_id, titulo, button):
         # Criar menu popup
@@ -1074,67 +1177,97 @@ class SongPDFApp(ctk.CTk):
 
     # ---------- Ações ----------
     def open_pdf(self, music_id):
-        pdf_bytes = fetch_pdf(music_id)
-        if not pdf_bytes:
-            mostrar_mensagem_topo("Aviso", "Esta música não possui PDF anexado.", "warning")
-            return
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(pdf_bytes)
-            webbrowser.open_new(tmp.name)
+        def abrir(pdf_bytes):
+            if not pdf_bytes:
+                mostrar_mensagem_topo("Aviso", "Esta música não possui PDF anexado.", "warning")
+                return
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+                tmp.write(pdf_bytes)
+                webbrowser.open_new(tmp.name)
+
+        # O PDF pode precisar ser renderizado (modo sob demanda)
+        self.em_segundo_plano(obter_pdf, music_id, ao_concluir=abrir, erro="Falha ao abrir PDF")
 
     def download_pdf(self, music_id, titulo):
-        pdf_bytes = fetch_pdf(music_id)
-        if not pdf_bytes:
-            mostrar_mensagem_topo("Erro", "PDF não encontrado.", "error")
-            return
+        def salvar(pdf_bytes):
+            if not pdf_bytes:
+                mostrar_mensagem_topo("Erro", "PDF não encontrado.", "error")
+                return
+            path = filedialog.asksaveasfilename(
+                defaultextension=".pdf",
+                filetypes=[("PDF Files", "*.pdf")],
+                initialfile=f"{titulo}.pdf"
+            )
+            if path:
+                with open(path, "wb") as f:
+                    f.write(pdf_bytes)
+                mostrar_mensagem_topo("Sucesso", f"PDF salvo em:\n{path}", "info")
+
+        self.em_segundo_plano(obter_pdf, music_id, ao_concluir=salvar, erro="Falha ao obter PDF")
+
+    def exportar_setlist(self, grupo_id, nome):
+        """Exporta todas as músicas do grupo em um único PDF com índice"""
         path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF Files", "*.pdf")],
-            initialfile=f"{titulo}.pdf"
+            initialfile=f"Setlist - {nome}.pdf"
+        )
+        if not path:
+            return
+        # Numeração contínua exige renderizar; sem ela os PDFs salvos são reaproveitados
+        continua = mostrar_mensagem_topo(
+            "Setlist", "Usar numeração de páginas contínua?\n\n"
+            "Não: reaproveita os PDFs salvos, cada música com a sua numeração.", "yesno")
+
+        def exportar():
+            # setlist carrega o reportlab; só é importado quando usado
+            from setlist import exportar_setlist
+            return exportar_setlist(grupo_id, nome, path, numeracao_continua=continua)
+
+        self.em_segundo_plano(
+            exportar, erro="Falha ao exportar setlist",
+            ao_concluir=lambda quantidade: mostrar_mensagem_topo(
+                "Sucesso", f"Setlist com {quantidade} música(s) salvo em:\n{path}", "info"),
         )
-        if path:
-            with open(path, "wb") as f:
-                f.write(pdf_bytes)
-            mostrar_mensagem_topo("Sucesso", f"PDF salvo em:\n{path}", "info")
 
     def confirm_delete(self, music_id):
         if mostrar_mensagem_topo("Confirmação", "Deseja realmente excluir esta música?", "yesno"):
-            delete_music(music_id)
-            self.apply_search()
+            self.em_segundo_plano(delete_music, music_id, erro="Falha ao excluir música",
+                                  ao_concluir=lambda _: self.apply_search(manter_posicao=True))
 
     # ---------- Diálogos de Música ----------
     def add_music_dialog(self):
         dialog = EditarMusicaDialog(self, "Nova Música")
         if dialog.result:
             titulo, artista, tonalidade, letra, tamanho_fonte = dialog.result
-            pdf_bytes = gerar_pdf(titulo, artista, tonalidade, letra, tamanho_fonte)
-            music_id = insert_music(titulo, artista, tonalidade, pdf_bytes, letra)
-            
-            # Perguntar se quer adicionar a grupos
-            if mostrar_mensagem_topo("Grupos", "Deseja adicionar esta música a algum grupo?", "yesno"):
-                self.gerenciar_grupos_musica(music_id, titulo)
-            
-            self.apply_search()
+
+            def concluir(music_id):
+                # Perguntar se quer adicionar a grupos
+                if mostrar_mensagem_topo("Grupos", "Deseja adicionar esta música a algum grupo?", "yesno"):
+                    self.gerenciar_grupos_musica(music_id, titulo)
+                self.apply_search()
+
+            self.em_segundo_plano(salvar_nova_musica, titulo, artista, tonalidade, letra, tamanho_fonte,
+                                  ao_concluir=concluir, erro="Falha ao salvar música")
 
     def edit_music_dialog(self, music_id):
-        conn = sqlite3.connect(DB_FILE)
-        cur = conn.cursor()
-        cur.execute("SELECT titulo, artista, tonalidade, texto_original FROM musicas WHERE id=?", (music_id,))
-        row = cur.fetchone()
-        conn.close()
+        self.em_segundo_plano(fetch_dados_render, music_id, erro="Falha ao carregar música",
+                              ao_concluir=lambda row: self._editar_musica(music_id, row))
 
+    def _editar_musica(self, music_id, row):
         if not row:
             mostrar_mensagem_topo("Erro", "Música não encontrada.", "error")
             return
 
-        titulo, artista, tonalidade, texto_original = row
-        dialog = EditarMusicaDialog(self, "Editar Música", titulo, artista, tonalidade, texto_original)
+        titulo, artista, tonalidade, texto_original, tamanho_fonte = row[:5]
+        dialog = EditarMusicaDialog(self, "Editar Música", titulo, artista, tonalidade, texto_original,
+                                    tamanho_fonte or 11)
         
         if dialog.result:
             novoTitulo, novoArtista, novoTonalidade, novaLetra, novoTamanhoFonte = dialog.result
-            pdf_bytes = gerar_pdf(novoTitulo, novoArtista, novoTonalidade, novaLetra, novoTamanhoFonte)
-            update_music(music_id, novoTitulo, novoArtista, novoTonalidade, pdf_bytes, novaLetra)
-            self.apply_search()
+            self.em_segundo_plano(salvar_edicao, music_id, novoTitulo, novoArtista, novoTonalidade,
+                                  novaLetra, novoTamanhoFonte, erro="Falha ao salvar música",
+                                  ao_concluir=lambda _: self.apply_search(manter_posicao=True))
 
     # ---------- Funções de Grupos (mantidas do código original com pequenas adaptações) ----------
     def gerenciar_grupos_dialog(self):
@@ -1206,6 +1339,9 @@ class SongPDFApp(ctk.CTk):
                             self.mostrar_todas_musicas()
 
                 ctk.CTkButton(grupo_frame, text="❌", width=30, command=excluir).pack(side="right", padx=2)
+                ctk.CTkButton(grupo_frame, text="📄", width=30,
+                              command=lambda g_id=grupo_id, g_nome=nome: self.exportar_setlist(g_id, g_nome)
+                              ).pack(side="right", padx=2)
 
         # ABA 2: Adicionar Múltiplas Músicas
         multiplas_frame = ctk.CTkFrame(tab2)
@@ -1225,8 +1361,21 @@ class SongPDFApp(ctk.CTk):
 
         ctk.CTkLabel(multiplas_frame, text="Selecionar Músicas (apenas músicas não adicionadas):").pack(pady=5)
 
-        scroll_multiplas = ctk.CTkScrollableFrame(multiplas_frame, height=300)
-        scroll_multiplas.pack(fill="both", expand=True, pady=5)
+        # Um único Listbox em vez de um checkbox por música: milhares de linhas
+        # aparecem de uma vez e a seleção múltipla (Ctrl/Shift) é nativa
+        lista_frame = ctk.CTkFrame(multiplas_frame)
+        lista_frame.pack(fill="both", expand=True, pady=5)
+        escuro = ctk.get_appearance_mode() == "Dark"
+        lista_multiplas = Listbox(lista_frame, selectmode="extended", height=15, activestyle="none",
+                                  borderwidth=0, highlightthickness=0,
+                                  bg="#2b2b2b" if escuro else "#f9f9fa", fg="#dce4ee" if escuro else "#1a1a1a",
+                                  selectbackground="#1f6aa5", selectforeground="white")
+        lista_multiplas.pack(side="left", fill="both", expand=True, padx=(5, 0), pady=5)
+        barra_multiplas = ctk.CTkScrollbar(lista_frame, command=lista_multiplas.yview)
+        barra_multiplas.pack(side="right", fill="y")
+        lista_multiplas.configure(yscrollcommand=barra_multiplas.set)
+        # ids na mesma ordem das linhas do Listbox
+        ids_multiplas = []
 
         def carregar_grupos_multiplas():
             grupos = [grupo[1] for grupo in fetch_all_grupos()]
@@ -1234,39 +1383,25 @@ class SongPDFApp(ctk.CTk):
             if grupos:
                 grupos_multiplas_combo.set(grupos[0])
 
+        def musicas_fora_do_grupo(grupo_id):
+            no_grupo = {musica[0] for musica in fetch_musicas_do_grupo(grupo_id)} if grupo_id else set()
+            return [musica for musica in fetch_all_musicas() if musica[0] not in no_grupo]
+
         def carregar_musicas_multiplas():
-            for widget in scroll_multiplas.winfo_children():
-                widget.destroy()
-            
-            # Obter o grupo selecionado
             grupo_nome = grupos_multiplas_var.get()
-            grupo_id = None
-            for g_id, nome, _ in fetch_all_grupos():
-                if nome == grupo_nome:
-                    grupo_id = g_id
-                    break
-            
-            # Obter músicas que já estão no grupo
-            musicas_no_grupo = []
-            if grupo_id:
-                musicas_no_grupo = [musica[0] for musica in fetch_musicas_do_grupo(grupo_id)]
-            
-            # Carregar todas as músicas e filtrar
-            todas_musicas = fetch_all_musicas()
-            for music_id, titulo, artista, tonalidade, favorito in todas_musicas:
-                # Pular músicas que já estão no grupo selecionado
-                if music_id in musicas_no_grupo:
-                    continue
-                    
-                frame = ctk.CTkFrame(scroll_multiplas)
-                frame.pack(fill="x", pady=2)
-
-                var = ctk.BooleanVar()
-                chk = ctk.CTkCheckBox(frame, text=f"{titulo} - {artista or 'Sem artista'}", variable=var)
-                chk.pack(side="left", padx=5, fill="x", expand=True)
-                
-                # Store the music_id with the checkbox
-                chk.music_id = music_id
+            grupo_id = next((g_id for g_id, nome, _ in fetch_all_grupos() if nome == grupo_nome), None)
+
+            def exibir(musicas):
+                if not dialog.winfo_exists():
+                    return
+                lista_multiplas.delete(0, "end")
+                ids_multiplas[:] = [musica[0] for musica in musicas]
+                lista_multiplas.insert("end", *(f"{titulo} - {artista or 'Sem artista'}"
+                                                 for _, titulo, artista, _, _ in musicas))
+
+            # A leitura roda fora da interface; trocar de grupo descarta a leitura anterior
+            self.em_segundo_plano(musicas_fora_do_grupo, grupo_id, ao_concluir=exibir,
+                                  erro="Falha ao carregar músicas", chave="musicas_multiplas")
 
         # Função para atualizar quando o grupo mudar
         def atualizar_musicas_multiplas(*args):
@@ -1276,41 +1411,44 @@ class SongPDFApp(ctk.CTk):
         grupos_multiplas_var.trace("w", atualizar_musicas_multiplas)
 
         def adicionar_multiplas():
-            if not fetch_all_grupos():
+            grupos = {nome: g_id for g_id, nome, _ in fetch_all_grupos()}
+            if not grupos:
                 mostrar_mensagem_topo("Aviso", "Crie um grupo primeiro!", "warning")
                 return
-                
+
             grupo_nome = grupos_multiplas_var.get()
-            grupo_id = None
-            for g_id, nome, _ in fetch_all_grupos():
-                if nome == grupo_nome:
-                    grupo_id = g_id
-                    break
-            
+            grupo_id = grupos.get(grupo_nome)
             if not grupo_id:
                 mostrar_mensagem_topo("Erro", "Grupo não encontrado!", "error")
                 return
-            
-            musicas_selecionadas = []
-            for widget in scroll_multiplas.winfo_children():
-                if hasattr(widget, 'winfo_children'):
-                    for child in widget.winfo_children():
-                        if isinstance(child, ctk.CTkCheckBox) and child._variable.get():
-                            musicas_selecionadas.append(child.music_id)
-            
+
+            indices = lista_multiplas.curselection()
+            musicas_selecionadas = [ids_multiplas[i] for i in indices]
             if not musicas_selecionadas:
                 mostrar_mensagem_topo("Aviso", "Selecione pelo menos uma música!", "warning")
                 return
-            
-            # Adicionar cada música ao grupo
-            adicionadas = 0
-            for music_id in musicas_selecionadas:
-                if adicionar_musica_ao_grupo(music_id, grupo_id):
-                    adicionadas += 1
-            
-            mostrar_mensagem_topo("Sucesso", f"{adicionadas} músicas adicionadas ao grupo '{grupo_nome}'!", "info")
-            carregar_musicas_multiplas() 
-            self.apply_search() 
+
+            # Todas as músicas em uma única transação
+            def concluido(contagens):
+                adicionadas, ja_presentes, inexistentes = contagens
+                mensagem = f"{adicionadas} músicas adicionadas ao grupo '{grupo_nome}'!"
+                if ja_presentes:
+                    mensagem += f"\n{ja_presentes} já estavam no grupo."
+                if inexistentes:
+                    # Excluídas depois que a lista foi carregada
+                    mensagem += f"\n{len(inexistentes)} não existem mais na biblioteca."
+                mostrar_mensagem_topo("Sucesso", mensagem, "info")
+                # Só tira da lista as linhas adicionadas, sem recarregar as demais
+                if dialog.winfo_exists() and grupos_multiplas_var.get() == grupo_nome:
+                    adicionados = set(musicas_selecionadas)
+                    for i in range(len(ids_multiplas) - 1, -1, -1):
+                        if ids_multiplas[i] in adicionados:
+                            lista_multiplas.delete(i)
+                            del ids_multiplas[i]
+                self.apply_search()
+
+            self.em_segundo_plano(adicionar_musicas_ao_grupo, musicas_selecionadas, grupo_id,
+                                  ao_concluir=concluido, erro="Falha ao adicionar ao grupo")
 
         ctk.CTkButton(multiplas_frame, text="Adicionar Selecionadas ao Grupo", 
                     command=adicionar_multiplas).pack(pady=10)
@@ -1362,142 +1500,133 @@ class SongPDFApp(ctk.CTk):
         if not path:
             return
 
-        try:
-            texto = ""
-            
-            if path.lower().endswith('.docx'):
-                # Processar arquivo DOCX
-                doc = Document(path)
-                for paragraph in doc.paragraphs:
-                    texto += paragraph.text + "\n"
+        def falhou(e):
+            if isinstance(e, ValueError):
+                # Documento sem título e artista/tonalidade
+                mostrar_mensagem_topo("Erro", str(e), "error")
             else:
-                # Processar arquivo PDF
-                reader = PyPDF2.PdfReader(path)
-                for page in reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        texto += page_text + "\n"
-
-            # Função para limpar caracteres especiais sem remover quebras de linha
-            def limpar_texto(texto):
-                return ''.join(
-                    char for char in texto if ord(char) >= 32 or ord(char) in [9, 10, 13]
-                )
-
-            # Mantém linhas vazias do PDF
-            linhas = [limpar_texto(l) for l in texto.splitlines()]
-
-            if len([l for l in linhas if l.strip()]) < 2:
-                mostrar_mensagem_topo("Erro", "Documento inválido: precisa ter pelo menos título e artista/tonalidade.", "error")
+                mostrar_mensagem_topo("Erro", f"Falha ao importar documento: {e}", "error")
+
+        # A extração de PDFs grandes é lenta: roda fora da thread da interface
+        self.tarefas.enviar(lambda: interpretar_documento(extrair_texto(path)),
+                            ao_concluir=self._confirmar_importacao, ao_falhar=falhou)
+
+    def _confirmar_importacao(self, documento):
+        titulo, artista, tonalidade, letra = documento
+
+        # Diálogo de confirmação
+        confirm_dialog = ctk.CTkToplevel(self)
+        confirm_dialog.title("Confirmar Importação")
+        confirm_dialog.geometry("400x500")
+        confirm_dialog.transient(self)
+        confirm_dialog.grab_set()
+
+        ctk.CTkLabel(confirm_dialog, text="Título:").pack(pady=5)
+        titulo_entry = ctk.CTkEntry(confirm_dialog, width=350)
+        titulo_entry.insert(0, titulo)
+        titulo_entry.pack(fill="x", padx=20)
+
+        ctk.CTkLabel(confirm_dialog, text="Artista:").pack(pady=5)
+        artista_entry = ctk.CTkEntry(confirm_dialog, width=350)
+        artista_entry.insert(0, artista)
+        artista_entry.pack(fill="x", padx=20)
+
+        ctk.CTkLabel(confirm_dialog, text="Tonalidade:").pack(pady=5)
+        tonalidade_entry = ctk.CTkEntry(confirm_dialog, width=350)
+        tonalidade_entry.insert(0, tonalidade)
+        tonalidade_entry.pack(fill="x", padx=20)
+
+        ctk.CTkLabel(confirm_dialog, text="Letra (apenas leitura):").pack(pady=5)
+        letra_text = ctk.CTkTextbox(confirm_dialog, height=180)
+        letra_text.pack(fill="x", padx=20, pady=5)
+        letra_text.insert("1.0", letra)
+        letra_text.configure(state="normal")
+
+        def confirm_import():
+            titulo_final = remover_caracteres_invisiveis(titulo_entry.get().strip())
+            artista_final = remover_caracteres_invisiveis(artista_entry.get().strip())
+            tonalidade_final = remover_caracteres_invisiveis(tonalidade_entry.get().strip())
+
+            if not titulo_final:
+                mostrar_mensagem_topo("Aviso", "O título é obrigatório.", "warning")
                 return
 
-            titulo = limpar_texto(linhas[0]).strip()
-            artista, tonalidade = "", ""
-
-            # Analisa a segunda linha para separar artista e tonalidade
-            linha2 = limpar_texto(linhas[1]).strip()
-
-            separadores = ["•", "-", "|", ":", ";", "–", "—"]
-            encontrou_separador = False
-            for sep in separadores:
-                if sep in linha2:
-                    partes = [limpar_texto(x).strip() for x in linha2.split(sep)]
-                    if len(partes) >= 2:
-                        artista = partes[0]
-                        tonalidade = partes[1]
-                        if len(partes) > 2:
-                            tonalidade = sep.join(partes[1:])
-                        encontrou_separador = True
-                        break
-
-            if not encontrou_separador:
-                palavras_tonalidade = [
-                    "C", "D", "E", "F", "G", "A", "B",
-                    "Cm", "Dm", "Em", "Fm", "Gm", "Am", "Bm",
-                    "C#", "D#", "F#", "G#", "A#",
-                    "Db", "Eb", "Gb", "Ab", "Bb",
-                    "Dó", "Ré", "Mi", "Fá", "Sol", "Lá", "Si",
-                    "Dóm", "Rém", "Mim", "Fám", "Solm", "Lám", "Sim"
-                ]
-                palavras = linha2.split()
-                if palavras and any(palavras[-1].upper() == p.upper() for p in palavras_tonalidade):
-                    artista = " ".join(palavras[:-1])
-                    tonalidade = palavras[-1]
-                else:
-                    artista = linha2
-
-            def remover_caracteres_invisiveis(texto):
-                caracteres_invisiveis = [
-                    '\x00', '\x01', '\x02', '\x03', '\x04', '\x05', '\x06', '\x07',
-                    '\x08', '\x0b', '\x0c', '\x0e', '\x0f', '\x10', '\x11', '\x12',
-                    '\x13', '\x14', '\x15', '\x16', '\x17', '\x18', '\x19', '\x1a',
-                    '\x1b', '\x1c', '\x1d', '\x1e', '\x1f', '\x7f', '\x80', '\x81',
-                    '\x82', '\x83', '\x84', '\x85', '\x86', '\x87', '\x88', '\x89',
-                    '\x8a', '\x8b', '\x8c', '\x8d', '\x8e', '\x8f', '\x90', '\x91',
-                    '\x92', '\x93', '\x94', '\x95', '\x96', '\x97', '\x98', '\x99',
-                    '\x9a', '\x9b', '\x9c', '\x9d', '\x9e', '\x9f', '\ad', '\ae'
-                ]
-                for char in caracteres_invisiveis:
-                    texto = texto.replace(char, '')
-                return texto.strip()
-
-            artista = remover_caracteres_invisiveis(artista)
-            tonalidade = remover_caracteres_invisiveis(tonalidade)
-
-            # Mantém quebras de linha originais a partir da 3ª linha
-            letra = "\n".join(linhas[2:]) if len(linhas) > 2 else ""
-
-            # Diálogo de confirmação
-            confirm_dialog = ctk.CTkToplevel(self)
-            confirm_dialog.title("Confirmar Importação")
-            confirm_dialog.geometry("400x500")
-            confirm_dialog.transient(self)
-            confirm_dialog.grab_set()
-
-            ctk.CTkLabel(confirm_dialog, text="Título:").pack(pady=5)
-            titulo_entry = ctk.CTkEntry(confirm_dialog, width=350)
-            titulo_entry.insert(0, titulo)
-            titulo_entry.pack(fill="x", padx=20)
-
-            ctk.CTkLabel(confirm_dialog, text="Artista:").pack(pady=5)
-            artista_entry = ctk.CTkEntry(confirm_dialog, width=350)
-            artista_entry.insert(0, artista)
-            artista_entry.pack(fill="x", padx=20)
-
-            ctk.CTkLabel(confirm_dialog, text="Tonalidade:").pack(pady=5)
-            tonalidade_entry = ctk.CTkEntry(confirm_dialog, width=350)
-            tonalidade_entry.insert(0, tonalidade)
-            tonalidade_entry.pack(fill="x", padx=20)
-
-            ctk.CTkLabel(confirm_dialog, text="Letra (apenas leitura):").pack(pady=5)
-            letra_text = ctk.CTkTextbox(confirm_dialog, height=180)
-            letra_text.pack(fill="x", padx=20, pady=5)
-            letra_text.insert("1.0", letra)
-            letra_text.configure(state="normal")
-
-            def confirm_import():
-                titulo_final = remover_caracteres_invisiveis(titulo_entry.get().strip())
-                artista_final = remover_caracteres_invisiveis(artista_entry.get().strip())
-                tonalidade_final = remover_caracteres_invisiveis(tonalidade_entry.get().strip())
-
-                if not titulo_final:
-                    mostrar_mensagem_topo("Aviso", "O título é obrigatório.", "warning")
-                    return
-
-                pdf_bytes = gerar_pdf(titulo_final, artista_final, tonalidade_final, letra)
-                music_id = insert_music(titulo_final, artista_final, tonalidade_final, pdf_bytes, letra)
-
+            def concluir(music_id):
                 if mostrar_mensagem_topo("Grupos", "Deseja adicionar esta música a algum grupo?", "yesno"):
                     self.gerenciar_grupos_musica(music_id, titulo_final)
-
-                confirm_dialog.destroy()
                 self.apply_search()
                 mostrar_mensagem_topo("Sucesso", "Documento importado com sucesso!", "info")
 
-            ctk.CTkButton(confirm_dialog, text="Confirmar Importação", command=confirm_import).pack(pady=20)
+            confirm_dialog.destroy()
+            self.em_segundo_plano(salvar_nova_musica, titulo_final, artista_final, tonalidade_final, letra,
+                                  ao_concluir=concluir, erro="Falha ao importar documento")
 
-        except Exception as e:
-            mostrar_mensagem_topo("Erro", f"Falha ao importar documento: {e}", "error")
+        ctk.CTkButton(confirm_dialog, text="Confirmar Importação", command=confirm_import).pack(pady=20)
+
+    def importar_pasta_dialog(self):
+        diretorio = filedialog.askdirectory(title="Selecione a pasta com PDFs/DOCX")
+        if not diretorio:
+            return
+
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Importar Pasta")
+        dialog.geometry("420x220")
+        dialog.transient(self)
+        dialog.grab_set()
+
+        ctk.CTkLabel(dialog, text="Importando documentos...", font=ctk.CTkFont(weight="bold")).pack(pady=(20, 10))
+        barra = ctk.CTkProgressBar(dialog)
+        barra.pack(fill="x", padx=20, pady=10)
+        barra.set(0)
+        status_label = ctk.CTkLabel(dialog, text="Lendo a pasta...", text_color="gray")
+        status_label.pack(pady=5)
+
+        # Mesmo esquema do regenerar_pdfs_dialog: thread de trabalho + leitura periódica do estado
+        estado = {"progresso": None, "resultado": None, "erro": None}
+        cancelar = threading.Event()
+
+        def trabalho():
+            try:
+                estado["resultado"] = importar_pasta(
+                    diretorio,
+                    renderizar=not render_sob_demanda(),
+                    progresso=lambda feitos, total, vel: estado.update(progresso=(feitos, total, vel)),
+                    cancelar=cancelar,
+                )
+            except Exception as e:
+                estado["erro"] = e
+
+        def acompanhar():
+            if not dialog.winfo_exists():
+                return
+            if estado["progresso"]:
+                feitos, total, vel = estado["progresso"]
+                barra.set(feitos / total if total else 1)
+                status_label.configure(text=f"{feitos}/{total} arquivos • {vel:.1f} arquivos/s")
+            if estado["erro"]:
+                dialog.destroy()
+                mostrar_mensagem_topo("Erro", f"Falha ao importar pasta: {estado['erro']}", "error")
+            elif estado["resultado"]:
+                r = estado["resultado"]
+                dialog.destroy()
+                self.apply_search()
+                situacao = "Cancelado" if r["cancelado"] else "Concluído"
+                resumo = (f"{situacao} em {r['segundos']:.1f}s.\n\n"
+                          f"Importadas: {r['importadas']}\n"
+                          f"Duplicadas (ignoradas): {len(r['duplicadas'])}\n"
+                          f"Falhas: {len(r['falhas'])}")
+                if r["falhas"]:
+                    resumo += "\n\n" + "\n".join(
+                        f"{os.path.basename(caminho)}: {erro}" for caminho, erro in r["falhas"][:10])
+                    if len(r["falhas"]) > 10:
+                        resumo += f"\n... e mais {len(r['falhas']) - 10}"
+                mostrar_mensagem_topo("Importar Pasta", resumo, "info")
+            else:
+                dialog.after(200, acompanhar)
+
+        ctk.CTkButton(dialog, text="Cancelar", command=cancelar.set).pack(pady=10)
+        threading.Thread(target=trabalho, daemon=True).start()
+        acompanhar()
 
 
 class EditarMusicaDialog:
@@ -1584,6 +1713,26 @@ class EditarMusicaDialog:
         self.dialog.destroy()
 
 
-if __name__ == "__main__":
+def main():
+    # Primeiro de tudo: no executável do PyInstaller os processos do pool entram
+    # por aqui e param em freeze_support(). Com spawn (Windows) eles importam este
+    # módulo sem passar por main(), então nada abaixo pode ficar no nível do módulo.
+    multiprocessing.freeze_support()
+
+    # PyPDF2 e python-docx só são importados ao importar/exportar documentos;
+    # aqui apenas se confere que estão instalados
+    if importlib.util.find_spec("PyPDF2") is None or importlib.util.find_spec("docx") is None:
+        messagebox.showerror("Erro", "Bibliotecas necessárias não instaladas. Instale com: pip install PyPDF2 python-docx")
+        return
+
+    # inicializa banco padrão se ainda não existir
+    inicializar_banco(DB_FILE)
+    definir_banco(DB_FILE)
+
     app = SongPDFApp()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+    fechar_conexao()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
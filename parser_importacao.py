@@ -0,0 +1,94 @@
+import re
+
+# ------------------ PARSER DE DOCUMENTOS IMPORTADOS ------------------
+# Separa o texto extraído de um PDF/DOCX em título, artista, tonalidade e letra.
+# Não depende da interface nem do banco: é usado pelo diálogo de importação,
+# pela importação de pastas e pela linha de comando. A limpeza é feita em uma
+# passada em C sobre o texto todo, em vez de laços por caractere ou de um
+# str.replace por caractere.
+
+# Caracteres de controle, exceto tabulação e quebras de linha. Em UTF-8 eles só
+# aparecem como bytes isolados, então podem ser apagados direto nos bytes
+# (bem mais rápido que regex ou str.translate em textos com acentos).
+CONTROLE = bytes([*range(9), 11, 12, *range(14, 32)])
+
+# Controles C0 e C1, DEL e o hífen opcional (U+00AD), que não aparece na tela
+RE_INVISIVEIS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f\xad]+")
+
+# Ordem de prioridade: o primeiro separador presente na linha é o usado
+SEPARADORES = ("•", "-", "|", ":", ";", "–", "—")
+
+TONALIDADES = frozenset(nome.upper() for nome in (
+    "C", "D", "E", "F", "G", "A", "B",
+    "Cm", "Dm", "Em", "Fm", "Gm", "Am", "Bm",
+    "C#", "D#", "F#", "G#", "A#",
+    "Db", "Eb", "Gb", "Ab", "Bb",
+    "Dó", "Ré", "Mi", "Fá", "Sol", "Lá", "Si",
+    "Dóm", "Rém", "Mim", "Fám", "Solm", "Lám", "Sim",
+))
+
+_NAO_VAZIA = re.compile(r"\S")
+
+
+def limpar_texto(texto):
+    """Remove caracteres de controle sem remover tabulações e quebras de linha"""
+    return texto.encode("utf-8", "surrogatepass").translate(None, CONTROLE).decode("utf-8", "surrogatepass")
+
+
+def remover_caracteres_invisiveis(texto):
+    return RE_INVISIVEIS.sub("", texto).strip()
+
+
+def eh_tonalidade(palavra):
+    return palavra.upper() in TONALIDADES
+
+
+def separar_artista_tonalidade(linha):
+    """Divide a linha de informações em (artista, tonalidade).
+
+    Usa o primeiro separador conhecido; sem separador, a última palavra é a
+    tonalidade se for uma tonalidade conhecida, senão a linha toda é o artista.
+    """
+    linha = linha.strip()
+    for sep in SEPARADORES:
+        if sep in linha:
+            partes = [parte.strip() for parte in linha.split(sep)]
+            artista = partes[0]
+            tonalidade = sep.join(partes[1:]) if len(partes) > 2 else partes[1]
+            break
+    else:
+        palavras = linha.split()
+        if palavras and eh_tonalidade(palavras[-1]):
+            artista = " ".join(palavras[:-1])
+            tonalidade = palavras[-1]
+        else:
+            artista, tonalidade = linha, ""
+
+    return remover_caracteres_invisiveis(artista), remover_caracteres_invisiveis(tonalidade)
+
+
+def interpretar_documento(texto):
+    """Separa o texto extraído em (titulo, artista, tonalidade, letra).
+
+    A 1ª linha é o título, a 2ª traz artista e tonalidade e o resto é a letra,
+    com as linhas vazias e quebras originais mantidas.
+    Levanta ValueError se o documento não tiver pelo menos duas linhas com texto.
+    """
+    linhas = texto.splitlines()
+
+    # Basta achar duas linhas com texto; não é preciso percorrer o documento inteiro
+    nao_vazias = 0
+    for linha in linhas:
+        if _NAO_VAZIA.search(limpar_texto(linha)):
+            nao_vazias += 1
+            if nao_vazias == 2:
+                break
+    if nao_vazias < 2:
+        raise ValueError("Documento inválido: precisa ter pelo menos título e artista/tonalidade.")
+
+    titulo = limpar_texto(linhas[0]).strip()
+    artista, tonalidade = separar_artista_tonalidade(limpar_texto(linhas[1]))
+
+    # Uma única passada de limpeza sobre a letra inteira
+    letra = limpar_texto("\n".join(linhas[2:]))
+    return titulo, artista, tonalidade, letra
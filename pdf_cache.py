@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ------------------ CACHE DE PDFs RENDERIZADOS ------------------
+# No modo sob demanda o banco guarda só o texto e os parâmetros de renderização;
+# o PDF é gerado na primeira abertura e fica guardado aqui, em memória (LRU) e em
+# disco, sob uma chave derivada de tudo o que influencia o resultado.
+
+def chave_render(titulo, artista, tonalidade, letra, tamanho_fonte=11,
+                 incluir_cabecalho=True, incluir_numero_pagina=True, fonte="", versao_layout=1):
+    """Hash das entradas da renderização: conteúdo igual + parâmetros iguais = mesmo PDF"""
+    if not incluir_cabecalho:
+        # Sem cabeçalho, título/artista/tonalidade não aparecem no PDF
+        titulo = artista = tonalidade = ""
+    entradas = [
+        titulo or "", artista or "", tonalidade or "", letra or "",
+        int(tamanho_fonte or 11), bool(incluir_cabecalho), bool(incluir_numero_pagina),
+        fonte, versao_layout,
+    ]
+    dados = json.dumps(entradas, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(dados.encode("utf-8")).hexdigest()
+
+
+class CachePDF:
+    """Cache LRU de PDFs em dois níveis: memória e diretório em disco"""
+
+    def __init__(self, diretorio, max_memoria=64 * 1024 * 1024, max_disco=512 * 1024 * 1024):
+        self.diretorio = diretorio
+        self.max_memoria = max_memoria
+        self.max_disco = max_disco
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.pdf")
+
+    def obter(self, chave):
+        with self._lock:
+            pdf_bytes = self._memoria.get(chave)
+            if pdf_bytes is not None:
+                self._memoria.move_to_end(chave)
+                return pdf_bytes
+
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "rb") as f:
+                pdf_bytes = f.read()
+        except OSError:
+            return None
+        # Marca como usado recentemente para a limpeza do disco
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+        self._guardar_memoria(chave, pdf_bytes)
+        return pdf_bytes
+
+    def guardar(self, chave, pdf_bytes):
+        self._guardar_memoria(chave, pdf_bytes)
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = self._caminho(chave) + ".tmp"
+            with open(temporario, "wb") as f:
+                f.write(pdf_bytes)
+            os.replace(temporario, self._caminho(chave))
+            self._limpar_disco()
+        except OSError as e:
+            print(f"Erro ao gravar cache de PDF: {e}")
+
+    def invalidar(self, chave):
+        with self._lock:
+            pdf_bytes = self._memoria.pop(chave, None)
+            if pdf_bytes is not None:
+                self._bytes_memoria -= len(pdf_bytes)
+        try:
+            os.remove(self._caminho(chave))
+        except OSError:
+            pass
+
+    def _guardar_memoria(self, chave, pdf_bytes):
+        with self._lock:
+            antigo = self._memoria.pop(chave, None)
+            if antigo is not None:
+                self._bytes_memoria -= len(antigo)
+            self._memoria[chave] = pdf_bytes
+            self._bytes_memoria += len(pdf_bytes)
+            while self._bytes_memoria > self.max_memoria and len(self._memoria) > 1:
+                _, removido = self._memoria.popitem(last=False)
+                self._bytes_memoria -= len(removido)
+
+    def _limpar_disco(self):
+        arquivos = []
+        total = 0
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.endswith(".pdf"):
+                info = entrada.stat()
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+                total += info.st_size
+        if total <= self.max_disco:
+            return
+        # Remove primeiro os menos usados recentemente
+        for _, tamanho, caminho in sorted(arquivos):
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+            if total <= self.max_disco:
+                break
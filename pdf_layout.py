@@ -0,0 +1,148 @@
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+
+# ------------------ LAYOUT DE TEXTO ------------------
+# Calcula onde cada linha da letra vai parar (quebras de linha e de página)
+# separadamente do desenho. Cada palavra é medida uma única vez por
+# (fonte, tamanho) e as linhas são quebradas somando larguras já conhecidas,
+# em vez de medir de novo a linha inteira a cada palavra.
+MARGEM = 50
+LIMITE_INFERIOR = 50
+
+_larguras = {}
+
+
+def tabela_larguras(fonte, tamanho):
+    """Tabela palavra -> largura compartilhada por todas as músicas com a mesma fonte/tamanho"""
+    chave = (fonte, tamanho)
+    tabela = _larguras.get(chave)
+    if tabela is None:
+        tabela = _larguras[chave] = {}
+    return tabela
+
+
+def largura(texto, fonte, tamanho):
+    tabela = tabela_larguras(fonte, tamanho)
+    valor = tabela.get(texto)
+    if valor is None:
+        valor = tabela[texto] = pdfmetrics.stringWidth(texto, fonte, tamanho)
+    return valor
+
+
+def quebrar_linha(palavras, largura_max, fonte, tamanho):
+    """Quebra uma linha em tempo linear; cada trecho mantém o espaço final, como no desenho original"""
+    tabela = tabela_larguras(fonte, tamanho)
+    espaco = largura(" ", fonte, tamanho)
+    trechos = []
+    atual = []
+    largura_atual = 0.0
+
+    for palavra in palavras:
+        w = tabela.get(palavra)
+        if w is None:
+            w = tabela[palavra] = pdfmetrics.stringWidth(palavra, fonte, tamanho)
+        w += espaco
+        if largura_atual + w > largura_max and atual:
+            trechos.append(" ".join(atual) + " ")
+            atual = [palavra]
+            largura_atual = w
+        else:
+            atual.append(palavra)
+            largura_atual += w
+
+    if atual:
+        trechos.append(" ".join(atual) + " ")
+    return trechos
+
+
+def montar_layout(titulo, artista, tonalidade, letra, fonte, fonte_negrito,
+                  tamanho_fonte=11, incluir_cabecalho=True, pagina=A4):
+    """Monta o layout de uma música.
+
+    Retorna a lista de páginas; cada página é uma lista de operações
+    (fonte, tamanho, x, y, texto) prontas para desenhar_layout.
+    """
+    width, height = pagina
+    paginas = [[]]
+    operacoes = paginas[0]
+
+    if incluir_cabecalho:
+        titulo_x = (width - largura(titulo, fonte_negrito, 16)) / 2
+        operacoes.append((fonte_negrito, 16, titulo_x, height - 50, titulo))
+
+        # Formata a linha de artista e tonalidade
+        info_line = ""
+        if artista and tonalidade:
+            info_line = f"{artista} • {tonalidade}"
+        elif artista:
+            info_line = artista
+        elif tonalidade:
+            info_line = tonalidade
+
+        if info_line:
+            info_x = (width - largura(info_line, fonte, 12)) / 2
+            operacoes.append((fonte, 12, info_x, height - 70, info_line))
+
+        y_position = height - 100
+    else:
+        y_position = height - 50
+
+    line_height = tamanho_fonte + 3
+    max_width = width - (2 * MARGEM)
+
+    # Manter as quebras de linha originais
+    for line in letra.splitlines():
+        if y_position < LIMITE_INFERIOR:
+            operacoes = []
+            paginas.append(operacoes)
+            y_position = height - 50
+
+        if line.strip():
+            trechos = quebrar_linha(line.split(), max_width, fonte, tamanho_fonte)
+            for pos, trecho in enumerate(trechos):
+                if pos > 0:
+                    y_position -= line_height
+                    if y_position < LIMITE_INFERIOR:
+                        operacoes = []
+                        paginas.append(operacoes)
+                        y_position = height - 50
+                operacoes.append((fonte, tamanho_fonte, MARGEM, y_position, trecho))
+
+        y_position -= line_height
+
+    return paginas
+
+
+def desenhar_layout(c, paginas, fonte_numero, incluir_numero_pagina=True,
+                    primeiro_numero=1, numerar_primeira=False, pagina=A4):
+    """Reproduz o layout no canvas, numerando as páginas a partir de primeiro_numero.
+
+    Por padrão a primeira página não recebe número (como no PDF de uma música);
+    numerar_primeira serve para documentos com numeração contínua.
+    """
+    width, _ = pagina
+    fonte_atual = None
+    vazia = True
+
+    for indice, operacoes in enumerate(paginas):
+        if indice > 0:
+            c.showPage()
+            fonte_atual = None
+        vazia = not operacoes
+
+        numero = primeiro_numero + indice
+        if incluir_numero_pagina and (indice > 0 or numerar_primeira):
+            c.setFont(fonte_numero, 9)
+            fonte_atual = (fonte_numero, 9)
+            c.drawString(width - 50, 30, f"Página {numero}")
+            vazia = False
+
+        for fonte, tamanho, x, y, texto in operacoes:
+            if fonte_atual != (fonte, tamanho):
+                c.setFont(fonte, tamanho)
+                fonte_atual = (fonte, tamanho)
+            c.drawString(x, y, texto)
+
+    # O canvas só fecha a última página no save() se ela tiver conteúdo
+    if vazia:
+        c.showPage()
@@ -0,0 +1,64 @@
+import os
+import threading
+from io import BytesIO
+
+from pdf_cache import chave_render
+
+# Fontes Unicode para suporte a caracteres especiais. O nome da fonte é decidido
+# só pela presença dos arquivos, sem carregar o reportlab; ler e registrar os
+# TTF (a parte cara) fica para o primeiro PDF gerado no processo.
+FONTES_TTF = (
+    ('DejaVuSans', 'assets/fonts/DejaVuSans.ttf'),
+    ('DejaVuSans-Bold', 'assets/fonts/DejaVuSans-Bold.ttf'),
+)
+if all(os.path.exists(caminho) for _, caminho in FONTES_TTF):
+    FONT_NAME = 'DejaVuSans'
+    FONT_NAME_BOLD = 'DejaVuSans-Bold'
+else:
+    # Fallback para fontes padrão
+    FONT_NAME = 'Helvetica'
+    FONT_NAME_BOLD = 'Helvetica-Bold'
+
+_fontes_registradas = False
+_lock_fontes = threading.Lock()
+
+def registrar_fontes():
+    """Registra as fontes TTF no reportlab uma única vez por processo"""
+    global _fontes_registradas
+    if _fontes_registradas:
+        return
+    with _lock_fontes:
+        if not _fontes_registradas:
+            if FONT_NAME != 'Helvetica':
+                from reportlab.pdfbase import pdfmetrics
+                from reportlab.pdfbase.ttfonts import TTFont
+                for nome, caminho in FONTES_TTF:
+                    pdfmetrics.registerFont(TTFont(nome, caminho))
+            _fontes_registradas = True
+
+# Incrementar quando o layout de gerar_pdf mudar, invalidando o cache
+VERSAO_LAYOUT = 1
+
+def chave_render_musica(dados):
+    """chave_render para (titulo, artista, tonalidade, letra, tamanho_fonte, cabecalho, numero_pagina)"""
+    return chave_render(*dados, fonte=FONT_NAME, versao_layout=VERSAO_LAYOUT)
+
+# ------------------ PDF ------------------
+def gerar_pdf(titulo, artista, tonalidade, letra, tamanho_fonte=11, incluir_cabecalho=True, incluir_numero_pagina=True):
+    # reportlab só é importado na primeira renderização (não pesa na abertura do aplicativo)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from pdf_layout import montar_layout, desenhar_layout
+
+    registrar_fontes()
+    buffer = BytesIO()
+    # invariant=1 torna a saída determinística (sem data de criação), permitindo deduplicar
+    c = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+
+    paginas = montar_layout(titulo, artista, tonalidade, letra, FONT_NAME, FONT_NAME_BOLD,
+                            tamanho_fonte, incluir_cabecalho)
+    desenhar_layout(c, paginas, FONT_NAME, incluir_numero_pagina)
+
+    c.save()
+    buffer.seek(0)
+    return buffer.read()
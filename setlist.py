@@ -0,0 +1,162 @@
+import math
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from database import fetch_pdf, iterar_dados_render_grupo
+from pdf_layout import montar_layout, desenhar_layout, largura
+from pdf_render import gerar_pdf, chave_render_musica, registrar_fontes, FONT_NAME, FONT_NAME_BOLD
+
+# ------------------ SETLIST ------------------
+# Exporta um grupo inteiro como um único PDF com índice, marcadores e
+# numeração de páginas contínua. No modo padrão as músicas são lidas uma a uma
+# do banco e desenhadas direto no arquivo final; nenhuma lista de PDFs é mantida
+# em memória. O modo que reaproveita os PDFs armazenados depende do PdfWriter do
+# PyPDF2, que guarda todas as páginas até gravar: a memória cresce com o grupo.
+LINHA_INDICE = 18
+TOPO_INDICE = 110
+RODAPE_INDICE = 60
+
+
+def _entradas_por_pagina_indice():
+    _, height = A4
+    return int((height - TOPO_INDICE - RODAPE_INDICE) // LINHA_INDICE)
+
+
+def paginas_do_indice(quantidade):
+    return max(1, math.ceil(quantidade / _entradas_por_pagina_indice()))
+
+
+def _layout(row):
+    _, titulo, artista, tonalidade, letra, tamanho_fonte, cabecalho, _, _, _ = row
+    return montar_layout(titulo, artista, tonalidade, letra or "", FONT_NAME, FONT_NAME_BOLD,
+                         tamanho_fonte or 11, bool(cabecalho))
+
+
+def desenhar_indice(c, nome, entradas, primeiro_numero=1):
+    """Desenha o índice; entradas é uma lista de (titulo, artista, pagina, destino ou None)"""
+    width, height = A4
+    por_pagina = _entradas_por_pagina_indice()
+    total_paginas = paginas_do_indice(len(entradas))
+
+    for indice_pagina in range(total_paginas):
+        if indice_pagina > 0:
+            c.showPage()
+        if indice_pagina == 0:
+            c.bookmarkPage("indice")
+            c.addOutlineEntry("Índice", "indice", level=0)
+            c.setFont(FONT_NAME_BOLD, 18)
+            c.drawCentredString(width / 2, height - 60, nome)
+            c.setFont(FONT_NAME, 11)
+            c.drawCentredString(width / 2, height - 80, f"{len(entradas)} música(s)")
+
+        y = height - TOPO_INDICE
+        for titulo, artista, pagina, destino in entradas[indice_pagina * por_pagina:(indice_pagina + 1) * por_pagina]:
+            texto = f"{titulo} — {artista}" if artista else titulo
+            numero = str(pagina)
+            c.setFont(FONT_NAME, 11)
+            c.drawString(50, y, texto)
+            c.drawRightString(width - 50, y, numero)
+            # Pontilhado entre o título e o número da página
+            inicio = 50 + largura(texto, FONT_NAME, 11) + 6
+            fim = width - 50 - largura(numero, FONT_NAME, 11) - 6
+            if fim > inicio:
+                pontos = "." * int((fim - inicio) // largura(".", FONT_NAME, 11))
+                c.drawRightString(fim, y, pontos)
+            if destino:
+                c.linkRect("", destino, (50, y - 3, width - 50, y + 11), relative=0)
+            y -= LINHA_INDICE
+
+        c.setFont(FONT_NAME, 9)
+        c.drawString(width - 50, 30, f"Página {primeiro_numero + indice_pagina}")
+
+
+def exportar_setlist(grupo_id, nome, destino, numeracao_continua=True):
+    """Exporta as músicas do grupo em um único PDF salvo em destino (caminho ou arquivo).
+
+    Com numeracao_continua (padrão) as músicas são renderizadas direto no documento
+    final, com "Página N" contínuo em todas as páginas. Sem ela, os PDFs
+    armazenados que estiverem em dia são reaproveitados página a página (cada
+    música mantém a sua numeração) e só os desatualizados são renderizados; nesse
+    modo todos os PDFs do grupo ficam em memória até o arquivo ser gravado.
+    Retorna a quantidade de músicas exportadas.
+    """
+    registrar_fontes()
+    if numeracao_continua:
+        return _exportar_renderizando(grupo_id, nome, destino)
+    return _exportar_mesclando(grupo_id, nome, destino)
+
+
+def _exportar_renderizando(grupo_id, nome, destino):
+    # 1ª passada: só conta as páginas de cada música para montar o índice
+    contagens = [(row[1], row[2], len(_layout(row))) for row in iterar_dados_render_grupo(grupo_id)]
+    paginas_indice = paginas_do_indice(len(contagens))
+
+    entradas = []
+    pagina = paginas_indice + 1
+    for posicao, (titulo, artista, quantidade) in enumerate(contagens):
+        entradas.append((titulo, artista, pagina, f"musica_{posicao}"))
+        pagina += quantidade
+
+    c = canvas.Canvas(destino, pagesize=A4, invariant=1)
+    c.setTitle(nome)
+    desenhar_indice(c, nome, entradas)
+
+    # 2ª passada: desenha cada música logo após calcular o seu layout
+    for posicao, row in enumerate(iterar_dados_render_grupo(grupo_id)):
+        if posicao >= len(entradas):
+            break
+        titulo, _, primeira, destino_link = entradas[posicao]
+        c.showPage()
+        c.bookmarkPage(destino_link)
+        c.addOutlineEntry(titulo, destino_link, level=0)
+        desenhar_layout(c, _layout(row), FONT_NAME, True, primeira, numerar_primeira=True)
+
+    c.save()
+    return len(entradas)
+
+
+def _exportar_mesclando(grupo_id, nome, destino):
+    from PyPDF2 import PdfReader, PdfWriter
+
+    # Cada PdfReader continua referenciado pelas páginas copiadas até writer.write:
+    # é o preço de não renderizar de novo as músicas em dia
+    writer = PdfWriter()
+    musicas = []
+    for row in iterar_dados_render_grupo(grupo_id):
+        music_id, titulo, artista, tonalidade, letra, tamanho_fonte, cabecalho, numero_pagina, render_hash, tem_pdf = row
+        dados = (titulo, artista, tonalidade, letra or "", tamanho_fonte or 11, bool(cabecalho), bool(numero_pagina))
+        pdf_bytes = None
+        # Reaproveita o PDF armazenado se ele corresponde às entradas atuais (ou é legado)
+        if tem_pdf and render_hash in (None, chave_render_musica(dados)):
+            pdf_bytes = fetch_pdf(music_id)
+        if not pdf_bytes:
+            pdf_bytes = gerar_pdf(*dados)
+
+        inicio = len(writer.pages)
+        for page in PdfReader(BytesIO(pdf_bytes)).pages:
+            writer.add_page(page)
+        musicas.append((titulo, artista, inicio))
+
+    # O índice entra no começo, deslocando as páginas das músicas
+    paginas_indice = paginas_do_indice(len(musicas))
+    entradas = [(titulo, artista, inicio + paginas_indice + 1, None) for titulo, artista, inicio in musicas]
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    c.setTitle(nome)
+    desenhar_indice(c, nome, entradas)
+    c.save()
+    for posicao, page in enumerate(PdfReader(BytesIO(buffer.getvalue())).pages):
+        writer.insert_page(page, posicao)
+
+    writer.add_outline_item("Índice", 0)
+    for titulo, _, pagina, _ in entradas:
+        writer.add_outline_item(titulo, pagina - 1)
+
+    if hasattr(destino, "write"):
+        writer.write(destino)
+    else:
+        with open(destino, "wb") as f:
+            writer.write(f)
+    return len(musicas)
@@ -0,0 +1,94 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ------------------ TAREFAS EM SEGUNDO PLANO ------------------
+# Banco, PDFs, importação e backup rodam em threads de trabalho. Os resultados
+# voltam por uma fila que a interface esvazia periodicamente (com after), porque
+# widgets Tk só podem ser tocados pela thread principal. Cada thread de trabalho
+# usa a sua própria conexão SQLite (ver database.get_conexao).
+
+
+class Tarefa:
+    """Identifica um trabalho enviado; cancelar() faz o resultado ser descartado"""
+
+    def __init__(self, chave=None):
+        self.chave = chave
+        self._cancelada = threading.Event()
+
+    def cancelar(self):
+        self._cancelada.set()
+
+    @property
+    def cancelada(self):
+        return self._cancelada.is_set()
+
+
+class ExecutorTarefas:
+    """Pool de threads com fila de resultados consumida pela thread da interface.
+
+    enviar() deve ser chamado pela thread da interface; os callbacks
+    ao_concluir(resultado) e ao_falhar(erro) rodam dentro de processar(),
+    também na thread da interface. Tarefas com a mesma chave se substituem:
+    enviar uma nova cancela a anterior (ex.: uma busca digitada por cima da outra).
+    """
+
+    def __init__(self, max_workers=4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tarefa")
+        self._resultados = queue.Queue()
+        self._por_chave = {}
+        self.pendentes = 0
+
+    def enviar(self, funcao, *args, ao_concluir=None, ao_falhar=None, chave=None, **kwargs):
+        tarefa = Tarefa(chave)
+        if chave is not None:
+            anterior = self._por_chave.get(chave)
+            if anterior is not None:
+                anterior.cancelar()
+            self._por_chave[chave] = tarefa
+
+        def executar():
+            resultado = erro = None
+            # Uma tarefa cancelada antes de começar nem chega a rodar
+            if not tarefa.cancelada:
+                try:
+                    resultado = funcao(*args, **kwargs)
+                except Exception as e:
+                    erro = e
+            self._resultados.put((tarefa, resultado, erro, ao_concluir, ao_falhar))
+
+        self.pendentes += 1
+        self._pool.submit(executar)
+        return tarefa
+
+    def em_andamento(self, chave):
+        return chave in self._por_chave
+
+    def cancelar(self, chave):
+        tarefa = self._por_chave.pop(chave, None)
+        if tarefa is not None:
+            tarefa.cancelar()
+
+    def processar(self):
+        """Entrega os resultados prontos; chamado periodicamente pela interface"""
+        while True:
+            try:
+                tarefa, resultado, erro, ao_concluir, ao_falhar = self._resultados.get_nowait()
+            except queue.Empty:
+                return
+            self.pendentes -= 1
+            if tarefa.chave is not None and self._por_chave.get(tarefa.chave) is tarefa:
+                del self._por_chave[tarefa.chave]
+            if tarefa.cancelada:
+                continue
+            if erro is not None:
+                if ao_falhar is None:
+                    raise erro
+                ao_falhar(erro)
+            elif ao_concluir is not None:
+                ao_concluir(resultado)
+
+    def desligar(self):
+        for tarefa in self._por_chave.values():
+            tarefa.cancelar()
+        self._pool.shutdown(wait=False, cancel_futures=True)
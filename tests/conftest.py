@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do aplicativo ficam na raiz do repositório, sem pacote
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Banco novo e vazio, definido como o banco atual durante o teste"""
+    caminho = str(tmp_path / "teste.db")
+    database.init_db(caminho)
+    database.definir_banco(caminho)
+    yield caminho
+    database.fechar_conexao()
+    database.definir_banco(None)
@@ -0,0 +1,34 @@
+import os
+import sqlite3
+
+from backup import RepositorioBackup
+
+
+def _banco(caminho):
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE t (dados BLOB)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(os.urandom(300),) for _ in range(3000)])
+    conn.commit()
+    return conn
+
+
+def test_snapshot_sem_alteracoes_nao_copia_o_banco(tmp_path):
+    caminho = str(tmp_path / "banco.db")
+    conn = _banco(caminho)
+    repositorio = RepositorioBackup(str(tmp_path / "repo"))
+    repositorio.criar_snapshot(caminho)
+
+    assert repositorio.criar_snapshot(caminho)["bytes_escritos"] == 0
+    assert repositorio.criar_snapshot(caminho)["bytes_escritos"] == 0
+
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+    resumo = repositorio.criar_snapshot(caminho)
+    assert 0 < resumo["novos"] < resumo["blocos"]
+
+    repositorio.restaurar(resumo["nome"], str(tmp_path / "restaurado.db"))
+    restaurado = sqlite3.connect(str(tmp_path / "restaurado.db"))
+    assert restaurado.execute("SELECT COUNT(*) FROM t").fetchone() == (3001,)
+    restaurado.close()
+    conn.close()
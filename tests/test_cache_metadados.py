@@ -0,0 +1,142 @@
+import random
+import sqlite3
+import threading
+
+import database
+from database import (
+    contar_musicas, fetch_all_grupos, fetch_grupos_da_musica, get_music_stats,
+    insert_music, insert_musicas_em_lote, update_music, delete_music, toggle_favorito,
+    criar_grupo, atualizar_grupo, excluir_grupo, adicionar_musica_ao_grupo, remover_musica_do_grupo,
+    adicionar_musicas_ao_grupo, remover_musicas_do_grupo, mover_musicas_de_grupo,
+)
+
+# ------------------ CACHE DE METADADOS x SQL ------------------
+# Depois de qualquer sequência de escritas (deste processo, de outra thread ou
+# de outra conexão) as leituras servidas pelo cache devem bater com o banco.
+
+
+def _conferir(caminho):
+    conn = sqlite3.connect(caminho)
+    try:
+        grupos = conn.execute("SELECT id, nome, cor FROM grupos ORDER BY nome").fetchall()
+        assert fetch_all_grupos() == grupos
+
+        for favoritos in (False, True):
+            filtro = " AND m.favorito = 1" if favoritos else ""
+            assert contar_musicas(apenas_favoritos=favoritos) == conn.execute(
+                f"SELECT COUNT(*) FROM musicas m WHERE 1{filtro}").fetchone()[0]
+            for grupo_id, _, _ in grupos:
+                assert contar_musicas(grupo_id, favoritos) == conn.execute(
+                    f"SELECT COUNT(*) FROM musicas m JOIN musica_grupo mg ON mg.musica_id = m.id "
+                    f"WHERE mg.grupo_id = ?{filtro}", (grupo_id,)).fetchone()[0]
+
+        for (musica_id,) in conn.execute("SELECT id FROM musicas"):
+            assert fetch_grupos_da_musica(musica_id) == conn.execute(
+                "SELECT g.id, g.nome, g.cor FROM grupos g JOIN musica_grupo mg ON mg.grupo_id = g.id "
+                "WHERE mg.musica_id = ? ORDER BY g.nome", (musica_id,)).fetchall()
+
+        recente = conn.execute(
+            "SELECT titulo, artista FROM musicas ORDER BY data_criacao DESC, id DESC LIMIT 1").fetchone()
+        assert get_music_stats() == {
+            "total": conn.execute("SELECT COUNT(*) FROM musicas").fetchone()[0],
+            "favoritos": conn.execute("SELECT COUNT(*) FROM musicas WHERE favorito = 1").fetchone()[0],
+            "grupos": len(grupos),
+            "recente": recente,
+        }
+    finally:
+        conn.close()
+
+
+def _operacao(rnd, externa):
+    musicas = [row[0] for row in database.get_conexao().execute("SELECT id FROM musicas")]
+    grupos = [g[0] for g in fetch_all_grupos()]
+    musica = rnd.choice(musicas) if musicas else None
+    grupo = rnd.choice(grupos) if grupos else None
+    alguns = rnd.sample(musicas, min(len(musicas), rnd.randint(1, 8))) + [10 ** 6]
+    tipo = rnd.randrange(14)
+
+    if tipo == 0 or not musicas:
+        insert_music(f"m{rnd.random():.6f}", rnd.choice(["a", "b", None]), "C", None, "letra")
+    elif tipo == 1:
+        insert_musicas_em_lote([(f"lote{i}", "a", "D", None, "", None) for i in range(rnd.randint(1, 5))])
+    elif tipo == 2:
+        update_music(musica, f"editada{rnd.randint(0, 99)}", "b", "E", texto_original="nova")
+    elif tipo == 3:
+        delete_music(musica)
+    elif tipo == 4:
+        toggle_favorito(musica)
+    elif tipo == 5 or not grupos:
+        criar_grupo(f"g{rnd.randint(0, 30)}", rnd.choice(["#111111", "#222222"]))
+    elif tipo == 6:
+        atualizar_grupo(grupo, f"g{rnd.randint(0, 30)}", "#333333", "")
+    elif tipo == 7 and rnd.random() < 0.3:
+        excluir_grupo(grupo)
+    elif tipo == 8:
+        adicionar_musica_ao_grupo(musica, grupo)
+    elif tipo == 9:
+        remover_musica_do_grupo(musica, grupo)
+    elif tipo == 10:
+        adicionar_musicas_ao_grupo(alguns, grupo)
+    elif tipo == 11:
+        remover_musicas_do_grupo(alguns, grupo)
+    elif tipo == 12:
+        mover_musicas_de_grupo(alguns, grupo, rnd.choice(grupos))
+    elif tipo == 13:
+        # Escrita que o cache só percebe pelo data_version: outra conexão ou outra thread
+        if rnd.random() < 0.5:
+            externa.execute("UPDATE musicas SET favorito = NOT favorito WHERE id = ?", (musica,))
+            externa.execute("INSERT OR IGNORE INTO musica_grupo VALUES (?, ?)", (musica, grupo))
+            externa.commit()
+        else:
+            thread = threading.Thread(target=toggle_favorito, args=(musica,))
+            thread.start()
+            thread.join()
+
+
+def test_cache_igual_ao_banco_apos_operacoes_mistas(banco):
+    rnd = random.Random(17)
+    externa = sqlite3.connect(banco)
+    try:
+        for _ in range(600):
+            _operacao(rnd, externa)
+            _conferir(banco)
+    finally:
+        externa.close()
+
+
+def test_associacoes_orfas_sao_ignoradas(banco):
+    ids = insert_musicas_em_lote([(f"t{i}", "a", "C", None, "", None) for i in range(3)])
+    criar_grupo("G")
+    grupo_id = fetch_all_grupos()[0][0]
+    adicionar_musicas_ao_grupo(ids, grupo_id)
+    for musica_id in ids:
+        toggle_favorito(musica_id)
+
+    # Bancos antigos rodavam sem chaves estrangeiras: a exclusão deixava a associação
+    conn = sqlite3.connect(banco)
+    conn.execute("PRAGMA foreign_keys = OFF")
+    conn.execute("DELETE FROM musicas WHERE id = ?", (ids[0],))
+    conn.commit()
+    conn.close()
+
+    assert contar_musicas(grupo_id) == 2
+    assert contar_musicas(grupo_id, apenas_favoritos=True) == 2
+    _conferir(banco)
+
+
+def test_migracao_remove_associacoes_orfas(banco):
+    ids = insert_musicas_em_lote([(f"t{i}", "a", "C", None, "", None) for i in range(2)])
+    criar_grupo("G")
+    adicionar_musicas_ao_grupo(ids, fetch_all_grupos()[0][0])
+    database.fechar_conexao()
+
+    conn = sqlite3.connect(banco)
+    conn.execute("DELETE FROM musicas WHERE id = ?", (ids[0],))
+    conn.execute("PRAGMA user_version = 5")
+    conn.commit()
+    conn.close()
+
+    database.init_db(banco)
+    conn = sqlite3.connect(banco)
+    assert conn.execute("SELECT musica_id FROM musica_grupo").fetchall() == [(ids[1],)]
+    conn.close()
@@ -0,0 +1,29 @@
+import pytest
+
+import cli
+from database import criar_grupo, insert_musicas_em_lote
+
+# ------------------ GRUPO PELA LINHA DE COMANDO ------------------
+# Ids que não correspondem a nenhuma música são listados na saída de erro e o
+# comando termina com status diferente de zero; os demais são aplicados.
+
+
+@pytest.fixture
+def grupos(banco):
+    ids = insert_musicas_em_lote([(f"m{i}", "", "C", None, "letra", None) for i in range(3)])
+    criar_grupo("A")
+    criar_grupo("B")
+    return banco, ids
+
+
+@pytest.mark.parametrize("extra", [[], ["--remover"], ["--mover-para", "B"]])
+def test_ids_inexistentes_dao_erro(grupos, capsys, extra):
+    banco, ids = grupos
+    assert cli.main(["--banco", banco, "grupo", "A", *map(str, ids[:2])]) == 0
+    capsys.readouterr()
+
+    status = cli.main(["--banco", banco, "grupo", "A", str(ids[0]), "99", "98", *extra])
+    saida = capsys.readouterr()
+    assert status == 1
+    assert "99 98" in saida.err
+    assert saida.out.startswith("1 " if extra else "0 ")
@@ -0,0 +1,70 @@
+import database
+from database import (
+    adicionar_musicas_ao_grupo, consultar_musicas, criar_grupo, fetch_all_grupos,
+    insert_musicas_em_lote, iterar_musicas,
+)
+
+# ------------------ CONSULTA PAGINADA ------------------
+# A página é escolhida em uma subconsulta materializada só com ids e chave de
+# ordenação; o que é caro por linha fica na consulta de fora, que só vê a página.
+
+
+def _popular():
+    ids = insert_musicas_em_lote([
+        (f"amor {i}", f"artista {i % 7}", "C", None, f"verso {i} fala de amor e de graça", None)
+        for i in range(500)
+    ])
+    criar_grupo("Domingo")
+    grupo_id = fetch_all_grupos()[0][0]
+    adicionar_musicas_ao_grupo(ids[::2], grupo_id)
+    return grupo_id
+
+
+def _plano(**filtros):
+    """EXPLAIN QUERY PLAN da consulta da tela: {id: (pai, detalhe)}"""
+    conn = database.get_conexao()
+    consultas = []
+    conn.set_trace_callback(consultas.append)
+    try:
+        database.paginar_musicas(tamanho=20, **filtros)
+    finally:
+        conn.set_trace_callback(None)
+    # O trace recebe a consulta com os parâmetros já interpolados
+    consulta = next(c for c in consultas if "MATERIALIZED" in c)
+    return {no: (pai, detalhe) for no, pai, _, detalhe in conn.execute(f"EXPLAIN QUERY PLAN {consulta}")}
+
+
+def _dentro_da_pagina(plano, no):
+    """True se o nó do plano pertence à subconsulta que escolhe a página"""
+    while no in plano:
+        pai, detalhe = plano[no]
+        if detalhe.startswith("MATERIALIZE"):
+            return True
+        no = pai
+    return False
+
+
+def test_trecho_calculado_so_para_a_pagina(banco):
+    _popular()
+    plano = _plano(termo="amor")
+    # O MATCH que filtra fica na página; a busca por rowid que alimenta snippet() fica fora
+    buscas = [no for no, (_, detalhe) in plano.items() if "musicas_fts" in detalhe]
+    assert any(_dentro_da_pagina(plano, no) for no in buscas)
+    assert any(not _dentro_da_pagina(plano, no) and ":=" in plano[no][1] for no in buscas)
+
+
+def test_paginas_iguais_a_consulta_inteira(banco):
+    grupo_id = _popular()
+    for filtros in ({"termo": "amor"}, {"termo": "graça", "ordenar_por": "relevancia"},
+                    {"grupo_id": grupo_id, "ordenar_por": "titulo", "ordem": "ASC"}, {}):
+        esperado = consultar_musicas(**filtros)
+        assert list(iterar_musicas(tamanho=37, **filtros)) == esperado
+        assert all(trecho and database.MARCA_INICIO in trecho for *_, trecho in esperado) == ("termo" in filtros)
+
+
+def test_grupos_calculados_so_para_a_pagina(banco):
+    grupo_id = _popular()
+    for filtros in ({"grupo_id": grupo_id}, {"termo": "amor"}):
+        plano = _plano(**filtros)
+        subconsultas = [no for no, (_, detalhe) in plano.items() if "CORRELATED SCALAR SUBQUERY" in detalhe]
+        assert subconsultas and not any(_dentro_da_pagina(plano, no) for no in subconsultas)
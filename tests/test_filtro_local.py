@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+import database
+from database import consultar_musicas, criar_filtro_local, insert_musicas_em_lote
+
+# ------------------ REFINAMENTO EM MEMÓRIA x BANCO ------------------
+# criar_filtro_local precisa devolver exatamente as linhas que a consulta ao
+# banco devolveria; senão a lista muda conforme o termo foi digitado ou colado.
+PALAVRAS = [
+    "Amazing", "Grace", "Graça", "graciosa", "Deus", "é", "bom", "Ação", "acao", "coração",
+    "Aline", "Barros", "Fernandinho", "Hillsong", "C#", "C#m", "Bb", "Dó", "Sol", "sol-maior",
+    "rock'n'roll", "hino_12", "12", "ÉPOCA", "epoca", "über", "naïve", "São", "Paulo", "Ré",
+]
+CAMPOS = ["titulo", "artista", "tonalidade"]
+
+
+def _texto(rnd, maximo):
+    return " ".join(rnd.choice(PALAVRAS) for _ in range(rnd.randint(1, maximo)))
+
+
+def _termo(rnd, extras=()):
+    palavras = []
+    for _ in range(rnd.randint(1, 3)):
+        palavra = rnd.choice(PALAVRAS + ["-", "#", '"', "'", *extras])
+        # Prefixos, maiúsculas e acentos trocados são o que mais aparece ao digitar
+        palavra = palavra[:rnd.randint(1, len(palavra))]
+        palavras.append(palavra.upper() if rnd.random() < 0.2 else palavra)
+    return " ".join(palavras)
+
+
+def _popular(rnd):
+    insert_musicas_em_lote([(_texto(rnd, 4), _texto(rnd, 2), _texto(rnd, 1), None, "", None)
+                            for _ in range(300)])
+    return consultar_musicas()
+
+
+def _comparar(rnd, linhas, consultas, extras=()):
+    for _ in range(consultas):
+        campo = rnd.choice(CAMPOS)
+        termo = _termo(rnd, extras)
+        filtro = criar_filtro_local(termo, campo)
+        esperado = sorted(linha[0] for linha in consultar_musicas(campo=campo, termo=termo))
+        assert sorted(linha[0] for linha in linhas if filtro(linha)) == esperado, (campo, termo)
+
+
+def test_mesmo_resultado_que_o_fts(banco):
+    assert database.FTS_DISPONIVEL
+    rnd = random.Random(16)
+    _comparar(rnd, _popular(rnd), 900)
+
+
+def test_mesmo_resultado_que_o_like(banco, monkeypatch):
+    # Inclui os curingas do LIKE, que o fallback não escapa
+    monkeypatch.setattr(database, "FTS_DISPONIVEL", False)
+    rnd = random.Random(16)
+    _comparar(rnd, _popular(rnd), 900, extras=["%", "_", "a%o", "s_o", "ã_"])
+
+
+@pytest.mark.parametrize("campo", ["texto_original", None])
+def test_sem_filtro_para_colunas_fora_da_linha(campo):
+    assert criar_filtro_local("deus", campo) is None
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+from parser_importacao import interpretar_documento, remover_caracteres_invisiveis
+
+
+# ------------------ IMPLEMENTAÇÃO ANTERIOR (REFERÊNCIA) ------------------
+# Cópia do parser que ficava em importacao.py antes de parser_importacao. A
+# única diferença aceita é o hífen opcional (U+00AD), que a lista antiga tentava
+# remover com '\ad' e agora é removido de fato; por isso ele entra na lista aqui.
+INVISIVEIS_ANTIGOS = [chr(c) for c in (*range(9), 11, 12, *range(14, 32), *range(0x7f, 0xa0))] + ["\xad"]
+
+TONALIDADES_ANTIGAS = [
+    "C", "D", "E", "F", "G", "A", "B",
+    "Cm", "Dm", "Em", "Fm", "Gm", "Am", "Bm",
+    "C#", "D#", "F#", "G#", "A#",
+    "Db", "Eb", "Gb", "Ab", "Bb",
+    "Dó", "Ré", "Mi", "Fá", "Sol", "Lá", "Si",
+    "Dóm", "Rém", "Mim", "Fám", "Solm", "Lám", "Sim"
+]
+
+
+def _limpar_antigo(texto):
+    return ''.join(char for char in texto if ord(char) >= 32 or ord(char) in [9, 10, 13])
+
+
+def _remover_invisiveis_antigo(texto):
+    for char in INVISIVEIS_ANTIGOS:
+        texto = texto.replace(char, '')
+    return texto.strip()
+
+
+def _interpretar_antigo(texto):
+    linhas = [_limpar_antigo(l) for l in texto.splitlines()]
+    if len([l for l in linhas if l.strip()]) < 2:
+        raise ValueError("Documento inválido")
+
+    titulo = _limpar_antigo(linhas[0]).strip()
+    artista, tonalidade = "", ""
+    linha2 = _limpar_antigo(linhas[1]).strip()
+
+    encontrou_separador = False
+    for sep in ["•", "-", "|", ":", ";", "–", "—"]:
+        if sep in linha2:
+            partes = [_limpar_antigo(x).strip() for x in linha2.split(sep)]
+            if len(partes) >= 2:
+                artista = partes[0]
+                tonalidade = partes[1]
+                if len(partes) > 2:
+                    tonalidade = sep.join(partes[1:])
+                encontrou_separador = True
+                break
+
+    if not encontrou_separador:
+        palavras = linha2.split()
+        if palavras and any(palavras[-1].upper() == p.upper() for p in TONALIDADES_ANTIGAS):
+            artista = " ".join(palavras[:-1])
+            tonalidade = palavras[-1]
+        else:
+            artista = linha2
+
+    artista = _remover_invisiveis_antigo(artista)
+    tonalidade = _remover_invisiveis_antigo(tonalidade)
+    letra = "\n".join(linhas[2:]) if len(linhas) > 2 else ""
+    return titulo, artista, tonalidade, letra
+
+
+# ------------------ ENTRADAS ALEATÓRIAS ------------------
+PEDACOS = [
+    "Amazing Grace", "Aline Barros", "Deus é bom", "ação", "Lá", "Sol", "Solm", "C#", "Bb", "dó",
+    "Am", "xyz", " ", "  ", "\t", "\r", "\n", "\n\n", "\r\n", "•", "-", "|", ":", ";", "–", "—",
+    "\x00", "\x07", "\x0b", "\x0c", "\x1b", "\x1f", "\x7f", "\x85", "\x9f", "\xad", "\xa0",
+    " ", "​", "#", "é", "ç", "🎵",
+]
+
+
+def _documento(rnd):
+    return "".join(rnd.choice(PEDACOS) for _ in range(rnd.randint(0, 25)))
+
+
+def _resultado(funcao, texto):
+    try:
+        return funcao(texto)
+    except ValueError:
+        return ValueError
+
+
+def test_mesmo_resultado_que_o_parser_anterior():
+    rnd = random.Random(14)
+    for _ in range(20000):
+        texto = _documento(rnd)
+        assert _resultado(interpretar_documento, texto) == _resultado(_interpretar_antigo, texto), repr(texto)
+
+
+@pytest.mark.parametrize("linha, esperado", [
+    ("Aline Barros - G", ("Aline Barros", "G")),
+    ("Aline Barros • Dó • ao vivo", ("Aline Barros", "Dó•ao vivo")),
+    ("Aline Barros Solm", ("Aline Barros", "Solm")),
+    ("Aline Barros", ("Aline Barros", "")),
+])
+def test_artista_e_tonalidade(linha, esperado):
+    assert interpretar_documento(f"Título\n{linha}\nletra")[1:3] == esperado
+
+
+def test_documento_sem_duas_linhas_com_texto():
+    with pytest.raises(ValueError):
+        interpretar_documento("Só o título\n\x07\n  \n")
+
+
+def test_remove_hifen_opcional():
+    assert remover_caracteres_invisiveis("Ale\xadluia\x85 ") == "Aleluia"
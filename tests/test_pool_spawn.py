@@ -0,0 +1,48 @@
+import ast
+import multiprocessing
+import os
+
+import pytest
+
+from batch_render import renderizar_em_lote
+from database import fetch_estado_render, insert_musicas_em_lote
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ------------------ POOL DE PROCESSOS COM SPAWN ------------------
+# No Windows e no executável do PyInstaller os processos do pool são criados com
+# spawn: cada um importa de novo o módulo principal. main.py não pode, portanto,
+# fazer nada além de definições no nível do módulo.
+
+
+@pytest.fixture
+def spawn():
+    anterior = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method("spawn", force=True)
+    yield
+    multiprocessing.set_start_method(anterior, force=True)
+
+
+def test_renderizacao_em_lote_com_spawn(banco, spawn):
+    ids = insert_musicas_em_lote([(f"t{i}", "a", "C", b"%PDF-antigo", f"letra {i}", None) for i in range(6)])
+    resultado = renderizar_em_lote(processos=2, tamanho_lote=4)
+    assert resultado["renderizadas"] == 6 and not resultado["cancelado"]
+    assert all(fetch_estado_render(i)[0] is not None for i in ids)
+
+
+def test_main_sem_efeitos_ao_importar():
+    with open(os.path.join(RAIZ, "main.py"), encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+
+    for no in arvore.body:
+        if isinstance(no, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+            continue
+        if isinstance(no, ast.Assign) and not any(isinstance(n, ast.Call) and ast.unparse(n.func) not in (
+                "config.get", "os.path.join") for n in ast.walk(no.value)):
+            continue
+        if isinstance(no, ast.If) and ast.unparse(no.test) == "__name__ == '__main__'":
+            continue
+        pytest.fail(f"main.py:{no.lineno} roda ao importar: {ast.unparse(no)[:60]}")
+
+    principal = next(no for no in arvore.body if isinstance(no, ast.FunctionDef) and no.name == "main")
+    assert ast.unparse(principal.body[0]) == "multiprocessing.freeze_support()"